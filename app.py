@@ -1,21 +1,32 @@
 import streamlit as st
-import networkx as nx
+import streamlit.components.v1 as components
+import numpy as np
 from network.generate_network import generate_social_network
-from simulation.sihrd_model import initialize_population, simulate_sihrd, Status
+from network.csr_graph import to_csr
+from simulation.sihrd_model import initialize_attributes, initialize_population, iterate_sihrd, Status
+from simulation.sihrd_vectorized import TIMELINE_KEYS
+from simulation.history import HistoryPolicy
+from simulation.demographics import DemographicTable, node_demographics
+from simulation.ensemble import run_ensemble
+from simulation.instrumentation import Instrumentation, MemorySink
 from visualization.enhanced_plot import (
     plot_sihrd_timeline,
+    plot_ensemble_bands,
+    plot_phase_timings,
     create_age_distribution_plot,
-    animate_spread,
     create_static_network,
     animate_sihrd_timeline
 )
+from visualization.export import FrameAnimation
+from visualization.player import player_html, player_payload
+from simulation.jobs import CANCELLED, DONE, FAILED, JobExecutor, job_key
 import plotly.graph_objects as go
 import matplotlib.pyplot as plt
 from matplotlib.animation import PillowWriter
 import tempfile
 import os
-import random
-import numpy as np
+import time
+import uuid
 
 # Page configuration
 st.set_page_config(
@@ -282,51 +293,168 @@ st.sidebar.subheader("Healthcare System Parameters")
 hospitalization_prob = st.sidebar.slider("Base Hospitalization Probability", 0.05, 0.30, 0.15)
 death_prob = st.sidebar.slider("Base Death Probability", 0.01, 0.10, 0.02)
 
+# Monte Carlo parameters
+st.sidebar.subheader("Uncertainty Analysis")
+run_monte_carlo = st.sidebar.checkbox("Run Monte Carlo Ensemble", value=False)
+n_replicates = st.sidebar.slider("Number of Replicates", 10, 500, 100, step=10)
+
+# Network drawing level of detail
+st.sidebar.subheader("Network View")
+network_detail = st.sidebar.selectbox(
+    "Detail Level",
+    ["auto", "full", "sampled", "supernodes", "density"],
+    help="'auto' aggregates large networks into supernodes; 'sampled' draws a sample of the edges "
+         "and 'density' shades a grid over the layout."
+)
+
+# Reproducibility
+st.sidebar.subheader("Reproducibility")
+random_seed = st.sidebar.number_input("Random Seed", min_value=0, value=42, step=1)
+
+# Node states kept for the animation and demographics
+st.sidebar.subheader("History Recording")
+history_mode = st.sidebar.selectbox(
+    "Recorded Days",
+    ["Every day", "Every k-th day", "Days with many transitions", "Memory budget"],
+    help="Keeping fewer days of node states saves memory on large networks; "
+         "the first and last day are always kept."
+)
+if history_mode == "Every k-th day":
+    history_policy = HistoryPolicy('every', every=st.sidebar.slider("Record Every (days)", 2, 10, 4))
+elif history_mode == "Days with many transitions":
+    history_policy = HistoryPolicy('threshold', threshold=st.sidebar.number_input(
+        "Minimum Transitions per Day", min_value=0, value=10, step=10))
+elif history_mode == "Memory budget":
+    history_policy = HistoryPolicy('budget', max_bytes=st.sidebar.slider("History Budget (MB)", 1, 256, 32) * 2**20)
+else:
+    history_policy = HistoryPolicy('full')
+
+# Diagnostics
+st.sidebar.subheader("Diagnostics")
+record_performance = st.sidebar.checkbox(
+    "Record Performance", value=False,
+    help="Time every phase of each simulated day and show them in a Performance tab."
+)
+
+def stage_seeds(seed):
+    """Independent seeds for the network, population and simulation stages"""
+    return np.random.SeedSequence(seed).spawn(3)
+
 # Modify the caching implementation
 @st.cache_data
-def generate_network_cached(num_nodes, edges_per_node):
-    """Cached version of network generation"""
-    G = generate_social_network(num_nodes=num_nodes, edges_per_node=edges_per_node)
+def generate_network_cached(num_nodes, edges_per_node, seed):
+    """Cached version of network generation, returning the network and its content fingerprint"""
+    network_seed, population_seed, _ = stage_seeds(seed)
+    G = generate_social_network(num_nodes=num_nodes, edges_per_node=edges_per_node, seed=network_seed)
     # Initialize node attributes here to ensure they're preserved in cache
-    for node in G.nodes():
-        # Assign random age (0-100)
-        G.nodes[node]['age'] = random.randint(0, 100)
-        # Assign random vaccination status (0-1)
-        G.nodes[node]['vaccinated'] = random.random() < 0.7  # 70% vaccination rate
-        # Calculate base risk factor based on age
-        age = G.nodes[node]['age']
-        G.nodes[node]['risk_factor'] = calculate_risk_factor(age, G.nodes[node]['vaccinated'])
-    return G
-
-@st.cache_data(hash_funcs={nx.Graph: lambda _: None})
-def run_simulation_with_init(_G, percent_infected, params):
-    """Cached version of simulation run that includes initialization"""
+    initialize_attributes(G, seed=population_seed, write_networkx=True)
+    # Hashed once here, so job keys don't rebuild the CSR arrays on every rerun
+    return G, to_csr(G).fingerprint()
+
+def stream_simulation_with_init(G, percent_infected, params, seed, instrument=None):
+    """Initialize the population and yield each simulated day as it completes"""
+    _, _, simulation_seed = stage_seeds(seed)
+    rng = np.random.default_rng(simulation_seed)
+
     # Initialize population
     status, infection_day, hospitalization_day, infected_nodes = initialize_population(
-        _G, 
+        G, 
         percent_infected=percent_infected,
-        preserve_attributes=True  # Add this flag
+        preserve_attributes=True,  # Add this flag
+        seed=rng
     )
     
     # Run simulation
-    timeline, status_history = simulate_sihrd(
-        _G, 
+    yield from iterate_sihrd(
+        G, 
         status, 
         infection_day, 
         hospitalization_day, 
-        params
+        params,
+        seed=rng,
+        include_state=True,
+        instrument=instrument
     )
-    
-    return timeline, status_history, status
 
-def calculate_risk_factor(age, vaccinated):
-    """Calculate risk factor based on age and vaccination status."""
-    base_risk = np.interp(age, [0, 50, 70, 85, 100], [0.1, 0.2, 0.4, 0.7, 1.0])
-    return base_risk * (0.3 if vaccinated else 1.0)
+def simulation_job(report, G, percent_infected, params, seed, update_every=5, record_performance=False,
+                   history=None):
+    """
+    Job function running the simulation in a worker thread.
+
+    Reports the partial timeline every ``update_every`` days for the live
+    chart. Demographic counts are updated from each day's state changes,
+    so the Demographics tab only reads the finished table. Node states
+    are kept as selected by the ``history`` HistoryPolicy (every day by
+    default). With ``record_performance``, the run is instrumented and the
+    history and demographics bookkeeping is timed as its 'history' phase.
+
+    Returns:
+    tuple: (timeline, StatusHistory, DemographicTable, MemorySink or None)
+    """
+    timeline = {key: [] for key in TIMELINE_KEYS}
+    recorder = HistoryPolicy.coerce(history or 'full').recorder(G.nodes(), params['max_days'])
+    demographics = None
+    performance = MemorySink() if record_performance else None
+    instrument = Instrumentation(performance) if record_performance else None
+
+    for counts in stream_simulation_with_init(G, percent_infected, params, seed, instrument=instrument):
+        for key in timeline:
+            timeline[key].append(counts[key])
+        recorder.append(counts['state'], counts['day'])
+        if demographics is None:
+            demographics = DemographicTable(*node_demographics(G, recorder.history.nodes), counts['state'])
+        else:
+            demographics.update(counts['state'])
+        if instrument is not None:
+            instrument.phase('history')
+            instrument.retained(recorder.nbytes)
+        if counts['day'] % update_every == 0:
+            report((counts['day'] + 1) / params['max_days'], f"Day {counts['day']}",
+                   partial={key: list(values) for key, values in timeline.items()})
+
+    return timeline, recorder.finish(), demographics, performance
+
+def ensemble_job(report, G, percent_infected, params, n_replicates, seed):
+    """Job function for the Monte Carlo ensemble returning mean and quantile bands"""
+    report(0.0, f"Running {n_replicates} Monte Carlo replicates...")
+    return run_ensemble(
+        G,
+        params,
+        n_replicates=n_replicates,
+        percent_infected=percent_infected,
+        seed=seed
+    )
+
+def timeline_animation_job(report, timeline, fps=5):
+    """Job function rendering the timeline animation to GIF bytes"""
+    report(0.0, "Rendering timeline animation...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'timeline.gif')
+        if not save_animation(animate_sihrd_timeline(timeline, export=True), path, fps=fps):
+            raise RuntimeError("Failed to save the timeline animation")
+        with open(path, 'rb') as f:
+            return f.read()
+
+@st.cache_resource
+def get_executor():
+    """Job executor shared by every session of this server"""
+    return JobExecutor(max_workers=2)
+
+def show_job_progress(job):
+    """Draw a job's progress bar; returns True while the job is unfinished"""
+    if job.done:
+        return False
+    st.progress(job.progress, text=job.message or f"{job.description} ({job.status})...")
+    return True
 
 def save_animation(anim, filename, fps=5):
     """Optimized animation saving function with error handling"""
     try:
+        if isinstance(anim, FrameAnimation):
+            # Frames are rendered in a process pool and streamed into the file
+            anim.save(filename, fps=fps)
+            return os.path.exists(filename) and os.path.getsize(filename) > 0
+
         # Create writer with explicit metadata
         metadata = dict(title='Disease Spread Animation', artist='EpidemiaX')
         writer = PillowWriter(
@@ -356,31 +484,71 @@ def save_animation(anim, filename, fps=5):
         print(f"Error saving animation: {str(e)}")
         return False
 
-# Replace the simulation section
-if st.sidebar.button("Run Simulation"):
+# Simulations run as background jobs; the script only submits and polls them
+POLL_INTERVAL = 0.5  # Seconds between reruns while a job is running
+executor = get_executor()
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex
+session_id = st.session_state['session_id']
+
+run_clicked = st.sidebar.button("Run Simulation")
+stop_clicked = st.sidebar.button("Stop Simulation")
+
+if run_clicked:
     # Generate network with caching
     with st.spinner("Generating social network..."):
-        G = generate_network_cached(num_nodes=population_size, edges_per_node=avg_connections)
+        G, fingerprint = generate_network_cached(num_nodes=population_size, edges_per_node=avg_connections,
+                                                 seed=int(random_seed))
         
-    # Run simulation with caching (combined initialization and simulation)
-    with st.spinner("Running simulation..."):
-        params = {
-            'max_days': 100,
-            'infection_prob': infection_prob,
-            'hospitalization_prob': hospitalization_prob,
-            'death_prob': death_prob,
-            'recovery_time': recovery_time,
-            'hospital_recovery_time': hospital_recovery_time
-        }
-        
-        timeline, status_history, status = run_simulation_with_init(
-            G,
-            initial_infected/100,
-            params
-        )
+    params = {
+        'max_days': 100,
+        'infection_prob': infection_prob,
+        'hospitalization_prob': hospitalization_prob,
+        'death_prob': death_prob,
+        'recovery_time': recovery_time,
+        'hospital_recovery_time': hospital_recovery_time
+    }
+    percent_infected = initial_infected/100
+    # Keyed by the network's content, so identical runs from any session share one job
+    simulation_key = job_key('simulation', fingerprint, int(random_seed), params, percent_infected=percent_infected,
+                             record_performance=record_performance, history=history_policy)
+    previous_key = st.session_state.get('simulation_job')
+    if previous_key not in (None, simulation_key):
+        executor.release(previous_key, session_id)
+    # Reuses a finished or running job with the same key, retries a failed one
+    executor.submit(simulation_key, simulation_job, G, percent_infected, params, int(random_seed),
+                    record_performance=record_performance, history=history_policy,
+                    requester=session_id, description="Simulation")
+    st.session_state['simulation_job'] = simulation_key
+    st.session_state['simulation_inputs'] = (G, fingerprint, params, percent_infected, int(random_seed))
+
+if stop_clicked and st.session_state.get('simulation_job'):
+    # The job is only cancelled if no other session is waiting for it
+    executor.release(st.session_state.pop('simulation_job'), session_id)
+
+simulation = executor.get(st.session_state.get('simulation_job'))
+poll = False
+
+if simulation is None:
+    st.info("Adjust the parameters in the sidebar and click 'Run Simulation' to start.")
+elif not simulation.done:
+    # Live timeline while the job runs
+    poll = show_job_progress(simulation)
+    if simulation.partial:
+        st.plotly_chart(plot_sihrd_timeline(simulation.partial), use_container_width=True)
+elif simulation.status == FAILED:
+    st.error(f"Simulation failed: {simulation.error}")
+elif simulation.status == CANCELLED:
+    st.warning("Simulation was stopped. Click 'Run Simulation' to start again.")
+else:
+    G, fingerprint, params, percent_infected, seed = st.session_state['simulation_inputs']
+    timeline, status_history, demographics, performance = simulation.result()
     
     # Create tabs
-    tab1, tab2, tab3 = st.tabs(["Disease Spread", "Demographics", "Network View"])
+    tab_names = ["Disease Spread", "Demographics (Final Day)", "Network View"]
+    if performance is not None:
+        tab_names.append("Performance")
+    tab1, tab2, tab3, *tab_performance = st.tabs(tab_names)
     
     # Display all static content first
     with tab1:
@@ -414,9 +582,23 @@ if st.sidebar.button("Run Simulation"):
             with col4:
                 st.metric("Recovery Rate", f"{final_stats['Recovery Rate']:.1f}%")
 
+        if run_monte_carlo:
+            st.markdown('<div class="custom-subheader">Uncertainty Bands</div>', unsafe_allow_html=True)
+            ensemble_key = job_key('ensemble', fingerprint, seed, params, percent_infected=percent_infected,
+                                   n_replicates=n_replicates)
+            ensemble = executor.submit(ensemble_key, ensemble_job, G, percent_infected, params, n_replicates, seed,
+                                       requester=session_id, description="Monte Carlo ensemble")
+            if show_job_progress(ensemble):
+                poll = True
+            elif ensemble.status == DONE:
+                st.plotly_chart(plot_ensemble_bands(ensemble.result()), use_container_width=True)
+            else:
+                st.error(f"Monte Carlo ensemble failed: {ensemble.error}")
+
     with tab2:
         st.subheader("Demographic Analysis")
-        demo_fig = create_age_distribution_plot(G, status)
+        st.caption(f"Status of every node on the last simulated day (day {len(timeline['susceptible']) - 1}).")
+        demo_fig = create_age_distribution_plot(G, demographics)
         st.plotly_chart(demo_fig, use_container_width=True)
     
     with tab3:
@@ -424,83 +606,66 @@ if st.sidebar.button("Run Simulation"):
         
         # Static network structure
         st.markdown("### Network Structure")
-        static_fig = create_static_network(G)
+        static_fig = create_static_network(G, detail=network_detail)
         st.pyplot(static_fig)
+        plt.close(static_fig)
+
+    if performance is not None:
+        with tab_performance[0]:
+            st.subheader("Simulation Performance")
+            summary = performance.summary()
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Simulation Time", f"{summary['seconds'] * 1e3:,.0f} ms")
+            with col2:
+                st.metric("Transitions", f"{summary['transitions']:,}")
+            with col3:
+                st.metric("Nodes Touched", f"{summary['nodes_touched']:,}")
+            with col4:
+                st.metric("History Retained", f"{summary['history_bytes'] / 2**20:,.1f} MB")
+            st.plotly_chart(plot_phase_timings(performance), use_container_width=True)
+            st.markdown("#### Time by Phase")
+            st.table({
+                'Phase': list(summary['phases']),
+                'Milliseconds': [f"{seconds * 1e3:,.1f}" for seconds in summary['phases'].values()],
+                'Share': [f"{seconds / summary['seconds']:.1%}" if summary['seconds'] else "-"
+                          for seconds in summary['phases'].values()]
+            })
 
     # Now handle dynamic content generation
     with tab1:
         st.markdown("### Dynamic Timeline")
-        timeline_progress = st.progress(0)
-        st.markdown("Generating timeline animation...")
-        
-        # Generate timeline animation
-        anim = animate_sihrd_timeline(timeline)
-        
-        # Save animation with optimized settings
-        with tempfile.NamedTemporaryFile(suffix='.gif', delete=False) as temp_file:
-            save_animation(anim, temp_file.name, fps=5)
-            
-            timeline_progress.progress(100)
-            st.success("Timeline animation generated successfully!")
-            
+        animation_job = executor.submit(simulation.key + '-timeline-gif', timeline_animation_job, timeline,
+                                        requester=session_id, description="Timeline animation")
+        if show_job_progress(animation_job):
+            poll = True
+        elif animation_job.status == DONE:
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
-                st.image(temp_file.name, use_container_width=True)
-        
-        plt.close('all')
-        os.unlink(temp_file.name)
+                st.image(animation_job.result(), use_container_width=True)
+        else:
+            st.error(f"Error generating timeline animation: {animation_job.error}")
 
     with tab3:
         st.markdown("### Disease Spread Animation")
-        network_progress = st.progress(0)
-        st.markdown("Generating network animation...")
         
-        temp_dir = tempfile.mkdtemp()
-        temp_path = os.path.join(temp_dir, 'animation.gif')
-        
-        try:
-            # Generate network animation
-            anim = animate_spread(G, status_history)
-            
-            # Save animation
-            network_progress.progress(50)
-            if save_animation(anim, temp_path, fps=3):
-                network_progress.progress(100)
-                
-                # Verify file exists and has content
-                if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
-                    try:
-                        # Read the file content as bytes
-                        with open(temp_path, 'rb') as f:
-                            file_content = f.read()
-                            
-                        st.success("Network animation generated successfully!")
-                        col1, col2, col3 = st.columns([1, 2, 1])
-                        with col2:
-                            st.image(file_content, use_container_width=True, caption="Disease Spread Animation")
-                    except Exception as e:
-                        st.error(f"Error displaying animation: {str(e)}")
-                else:
-                    st.error("Animation file was not created successfully.")
-            else:
-                st.error("Failed to save the animation. Please try again with different parameters.")
-                
-        except ValueError as ve:
-            st.error(f"Error generating animation: {str(ve)}")
-        except Exception as e:
-            st.error(f"Unexpected error during animation: {str(e)}")
-        finally:
-            plt.close('all')  # Ensure all plots are closed
-            # Clean up temporary files
+        if poll:
+            # Each poll reruns the script; sending the player then would
+            # reload it and restart playback twice a second
+            st.info("The animation player appears once the background jobs have finished.")
+        else:
             try:
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-                os.rmdir(temp_dir)
-            except Exception:
-                pass  # Ignore cleanup errors
-
-else:
-    st.info("Adjust the parameters in the sidebar and click 'Run Simulation' to start.")
+                # The browser plays the animation from the layout and daily state
+                # changes, so no frames are rendered on the server. The page is
+                # built once per simulation and reused by later reruns.
+                cached_key, html = st.session_state.get('player_html', (None, None))
+                if cached_key != simulation.key:
+                    html = player_html(player_payload(G, status_history), height=600, fps=10,
+                                       include_plotlyjs='cdn')
+                    st.session_state['player_html'] = (simulation.key, html)
+                components.html(html, height=660)
+            except ValueError as ve:
+                st.error(f"Error generating animation: {str(ve)}")
 
 # Enhanced footer
 st.markdown("""
@@ -512,3 +677,8 @@ st.markdown("""
     </div>
 </footer>
 """, unsafe_allow_html=True)
+
+# Poll running jobs by rerunning the script
+if poll:
+    time.sleep(POLL_INTERVAL)
+    st.rerun()
@@ -0,0 +1,369 @@
+"""
+Performance benchmarks of network generation, simulation, storage and rendering.
+
+Run from the repository root:
+
+    python -m benchmarks.suite run --sizes 1000 10000 --degrees 2 5 --output benchmarks/results.json
+    python -m benchmarks.suite compare benchmarks/baseline.json benchmarks/results.json
+
+Every case (stage, node count, degree) runs in a freshly spawned process,
+so peak RSS measures that stage alone. Stages too slow for a size (such as
+the NetworkX-based ones at 1M nodes) are recorded as skipped.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+from network.generate_network import generate_social_network, generate_social_network_csr, save_network
+from network.graph_store import csr_to_networkx, load_graph_binary, save_graph_binary
+from network.csr_graph import to_csr
+from simulation.history import StatusHistory
+from simulation.sihrd_model import initialize_attributes, initialize_population, simulate_sihrd
+from simulation.sihrd_vectorized import seed_infections, simulate_sihrd_vectorized
+from simulation.sihrd_gillespie import simulate_sihrd_gillespie
+from visualization.layout import compute_layout
+from visualization.raster import render_spread
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_DEGREES = (2, 5)
+SEED = 42
+PERCENT_INFECTED = 0.01
+BENCHMARK_PARAMS = {
+    'max_days': 30,
+    'infection_prob': 0.3,  # High enough for the outbreak to last every day
+    'hospitalization_prob': 0.15,
+    'death_prob': 0.02,
+    'recovery_time': 14,
+    'hospital_recovery_time': 21
+}
+# Days of the spread animation written by the render stages
+ANIMATION_DAYS = 10
+
+
+def _csr_graph(nodes, degree):
+    csr = generate_social_network_csr(nodes, degree, seed=SEED)
+    initialize_attributes(csr, seed=SEED)
+    return csr
+
+
+def _networkx_graph(nodes, degree):
+    return csr_to_networkx(_csr_graph(nodes, degree))
+
+
+def _status_history(csr, days=ANIMATION_DAYS):
+    """Daily states of a short vectorized run, padded to ``days`` rows."""
+    state, infection_day, hospitalization_day = seed_infections(csr.num_nodes, PERCENT_INFECTED, seed=SEED)
+    params = dict(BENCHMARK_PARAMS, max_days=days)
+    _, history = simulate_sihrd_vectorized(csr, state, infection_day, hospitalization_day, params, seed=SEED)
+    padded = StatusHistory(csr.nodes, days)
+    for day in range(days):
+        padded.append(history[min(day, len(history) - 1)])
+    return padded
+
+
+def _setup_simulation(nodes, degree, workdir):
+    G = _networkx_graph(nodes, degree)
+    return G, initialize_population(G, PERCENT_INFECTED, preserve_attributes=True, seed=SEED)[:3]
+
+
+def _run_simulation(context):
+    G, (status, infection_day, hospitalization_day) = context
+    # simulate_sihrd updates its input dicts, so every repeat gets fresh copies
+    simulate_sihrd(G, dict(status), dict(infection_day), dict(hospitalization_day), BENCHMARK_PARAMS, seed=SEED)
+
+
+def _setup_vectorized(nodes, degree, workdir):
+    csr = _csr_graph(nodes, degree)
+    return (csr,) + seed_infections(nodes, PERCENT_INFECTED, seed=SEED)
+
+
+def _run_vectorized(context):
+    csr, state, infection_day, hospitalization_day = context
+    simulate_sihrd_vectorized(csr, state, infection_day, hospitalization_day, BENCHMARK_PARAMS, seed=SEED,
+                              history=False)
+
+
+def _setup_jit(nodes, degree, workdir):
+    from simulation.sihrd_jit import JIT_AVAILABLE
+    if not JIT_AVAILABLE:
+        raise RuntimeError("numba is not installed")
+    context = _setup_vectorized(nodes, degree, workdir)
+    # Compile (or load the cached kernel) outside the measurement
+    csr, state, infection_day, hospitalization_day = context
+    simulate_sihrd_vectorized(csr, state, infection_day, hospitalization_day, dict(BENCHMARK_PARAMS, max_days=2),
+                              seed=SEED, history=False, kernel='jit')
+    return context
+
+
+def _run_jit(context):
+    csr, state, infection_day, hospitalization_day = context
+    simulate_sihrd_vectorized(csr, state, infection_day, hospitalization_day, BENCHMARK_PARAMS, seed=SEED,
+                              history=False, kernel='jit')
+
+
+def _run_gillespie(context):
+    csr, state, infection_day, hospitalization_day = context
+    simulate_sihrd_gillespie(csr, state, infection_day, hospitalization_day, BENCHMARK_PARAMS, seed=SEED,
+                             history=False)
+
+
+def _setup_render(nodes, degree, workdir):
+    csr = _csr_graph(nodes, degree)
+    # The layout has its own stage
+    positions = compute_layout(csr, seed=SEED)
+    return csr, _status_history(csr), positions, os.path.join(workdir, 'spread.gif')
+
+
+def _run_render(context):
+    csr, history, positions, path = context
+    render_spread(csr, history, pos=positions).save(path, fps=5, workers=1)
+
+
+def _setup_animate(nodes, degree, workdir):
+    from visualization.enhanced_plot import animate_spread
+    G = _networkx_graph(nodes, degree)
+    return animate_spread, G, _status_history(to_csr(G)), os.path.join(workdir, 'spread.gif')
+
+
+def _run_animate(context):
+    import matplotlib.pyplot as plt
+    animate_spread, G, history, path = context
+    animate_spread(G, history).save(path, writer='pillow', fps=5)
+    plt.close('all')
+
+
+# name -> (setup(nodes, degree, workdir) -> context, run(context), largest node count or None)
+STAGES = {
+    'generate_networkx': (lambda n, d, w: (n, d),
+                          lambda c: generate_social_network(*c, seed=SEED), 100000),
+    'generate_csr': (lambda n, d, w: (n, d),
+                     lambda c: generate_social_network_csr(*c, seed=SEED), None),
+    'initialize_attributes': (lambda n, d, w: generate_social_network_csr(n, d, seed=SEED),
+                              lambda c: initialize_attributes(c, seed=SEED), None),
+    'to_csr': (lambda n, d, w: _networkx_graph(n, d), to_csr, 100000),
+    'save_network_gml': (lambda n, d, w: (_networkx_graph(n, d), os.path.join(w, 'network.gml')),
+                         lambda c: save_network(*c), 100000),
+    'save_graph_binary': (lambda n, d, w: (_csr_graph(n, d), os.path.join(w, 'store')),
+                          lambda c: save_graph_binary(*c), None),
+    'load_graph_binary': (lambda n, d, w: save_graph_binary(_csr_graph(n, d), os.path.join(w, 'store'))
+                          or os.path.join(w, 'store'),
+                          lambda c: load_graph_binary(c, mmap=False), None),
+    'simulate_sihrd': (_setup_simulation, _run_simulation, 100000),
+    'simulate_sihrd_vectorized': (_setup_vectorized, _run_vectorized, None),
+    'simulate_sihrd_jit': (_setup_jit, _run_jit, None),
+    'simulate_sihrd_gillespie': (_setup_vectorized, _run_gillespie, 100000),
+    'layout': (lambda n, d, w: _csr_graph(n, d), lambda c: compute_layout(c, seed=SEED), None),
+    'render_spread': (_setup_render, _run_render, None),
+    'animate_spread': (_setup_animate, _run_animate, 10000),
+}
+
+
+def _rss_bytes(field):
+    """VmRSS or VmHWM (peak) of this process from /proc, or None elsewhere."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _reset_peak_rss():
+    """Reset VmHWM to the current RSS (Linux); returns False where unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def run_case(stage, nodes, degree, repeats=3, trace_allocations=True):
+    """
+    Measure one stage at one size; meant to run in a fresh process.
+
+    The setup (building the input graph and state) is excluded from every
+    measurement. Wall times come from ``repeats`` plain runs. Peak RSS is
+    the high-water mark above the post-setup RSS during the first run.
+    Allocations come from one extra run under tracemalloc, which slows
+    Python code down and is therefore never timed.
+
+    Returns:
+    dict: One result record.
+    """
+    setup, run, _ = STAGES[stage]
+    record = {'stage': stage, 'nodes': nodes, 'degree': degree, 'status': 'ok'}
+    # Progress messages of the stages would drown the results
+    with tempfile.TemporaryDirectory() as workdir, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        context = setup(nodes, degree, workdir)
+
+        peak_reset = _reset_peak_rss()
+        rss_before = _rss_bytes('VmRSS')
+        max_rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        wall_times = []
+        for repeat in range(repeats):
+            start = time.perf_counter()
+            run(context)
+            wall_times.append(time.perf_counter() - start)
+            if repeat == 0:
+                if peak_reset and rss_before is not None:
+                    record['peak_rss_bytes'] = _rss_bytes('VmHWM') - rss_before
+                else:
+                    # Only growth of the lifetime peak is visible without /proc
+                    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+                    record['peak_rss_bytes'] = max(0, max_rss - max_rss_before)
+        record['wall_time'] = min(wall_times)
+        record['wall_times'] = wall_times
+
+        if trace_allocations:
+            tracemalloc.start()
+            run(context)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            record['traced_peak_bytes'] = peak
+            record['traced_retained_bytes'] = current
+    return record
+
+
+def run_suite(stages, sizes, degrees, repeats=3, trace_allocations=True, log=print):
+    """
+    Run every (stage, size, degree) case in its own spawned process.
+
+    Returns:
+    list: Result records; failed cases carry an 'error' message and skipped
+        ones the reason.
+    """
+    results = []
+    for stage in stages:
+        max_nodes = STAGES[stage][2]
+        for nodes in sizes:
+            for degree in degrees:
+                if max_nodes is not None and nodes > max_nodes:
+                    results.append({'stage': stage, 'nodes': nodes, 'degree': degree, 'status': 'skipped',
+                                    'reason': f"stage is limited to {max_nodes} nodes"})
+                    continue
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                    try:
+                        record = pool.submit(run_case, stage, nodes, degree, repeats, trace_allocations).result()
+                    except Exception as e:
+                        record = {'stage': stage, 'nodes': nodes, 'degree': degree, 'status': 'failed',
+                                  'error': f"{type(e).__name__}: {e}"}
+                results.append(record)
+                log(format_record(record))
+    return results
+
+
+def format_record(record):
+    label = f"{record['stage']:<26} n={record['nodes']:<8} degree={record['degree']:<3}"
+    if record['status'] != 'ok':
+        return f"{label} {record['status']}: {record.get('reason') or record.get('error')}"
+    text = f"{label} {record['wall_time']:10.4f} s  peak RSS {record['peak_rss_bytes'] / 2 ** 20:9.1f} MB"
+    if 'traced_peak_bytes' in record:
+        text += f"  traced peak {record['traced_peak_bytes'] / 2 ** 20:9.1f} MB"
+    return text
+
+
+def environment():
+    """Machine and library versions stored with the results."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare_results(baseline, current, time_threshold=0.2, memory_threshold=0.2, min_time=0.05):
+    """
+    Compare two result files case by case.
+
+    A case regresses when its wall time grows by more than
+    ``time_threshold`` (and by at least ``min_time`` seconds, to ignore
+    timer noise on tiny cases) or its peak RSS by more than
+    ``memory_threshold``.
+
+    Returns:
+    list: (stage, nodes, degree, metric, baseline value, current value,
+        relative change, regressed) rows for every case present in both.
+    """
+    key = lambda record: (record['stage'], record['nodes'], record['degree'])
+    old = {key(record): record for record in baseline['results'] if record['status'] == 'ok'}
+    rows = []
+    for record in current['results']:
+        base = old.get(key(record))
+        if base is None or record['status'] != 'ok':
+            continue
+        for metric, threshold, floor in (('wall_time', time_threshold, min_time),
+                                         ('peak_rss_bytes', memory_threshold, 2 ** 20)):
+            before, after = base[metric], record[metric]
+            change = (after - before) / before if before else 0.0
+            regressed = change > threshold and after - before > floor
+            rows.append(key(record) + (metric, before, after, change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Run the benchmarks and write JSON results")
+    run.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    run.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES))
+    run.add_argument('--degrees', nargs='+', type=int, default=list(DEFAULT_DEGREES),
+                     help="Edges attached per new node (average degree is twice this)")
+    run.add_argument('--repeats', type=int, default=3)
+    run.add_argument('--no-tracemalloc', action='store_true', help="Skip the allocation tracing run")
+    run.add_argument('--output', default=os.path.join('benchmarks', 'results.json'))
+
+    compare = commands.add_parser('compare', help="Flag regressions against a baseline result file")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--time-threshold', type=float, default=0.2, help="Allowed relative wall time growth")
+    compare.add_argument('--memory-threshold', type=float, default=0.2, help="Allowed relative peak RSS growth")
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        results = run_suite(args.stages, args.sizes, args.degrees, args.repeats, not args.no_tracemalloc)
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare_results(baseline, current, args.time_threshold, args.memory_threshold)
+    for stage, nodes, degree, metric, before, after, change, regressed in rows:
+        flag = 'REGRESSION' if regressed else ''
+        print(f"{stage:<26} n={nodes:<8} degree={degree:<3} {metric:<15} {before:14.4g} -> {after:14.4g} "
+              f"{change:+8.1%} {flag}")
+    regressions = sum(row[-1] for row in rows)
+    print(f"{len(rows)} comparisons, {regressions} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
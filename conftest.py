@@ -0,0 +1 @@
+# Lets pytest import the top-level packages (network, simulation, ...) from the repository root
@@ -1,24 +1,31 @@
 # main.py
 from network.generate_network import generate_social_network, save_network
-from visualization.enhanced_plot import create_network_plot, plot_sihrd_timeline, create_age_distribution_plot, animate_spread
+from visualization.enhanced_plot import create_static_network, plot_sihrd_timeline, create_age_distribution_plot, animate_spread, plot_ensemble_bands
 from simulation.sihrd_model import initialize_population, simulate_sihrd
+from simulation.ensemble import run_ensemble
 import matplotlib.pyplot as plt
+import numpy as np
+
+SEED = 42
 
 def main():
+    network_seed, population_seed, ensemble_seed = np.random.SeedSequence(SEED).spawn(3)
+
     # Step 1: Generate social network
     print("Generating social network...")
-    G = generate_social_network(n=500, avg_degree=10)
+    G = generate_social_network(num_nodes=500, edges_per_node=5, seed=network_seed)
     save_network(G)
 
     # Step 2: Initialize population with enhanced attributes
     print("Initializing population...")
+    rng = np.random.default_rng(population_seed)
     status, infection_day, hospitalization_day, infected_nodes = initialize_population(
-        G, percent_infected=0.01
+        G, percent_infected=0.01, seed=rng
     )
 
     # Step 3: Initial network visualization
     print("Creating initial visualization...")
-    fig = create_network_plot(G, status, "Initial Network State")
+    fig = create_static_network(G)
     plt.show()
 
     # Step 4: Simulate infection spread with SIHRD model
@@ -37,23 +44,32 @@ def main():
         status, 
         infection_day,
         hospitalization_day,
-        params
+        params,
+        seed=rng
     )
 
-    # Step 5: Create and display visualizations
+    # Step 5: Monte Carlo ensemble for uncertainty bands
+    print("Running Monte Carlo ensemble...")
+    bands = run_ensemble(G, params, n_replicates=200, percent_infected=0.01, seed=ensemble_seed)
+
+    # Step 6: Create and display visualizations
     print("Generating final visualizations...")
     
     # Plot SIHRD timeline
     timeline_fig = plot_sihrd_timeline(timeline)
     timeline_fig.show()
     
+    # Plot ensemble uncertainty bands
+    ensemble_fig = plot_ensemble_bands(bands)
+    ensemble_fig.show()
+    
     # Create demographic analysis
-    demo_fig = create_age_distribution_plot(G, status)
+    demo_fig = create_age_distribution_plot(G, status_history)
     demo_fig.show()
     
     # Create and save animation
-    anim = animate_spread(G, status_history)
-    anim.save('disease_spread.gif', writer='pillow', fps=5)
+    anim = animate_spread(G, status_history, export=True)
+    anim.save('disease_spread.gif', fps=5)
     
     print("Simulation complete! Check the output files for visualizations.")
 
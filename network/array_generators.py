@@ -0,0 +1,129 @@
+import numpy as np
+
+
+def _index_dtype(size):
+    return np.int32 if size < np.iinfo(np.int32).max else np.int64
+
+
+def _unique_pairs(num_nodes, sources, targets):
+    """Drop self-loops and repeated undirected edges."""
+    low, high = np.minimum(sources, targets), np.maximum(sources, targets)
+    keep = low != high
+    keys = np.unique(low[keep].astype(np.int64) * num_nodes + high[keep])
+    dtype = _index_dtype(num_nodes)
+    return (keys // num_nodes).astype(dtype), (keys % num_nodes).astype(dtype)
+
+
+def barabasi_albert_edges(num_nodes, edges_per_node, rng):
+    """
+    Barabási-Albert edge list built with NumPy arrays.
+
+    Follows the NetworkX construction: start from a star on
+    ``edges_per_node + 1`` nodes, then attach every new node to
+    ``edges_per_node`` distinct existing nodes chosen with probability
+    proportional to degree. Preferential attachment uses the Batagelj-Brandes
+    trick: the endpoint list of all previous edges is the degree-weighted
+    population, so a target is a copy of a uniformly chosen earlier
+    endpoint. Copies of copies are resolved by pointer jumping.
+
+    Parameters:
+    num_nodes (int): Number of nodes.
+    edges_per_node (int): Edges attached from each new node.
+    rng (numpy.random.Generator): Random source.
+
+    Returns:
+    tuple: (sources, targets) arrays with one entry per edge.
+    """
+    m = edges_per_node
+    if m < 1 or m >= num_nodes:
+        raise ValueError(f"edges_per_node must be in [1, {num_nodes}), got {m}")
+
+    num_edges = m + (num_nodes - m - 1) * m
+    dtype = _index_dtype(2 * num_edges)
+    # Endpoint slots: slot 2e is the source of edge e, slot 2e + 1 its target
+    endpoints = np.empty(2 * num_edges, dtype=dtype)
+    endpoints[0:2 * m:2] = 0
+    endpoints[1:2 * m:2] = np.arange(1, m + 1)
+    new_nodes = np.repeat(np.arange(m + 1, num_nodes, dtype=dtype), m)
+    endpoints[2 * m::2] = new_nodes
+
+    # Each new node may copy any endpoint recorded before its first edge
+    prefix = 2 * (m + (new_nodes - m - 1).astype(np.int64) * m)
+    copied_from = np.arange(2 * num_edges, dtype=dtype)
+    copied_from[2 * m + 1::2] = (rng.random(len(new_nodes)) * prefix).astype(dtype)
+
+    # Source slots and the initial star's targets hold known nodes
+    is_known = lambda slots: (slots % 2 == 0) | (slots < 2 * m)
+
+    while True:
+        # Follow copies of copies until every target slot reaches a known slot
+        pointer = copied_from.copy()
+        pending = np.flatnonzero(~is_known(pointer))
+        while len(pending):
+            pointer[pending] = pointer[pointer[pending]]
+            pending = pending[~is_known(pointer[pending])]
+        sources, targets = endpoints[0::2], endpoints[pointer[1::2]]
+
+        # NetworkX picks distinct targets per node; redraw repeated ones and
+        # resolve again so later copies of those slots follow the new target
+        keys = sources.astype(np.int64) * num_nodes + targets
+        order = np.argsort(keys, kind='stable')
+        repeated = order[1:][keys[order][1:] == keys[order][:-1]]
+        if not len(repeated):
+            break
+        copied_from[2 * repeated + 1] = (rng.random(len(repeated)) * prefix[repeated - m]).astype(dtype)
+
+    return sources, targets
+
+
+def erdos_renyi_edges(num_nodes, average_degree, rng):
+    """
+    Erdős-Rényi G(n, p) edge list with ``p = average_degree / (n - 1)``.
+
+    The number of edges is drawn from the binomial distribution of G(n, p)
+    and that many distinct node pairs are sampled uniformly.
+
+    Returns:
+    tuple: (sources, targets) arrays with one entry per edge.
+    """
+    num_pairs = num_nodes * (num_nodes - 1) // 2
+    num_edges = rng.binomial(num_pairs, min(1.0, average_degree / max(1, num_nodes - 1)))
+    dtype = _index_dtype(num_nodes)
+    sources = np.empty(0, dtype=dtype)
+    targets = np.empty(0, dtype=dtype)
+    while len(sources) < num_edges:
+        missing = num_edges - len(sources)
+        # Oversample a little to make up for self-loops and repeats
+        draw = int(missing * 1.05) + 16
+        sources, targets = _unique_pairs(
+            num_nodes,
+            np.concatenate((sources, rng.integers(0, num_nodes, draw, dtype=dtype))),
+            np.concatenate((targets, rng.integers(0, num_nodes, draw, dtype=dtype)))
+        )
+    keep = rng.permutation(len(sources))[:num_edges]
+    return sources[keep], targets[keep]
+
+
+def power_law_degrees(num_nodes, min_degree, rng, exponent=3.0):
+    """Degree sequence with the ``k^-exponent`` tail of a Barabási-Albert graph."""
+    degrees = np.floor(min_degree * (1 - rng.random(num_nodes)) ** (-1 / (exponent - 1)))
+    return np.minimum(degrees, num_nodes - 1).astype(np.int64)
+
+
+def configuration_model_edges(degrees, rng):
+    """
+    Erased configuration-model edge list for a degree sequence.
+
+    Stubs are paired uniformly at random; self-loops and repeated edges
+    are then dropped, so high-degree nodes may end slightly below their
+    target degree.
+
+    Returns:
+    tuple: (sources, targets) arrays with one entry per edge.
+    """
+    degrees = np.asarray(degrees, dtype=np.int64)
+    stubs = np.repeat(np.arange(len(degrees), dtype=_index_dtype(len(degrees))), degrees)
+    rng.shuffle(stubs)
+    if len(stubs) % 2:
+        stubs = stubs[:-1]
+    return _unique_pairs(len(degrees), stubs[0::2], stubs[1::2])
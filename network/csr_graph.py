@@ -0,0 +1,150 @@
+import hashlib
+import numpy as np
+
+NODE_ATTRIBUTES = ('age', 'vaccinated', 'risk_factor')
+
+
+class CSRGraph:
+    """
+    Compressed sparse row view of an undirected social network.
+
+    Node ``i`` is adjacent to ``indices[indptr[i]:indptr[i + 1]]``. Node
+    attributes are stored as parallel arrays indexed the same way, and
+    ``nodes`` maps array positions back to the original NetworkX labels.
+    """
+
+    def __init__(self, indptr, indices, nodes=None, age=None, vaccinated=None, risk_factor=None):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.num_nodes = len(self.indptr) - 1
+        self.nodes = range(self.num_nodes) if nodes is None else list(nodes)
+        self.age = age
+        self.vaccinated = vaccinated
+        self.risk_factor = risk_factor
+
+    @property
+    def num_edges(self):
+        """Number of undirected edges (each edge is stored twice)."""
+        return len(self.indices) // 2
+
+    def degree(self):
+        """Degree of every node as an array."""
+        return np.diff(self.indptr)
+
+    def node_index(self):
+        """Map from NetworkX node label to array position."""
+        return {node: i for i, node in enumerate(self.nodes)}
+
+    def neighbor_sum(self, values):
+        """
+        Sum ``values`` over the neighbourhood of every node.
+
+        This is the sparse product ``A @ values`` computed with a prefix sum
+        over the CSR column array, so nodes without neighbours get zero.
+        ``values`` may be ``(N,)`` or a batch ``(R, N)``; the product is taken
+        along the last axis for all rows at once.
+        """
+        accumulator = np.int64 if len(self.indices) >= np.iinfo(np.int32).max else np.int32
+        gathered = values[..., self.indices]
+        totals = np.zeros(gathered.shape[:-1] + (len(self.indices) + 1,),
+                          dtype=np.result_type(values.dtype, accumulator))
+        np.cumsum(gathered, axis=-1, out=totals[..., 1:])
+        return totals[..., self.indptr[1:]] - totals[..., self.indptr[:-1]]
+
+    def fingerprint(self):
+        """
+        Content hash of the adjacency and risk factors.
+
+        Two graphs with the same fingerprint produce the same simulation
+        results for the same params and seed.
+        """
+        digest = hashlib.sha256()
+        for array in (self.indptr, self.indices, self.risk_factor):
+            if array is not None:
+                digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def structure_fingerprint(self):
+        """Content hash of the adjacency only, for results that ignore node attributes."""
+        digest = hashlib.sha256()
+        for array in (self.indptr, self.indices):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def neighbors_of(self, nodes):
+        """
+        Concatenated neighbour lists of ``nodes``.
+
+        Returns:
+        tuple: (degree of each node in ``nodes``, neighbour array), so that
+            ``np.repeat(nodes, degrees)`` pairs every neighbour with its source.
+        """
+        starts = self.indptr[nodes]
+        degrees = self.indptr[np.asarray(nodes) + 1] - starts
+        ends = np.cumsum(degrees)
+        total = int(ends[-1]) if len(ends) else 0
+        positions = np.arange(total) + np.repeat(starts - (ends - degrees), degrees)
+        return degrees, self.indices[positions]
+
+    def neighbor_count(self, mask):
+        """
+        Number of neighbours of every node for which ``mask`` is True.
+
+        Equivalent to ``neighbor_sum(mask)`` but scatters from the True
+        entries only, so it is much cheaper when the mask is sparse. ``mask``
+        may be ``(N,)`` or a batch ``(R, N)``.
+        """
+        flat = np.flatnonzero(mask)
+        nodes = flat % self.num_nodes
+        degrees, neighbors = self.neighbors_of(nodes)
+        targets = neighbors + np.repeat(flat - nodes, degrees)
+        return np.bincount(targets, minlength=mask.size).reshape(mask.shape)
+
+
+def from_edges(num_nodes, sources, targets):
+    """
+    Build a CSRGraph from an undirected edge list.
+
+    Parameters:
+    num_nodes (int): Number of nodes, labelled 0..num_nodes-1.
+    sources, targets (numpy.ndarray): Edge endpoints; each edge is listed once.
+
+    Returns:
+    CSRGraph: Adjacency with both directions of every edge, neighbours in
+        ascending order.
+    """
+    rows = np.concatenate((sources, targets))
+    columns = np.concatenate((targets, sources))
+    order = np.argsort(rows.astype(np.int64) * num_nodes + columns)
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+    return CSRGraph(indptr, columns[order])
+
+def to_csr(G):
+    """
+    Convert a NetworkX graph to a CSRGraph.
+
+    Parameters:
+    G (networkx.Graph): Graph to convert. Node attributes set by
+        initialize_population are copied into float32/bool/int arrays.
+
+    Returns:
+    CSRGraph: CSR adjacency plus attribute columns in ``G.nodes()`` order.
+    """
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    degrees = np.fromiter((G.degree(node) for node in nodes), dtype=np.int64, count=len(nodes))
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+    indices = np.fromiter(
+        (index[neighbor] for node in nodes for neighbor in G.neighbors(node)),
+        dtype=np.int32,
+        count=int(indptr[-1])
+    )
+
+    columns = {}
+    for name, dtype in zip(NODE_ATTRIBUTES, (np.int16, np.bool_, np.float32)):
+        if nodes and all(name in G.nodes[node] for node in nodes):
+            columns[name] = np.fromiter((G.nodes[node][name] for node in nodes), dtype=dtype, count=len(nodes))
+
+    return CSRGraph(indptr, indices, nodes=nodes, **columns)
@@ -2,49 +2,118 @@ import networkx as nx
 import matplotlib.pyplot as plt
 import random
 import os
+import numpy as np
+from network.array_generators import (
+    barabasi_albert_edges,
+    configuration_model_edges,
+    erdos_renyi_edges,
+    power_law_degrees
+)
+from network.csr_graph import CSRGraph, from_edges
+from network.graph_store import csr_to_networkx, load_graph_binary, save_graph_binary
 
 NUM_NODES=3000
 EDGES_PER_NODE=5
 
-def generate_social_network(num_nodes=NUM_NODES, edges_per_node=EDGES_PER_NODE):
+def generate_social_network(num_nodes=NUM_NODES, edges_per_node=EDGES_PER_NODE, seed=None):
     """
     Generate a random social network using the Barabási-Albert model.
     
     Parameters:
     num_nodes (int): Number of nodes in the network.
     edges_per_node (int): Number of edges to attach from a new node to existing nodes.
+    seed (int, SeedSequence or numpy.random.Generator, optional): Seed of the random generator.
     
     Returns:
     G (networkx.Graph): Generated social network graph.
     """
     print(f"Generating a social network with {num_nodes} nodes and {edges_per_node} edges per node...")
     # Create a Barabási-Albert graph
-    G = nx.barabasi_albert_graph(num_nodes, edges_per_node)
+    G = nx.barabasi_albert_graph(num_nodes, edges_per_node, seed=np.random.default_rng(seed))
     
     return G
 
+def generate_social_network_csr(num_nodes=NUM_NODES, edges_per_node=EDGES_PER_NODE,
+                                model="barabasi_albert", seed=None):
+    """
+    Generate a social network directly as CSR arrays, without NetworkX.
+    
+    Suitable for populations of millions of nodes. The Barabási-Albert mode
+    reproduces the degree distribution of generate_social_network.
+    
+    Parameters:
+    num_nodes (int): Number of nodes in the network.
+    edges_per_node (int): Edges attached from each new node. The other
+        models use the same mean degree, ``2 * edges_per_node``.
+    model (str): "barabasi_albert", "erdos_renyi" or "configuration"
+        (erased configuration model with a power-law degree sequence).
+    seed (int, optional): Seed of the random generator.
+    
+    Returns:
+    CSRGraph: The generated network.
+    """
+    print(f"Generating a {model} network with {num_nodes} nodes and {edges_per_node} edges per node...")
+    rng = np.random.default_rng(seed)
+    if model == "barabasi_albert":
+        sources, targets = barabasi_albert_edges(num_nodes, edges_per_node, rng)
+    elif model == "erdos_renyi":
+        sources, targets = erdos_renyi_edges(num_nodes, 2 * edges_per_node, rng)
+    elif model == "configuration":
+        degrees = power_law_degrees(num_nodes, edges_per_node, rng)
+        sources, targets = configuration_model_edges(degrees, rng)
+    else:
+        raise ValueError(f"Unknown network model '{model}'")
+    
+    return from_edges(num_nodes, sources, targets)
+
 def save_network(G, path="network/social_network.gml"):
     """
     Save the generated network to a file.
     
     Parameters:
-    G (networkx.Graph): The graph to save.
-    path (str): The file path to save the graph.
+    G (networkx.Graph or CSRGraph): The graph to save.
+    path (str): The file path to save the graph. Paths ending in ``.gml``
+        are written as GML; any other path is written as a binary graph
+        store directory that load_network can memory-map. A CSRGraph
+        saved as GML is converted to NetworkX first.
     """
     print(f"Saving the network to {path}...")
+    if not path.endswith('.gml'):
+        save_graph_binary(G, path)
+        print(f"Network saved successfully to {path}.")
+        return
+
     # Ensure the directory exists
     os.makedirs(os.path.dirname(path), exist_ok=True)
     
     # Save the graph in GML format
+    if isinstance(G, CSRGraph):
+        G = csr_to_networkx(G)
     nx.write_gml(G, path)
     print(f"Network saved successfully to {path}.")
 
+def load_network(path="network/social_network.gml"):
+    """
+    Load a network saved by save_network.
+    
+    Parameters:
+    path (str): A ``.gml`` file or a binary graph store directory.
+    
+    Returns:
+    networkx.Graph for GML files, or a memory-mapped CSRGraph for binary stores.
+    """
+    if path.endswith('.gml'):
+        return nx.read_gml(path, destringizer=int)
+    return load_graph_binary(path)
+
 if __name__ == "__main__":
     # Generate the social network
     G= generate_social_network()
     save_network(G)
 
-    pos = nx.spring_layout(G, seed=42)
+    # Imported here so the network package does not depend on the visualization layer
+    from visualization.layout import layout_dict
+    pos = layout_dict(G)
     plt.figure(figsize=(8, 8))
     nx.draw(G, pos, node_size=10, node_color='gray')
     plt.title("Generated Social Network (Barabási-Albert Model)")
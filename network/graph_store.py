@@ -0,0 +1,100 @@
+import json
+import os
+import networkx as nx
+import numpy as np
+from network.csr_graph import NODE_ATTRIBUTES, CSRGraph, to_csr
+
+FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+
+
+def save_graph_binary(graph, path):
+    """
+    Save a graph as a directory of raw ``.npy`` arrays.
+
+    The store holds the CSR ``indptr``/``indices`` arrays, one column per
+    node attribute (age, vaccinated, risk_factor) and, only when the node
+    labels are not simply ``0..N-1``, a ``nodes`` column. Every array can be
+    memory-mapped by load_graph_binary.
+
+    Parameters:
+    graph (networkx.Graph or CSRGraph): The graph to save.
+    path (str): Directory to write, created if needed.
+    """
+    csr = graph if isinstance(graph, CSRGraph) else to_csr(graph)
+    os.makedirs(path, exist_ok=True)
+
+    np.save(os.path.join(path, 'indptr.npy'), csr.indptr)
+    np.save(os.path.join(path, 'indices.npy'), csr.indices)
+    columns = []
+    for name in NODE_ATTRIBUTES:
+        values = getattr(csr, name)
+        if values is not None:
+            np.save(os.path.join(path, name + '.npy'), np.asarray(values))
+            columns.append(name)
+
+    labels = np.asarray(csr.nodes)
+    has_labels = not (labels.dtype.kind in 'iu' and np.array_equal(labels, np.arange(csr.num_nodes)))
+    if has_labels:
+        if labels.dtype == object:
+            labels = labels.astype(str)
+        np.save(os.path.join(path, 'nodes.npy'), labels)
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'num_nodes': csr.num_nodes,
+        'num_edges': csr.num_edges,
+        'columns': columns,
+        'labels': has_labels
+    }
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_graph_binary(path, mmap=True):
+    """
+    Load a graph saved by save_graph_binary.
+
+    Parameters:
+    path (str): Directory of the binary store.
+    mmap (bool): Memory-map the arrays (read-only) instead of reading them,
+        so loading is near-instant and processes share the page cache.
+
+    Returns:
+    CSRGraph: The graph with its attribute columns.
+    """
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported graph store version {meta['format_version']} in {path}")
+
+    mmap_mode = 'r' if mmap else None
+    load = lambda name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+    columns = {name: load(name) for name in meta['columns']}
+    nodes = load('nodes').tolist() if meta['labels'] else None
+    return CSRGraph(load('indptr'), load('indices'), nodes=nodes, **columns)
+
+
+def csr_to_networkx(csr):
+    """Build a NetworkX graph, with node attributes, from a CSRGraph."""
+    G = nx.Graph()
+    for i, node in enumerate(csr.nodes):
+        attributes = {name: getattr(csr, name)[i].item() for name in NODE_ATTRIBUTES
+                      if getattr(csr, name) is not None}
+        G.add_node(node, **attributes)
+    sources = np.repeat(np.arange(csr.num_nodes), csr.degree())
+    upper = sources <= csr.indices
+    G.add_edges_from(
+        (csr.nodes[u], csr.nodes[v]) for u, v in zip(sources[upper].tolist(), csr.indices[upper].tolist())
+    )
+    return G
+
+
+def gml_to_binary(gml_path, path):
+    """Convert a GML file into a binary graph store."""
+    save_graph_binary(nx.read_gml(gml_path, destringizer=int), path)
+
+
+def binary_to_gml(path, gml_path):
+    """Convert a binary graph store into a GML file."""
+    nx.write_gml(csr_to_networkx(load_graph_binary(path, mmap=False)), gml_path)
@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import numpy as np
+
+CHECKPOINT_VERSION = 1
+STATE_ARRAYS = ('state', 'infection_day', 'hospitalization_day')
+
+
+def rng_state(rng):
+    """JSON-serializable state of a numpy Generator."""
+    return json.dumps(rng.bit_generator.state)
+
+
+def restore_rng(state):
+    """Rebuild the Generator whose state was saved by rng_state."""
+    state = json.loads(state)
+    bit_generator = getattr(np.random, state['bit_generator'])()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
+
+
+def snapshot(day, state, infection_day, hospitalization_day, rng, timeline, fingerprint, params):
+    """
+    Copy everything needed to resume a simulation at the start of ``day``.
+
+    The copies are plain memory copies, so taking a snapshot costs far
+    less than a simulated day and the engine can keep mutating its arrays
+    while the snapshot is written.
+    """
+    return {
+        'day': day,
+        'state': state.copy(),
+        'infection_day': infection_day.copy(),
+        'hospitalization_day': hospitalization_day.copy(),
+        'timeline': {key: list(values) for key, values in timeline.items()},
+        'rng_state': rng_state(rng),
+        'fingerprint': fingerprint,
+        'params': params
+    }
+
+
+def save_checkpoint(path, checkpoint):
+    """
+    Write a snapshot as an uncompressed ``.npz`` file.
+
+    The file is written next to ``path`` and moved over it once complete,
+    so an interrupted write never replaces the previous checkpoint.
+    """
+    meta = {
+        'version': CHECKPOINT_VERSION,
+        'day': checkpoint['day'],
+        'timeline_keys': list(checkpoint['timeline']),
+        'rng_state': checkpoint['rng_state'],
+        'fingerprint': checkpoint['fingerprint'],
+        'params': checkpoint['params']
+    }
+    timeline = np.array(list(checkpoint['timeline'].values()), dtype=np.int64).reshape(len(meta['timeline_keys']), -1)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            meta=np.frombuffer(json.dumps(meta, default=lambda value: value.item()).encode(), dtype=np.uint8),
+            timeline=timeline,
+            **{name: checkpoint[name] for name in STATE_ARRAYS}
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint written by save_checkpoint.
+
+    Returns:
+    dict: Same keys as snapshot(), with the RNG state left serialized
+        (see restore_rng).
+    """
+    with np.load(path) as data:
+        meta = json.loads(data['meta'].tobytes())
+        if meta['version'] != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {meta['version']} in {path}")
+        checkpoint = {name: data[name] for name in STATE_ARRAYS}
+        timeline = data['timeline']
+    checkpoint['timeline'] = {key: timeline[i].tolist() for i, key in enumerate(meta['timeline_keys'])}
+    checkpoint.update((key, meta[key]) for key in ('day', 'rng_state', 'fingerprint', 'params'))
+    return checkpoint
+
+
+class CheckpointWriter:
+    """
+    Background thread that writes snapshots with save_checkpoint.
+
+    submit() only hands the snapshot over, so the daily loop never waits on
+    the disk. If a write is still running when the next snapshot arrives,
+    the older pending snapshot is replaced: only the latest state matters.
+    close() writes whatever is pending and re-raises any write error.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pending = None
+        self._closed = False
+        self._error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, checkpoint):
+        with self._condition:
+            if self._error is not None:
+                raise self._error
+            self._pending = checkpoint
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                checkpoint, self._pending = self._pending, None
+            try:
+                save_checkpoint(self.path, checkpoint)
+            except Exception as e:
+                with self._condition:
+                    self._error = e
+                return
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
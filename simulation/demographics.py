@@ -0,0 +1,111 @@
+import numpy as np
+from network.csr_graph import CSRGraph
+from simulation.history import StatusHistory
+from simulation.sihrd_model import Status
+
+AGE_GROUPS = ((0, 20), (21, 40), (41, 60), (61, 80), (81, 100))
+# Status values counted as active cases by the rate tables
+ACTIVE_STATUSES = (Status.INFECTED.value, Status.HOSPITALIZED.value)
+RISK_BINS = 20
+
+
+def node_demographics(G, nodes):
+    """
+    Age, vaccination and risk factor arrays of ``nodes``, in that order.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): Network with the attributes set by
+        initialize_attributes.
+    nodes (list): Node order of the returned arrays.
+
+    Returns:
+    tuple: (age int64, vaccinated bool, risk_factor float64)
+    """
+    if isinstance(G, CSRGraph):
+        if list(G.nodes) == list(nodes):
+            columns = np.arange(G.num_nodes)
+        else:
+            index = G.node_index()
+            columns = np.array([index[node] for node in nodes], dtype=np.int64)
+        return (np.asarray(G.age, dtype=np.int64)[columns], np.asarray(G.vaccinated, dtype=bool)[columns],
+                np.asarray(G.risk_factor, dtype=np.float64)[columns])
+    return tuple(
+        np.fromiter((G.nodes[node][name] for node in nodes), dtype=dtype, count=len(nodes))
+        for name, dtype in (('age', np.int64), ('vaccinated', bool), ('risk_factor', np.float64))
+    )
+
+
+class DemographicTable:
+    """
+    Node counts by age, vaccination and status, kept up to date as states change.
+
+    All breakdowns shown by create_age_distribution_plot are sums over one
+    ``(ages, 2, statuses)`` count table, built with a single bincount.
+    update() only re-counts the nodes whose status changed, so a running
+    simulation can keep the table current for a dashboard to read at any
+    time.
+    """
+
+    def __init__(self, age, vaccinated, risk_factor, state):
+        """
+        Parameters:
+        age, vaccinated, risk_factor (numpy.ndarray): Per-node attributes.
+        state (numpy.ndarray): Status value of every node, in the same order.
+        """
+        self.num_ages = int(age.max()) + 1 if len(age) else 1
+        # Table cell of every node, without the status
+        self.cells = (age.astype(np.int64) * 2 + vaccinated) * len(Status)
+        self.state = np.array(state, dtype=np.uint8)
+        self.counts = np.bincount(self.cells + self.state, minlength=self.num_ages * 2 * len(Status))
+        self.risk_counts, self.risk_edges = np.histogram(risk_factor, bins=RISK_BINS)
+
+    @classmethod
+    def from_graph(cls, G, status):
+        """
+        Build the table of a population state.
+
+        ``status`` is a node -> Status dict or a StatusHistory, in which
+        case the last recorded day is used.
+        """
+        if isinstance(status, StatusHistory):
+            nodes, state = status.nodes, status[-1]
+        else:
+            nodes = list(status)
+            state = np.fromiter((s.value for s in status.values()), dtype=np.uint8, count=len(nodes))
+        return cls(*node_demographics(G, nodes), state)
+
+    def update(self, state):
+        """Move the nodes whose status differs from ``state`` to their new cells."""
+        changed = np.flatnonzero(state != self.state)
+        if len(changed):
+            size = len(self.counts)
+            self.counts -= np.bincount(self.cells[changed] + self.state[changed], minlength=size)
+            self.counts += np.bincount(self.cells[changed] + state[changed], minlength=size)
+            self.state[changed] = state[changed]
+
+    @property
+    def table(self):
+        """``(ages, vaccinated, status)`` view of the counts."""
+        return self.counts.reshape(self.num_ages, 2, len(Status))
+
+    def age_status_counts(self):
+        """``(ages, statuses)`` counts: row ``a`` holds the nodes aged ``a``."""
+        return self.table.sum(axis=1)
+
+    def _active_share(self, counts):
+        """Fraction of active cases in ``(..., statuses)`` counts, 0 where empty."""
+        total = counts.sum(axis=-1)
+        active = counts[..., list(ACTIVE_STATUSES)].sum(axis=-1)
+        return np.divide(active, total, out=np.zeros(total.shape), where=total > 0)
+
+    def vaccination_rates(self):
+        """Active case rate of the (vaccinated, unvaccinated) nodes."""
+        by_vaccination = self.table.sum(axis=0)
+        return self._active_share(by_vaccination[::-1])
+
+    def age_group_rates(self, groups=AGE_GROUPS):
+        """Active case rate of each inclusive ``(start, end)`` age group."""
+        by_age = np.cumsum(np.vstack((np.zeros(len(Status), dtype=np.int64), self.age_status_counts())), axis=0)
+        starts = np.clip([start for start, _ in groups], 0, self.num_ages)
+        ends = np.clip([end + 1 for _, end in groups], 0, self.num_ages)
+        return self._active_share(by_age[ends] - by_age[starts])
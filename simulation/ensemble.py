@@ -0,0 +1,145 @@
+import os
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import get_context
+from network.csr_graph import CSRGraph, to_csr
+from network.graph_store import load_graph_binary, save_graph_binary
+from simulation.sihrd_vectorized import TIMELINE_KEYS, seed_infections, simulate_sihrd_batch
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# Graph shared by every task of a worker process, set by _init_worker
+_worker_graph = None
+
+
+def _init_worker(graph_dir):
+    """Memory-map the binary graph store once per worker process."""
+    global _worker_graph
+    _worker_graph = load_graph_binary(graph_dir)
+
+
+def run_on_worker_graph(func, *args):
+    """Call ``func(graph, *args)`` with the graph shared by a shared_graph_pool worker."""
+    return func(_worker_graph, *args)
+
+
+@contextmanager
+def shared_graph_pool(csr, max_workers=None):
+    """
+    Process pool whose workers share one memory-mapped copy of ``csr``.
+
+    The graph is written once to a temporary binary graph store and every
+    worker memory-maps it in its initializer, so tasks never pickle it.
+    Submit ``run_on_worker_graph`` with a module-level function to run
+    it against that graph.
+    """
+    with tempfile.TemporaryDirectory() as graph_dir:
+        save_graph_binary(CSRGraph(csr.indptr, csr.indices, risk_factor=csr.risk_factor), graph_dir)
+        # Spawned, not forked: pools are started from the app's job threads,
+        # and forking a multi-threaded process can copy locks held by other threads
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context('spawn'), initializer=_init_worker,
+                                 initargs=(graph_dir,)) as pool:
+            yield pool
+
+
+def timeline_to_array(timeline, max_days):
+    """
+    Stack a timeline dict into a (compartments, max_days) array.
+
+    Runs that stopped early are padded with their final counts, which is
+    the state they would have stayed in.
+    """
+    counts = np.array([timeline[key] for key in TIMELINE_KEYS], dtype=np.int32)
+    padded = np.empty((len(TIMELINE_KEYS), max_days), dtype=np.int32)
+    padded[:, :counts.shape[1]] = counts
+    padded[:, counts.shape[1]:] = counts[:, -1:]
+    return padded
+
+
+def run_replicates(csr, seed_sequences, params, percent_infected, batch_size=16):
+    """
+    Run one replicate per seed sequence on a CSR graph.
+
+    Replicates are simulated ``batch_size`` at a time with
+    simulate_sihrd_batch; each one seeds its initial infections and its
+    daily draws from its own generator.
+
+    Returns:
+    numpy.ndarray: (replicates, compartments, max_days) daily counts.
+    """
+    max_days = params.get('max_days', 100)
+    runs = np.empty((len(seed_sequences), len(TIMELINE_KEYS), max_days), dtype=np.int32)
+    for start in range(0, len(seed_sequences), batch_size):
+        rngs = [np.random.default_rng(seed) for seed in seed_sequences[start:start + batch_size]]
+        initial = [seed_infections(csr.num_nodes, percent_infected, rng) for rng in rngs]
+        state, infection_day, hospitalization_day = (np.stack(arrays) for arrays in zip(*initial))
+        timelines = simulate_sihrd_batch(csr, state, infection_day, hospitalization_day, params, rngs)
+        for i, timeline in enumerate(timelines):
+            runs[start + i] = timeline_to_array(timeline, max_days)
+    return runs
+
+
+def summarize_ensemble(runs, quantiles=DEFAULT_QUANTILES):
+    """
+    Reduce replicate timelines to mean and quantile bands.
+
+    Parameters:
+    runs (numpy.ndarray): (replicates, compartments, days) daily counts.
+    quantiles (tuple): Quantiles to report, stored under keys like 'q05'.
+
+    Returns:
+    dict: One entry per timeline key, each a dict of daily 'mean' and
+        quantile lists, plus 'replicates' and 'days'.
+    """
+    bands = {'replicates': len(runs), 'days': runs.shape[2]}
+    levels = np.quantile(runs, quantiles, axis=0)
+    for c, key in enumerate(TIMELINE_KEYS):
+        bands[key] = {'mean': runs[:, c].mean(axis=0).tolist()}
+        for q, level in zip(quantiles, levels):
+            bands[key][f"q{round(q * 100):02d}"] = level[c].tolist()
+    return bands
+
+
+def run_ensemble(G, params, n_replicates=100, percent_infected=0.01, seed=None,
+                 max_workers=None, quantiles=DEFAULT_QUANTILES):
+    """
+    Run many independent SIHRD replicates in a process pool.
+
+    Workers share one memory-mapped copy of the graph (see
+    shared_graph_pool), so it is never pickled per task. Each replicate
+    gets its own child of ``SeedSequence(seed)``, which makes the ensemble
+    reproducible regardless of how replicates are scheduled.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): Network with risk factors.
+    params (dict): Same keys as simulate_sihrd.
+    n_replicates (int): Number of stochastic runs.
+    percent_infected (float): Initially infected fraction for each replicate.
+    seed (int or SeedSequence, optional): Root seed of the ensemble.
+    max_workers (int, optional): Worker processes; 1 runs in-process.
+    quantiles (tuple): Quantile bands to report.
+
+    Returns:
+    dict: Bands as returned by summarize_ensemble.
+    """
+    csr = G if isinstance(G, CSRGraph) else to_csr(G)
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    seed_sequences = root.spawn(n_replicates)
+
+    if max_workers == 1:
+        return summarize_ensemble(run_replicates(csr, seed_sequences, params, percent_infected), quantiles)
+
+    workers = max_workers or os.cpu_count() or 1
+    chunk_size = max(1, -(-n_replicates // (workers * 4)))
+    chunks = [seed_sequences[i:i + chunk_size] for i in range(0, n_replicates, chunk_size)]
+
+    with shared_graph_pool(csr, workers) as pool:
+        futures = [
+            pool.submit(run_on_worker_graph, run_replicates, chunk, params, percent_infected)
+            for chunk in chunks
+        ]
+        runs = np.concatenate([future.result() for future in futures])
+
+    return summarize_ensemble(runs, quantiles)
@@ -0,0 +1,221 @@
+import numpy as np
+
+
+class StatusHistory:
+    """
+    Per-day node states stored as a preallocated ``(days, N)`` uint8 matrix.
+
+    Each row holds the ``Status`` value of every node at the start of a
+    day, with columns in ``nodes`` order; ``days`` gives the day of every
+    row, which is the row number unless a HistoryPolicy skipped days. One
+    day of a 1M-node run takes 1 MB instead of a dict of enum objects.
+    """
+
+    def __init__(self, nodes, max_days):
+        self.nodes = list(nodes)
+        self.states = np.empty((max_days, len(self.nodes)), dtype=np.uint8)
+        self.day_index = np.empty(max_days, dtype=np.int64)
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, day):
+        """State array for one day; negative indices count from the end."""
+        return self.matrix[day]
+
+    @property
+    def matrix(self):
+        """The recorded ``(days, N)`` matrix."""
+        return self.states[:self.length]
+
+    @property
+    def days(self):
+        """Day of every recorded row."""
+        return self.day_index[:self.length]
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes
+
+    def append(self, state, day=None):
+        """Record the state array of ``day``, by default the day after the last one."""
+        if day is None:
+            day = self.day_index[self.length - 1] + 1 if self.length else 0
+        self.states[self.length] = state
+        self.day_index[self.length] = day
+        self.length += 1
+
+    def retain(self, rows):
+        """Keep only the given rows (indices or a boolean mask), in order, in place."""
+        rows = np.flatnonzero(rows) if np.asarray(rows).dtype == bool else np.asarray(rows, dtype=np.int64)
+        self.states[:len(rows)] = self.states[rows]
+        self.day_index[:len(rows)] = self.day_index[rows]
+        self.length = len(rows)
+
+    def trim(self):
+        """Release the rows that were preallocated but never recorded."""
+        if self.length < len(self.states):
+            self.states = self.states[:self.length].copy()
+            self.day_index = self.day_index[:self.length].copy()
+
+    def counts(self, day, num_states=5):
+        """Number of nodes with each state value on the given day."""
+        return np.bincount(self[day], minlength=num_states)
+
+    def positions(self, pos):
+        """Stack a NetworkX layout dict into an (N, 2) array in column order."""
+        return np.array([pos[node] for node in self.nodes])
+
+
+HISTORY_MODES = ('full', 'counts', 'none', 'every', 'threshold', 'budget')
+
+
+class HistoryPolicy:
+    """
+    Which days of a simulation are kept, so a run only pays in memory for
+    what is rendered or analysed afterwards.
+
+    Modes:
+
+    - ``'full'``: the state of every day.
+    - ``'counts'``: only the timeline of daily status counts, no StatusHistory.
+    - ``'none'``: neither, for runs that are only timed or streamed.
+    - ``'every'``: the state of every ``every``-th day.
+    - ``'threshold'``: the state of the days on which more than
+      ``threshold`` nodes changed status.
+    - ``'budget'``: at most ``max_bytes`` of states. Every day is kept
+      until the budget is full; then every other kept day is dropped and
+      the interval between kept days doubles, as often as needed.
+
+    The downsampling modes always keep the first and the last day;
+    StatusHistory.days tells which days were kept.
+    """
+
+    def __init__(self, mode='full', every=1, threshold=0, max_bytes=None):
+        """
+        Parameters:
+        mode (str): One of HISTORY_MODES.
+        every (int): Interval of the 'every' mode.
+        threshold (int): Transitions a day needs to be kept in 'threshold' mode.
+        max_bytes (int): Memory budget of the 'budget' mode, including the
+            copy of the previous day that the downsampling modes keep.
+        """
+        if mode not in HISTORY_MODES:
+            raise ValueError(f"Unknown history mode {mode!r}; expected one of {HISTORY_MODES}")
+        if mode == 'every' and every < 1:
+            raise ValueError("'every' history needs an interval of at least 1 day")
+        if mode == 'budget' and not max_bytes:
+            raise ValueError("'budget' history needs max_bytes")
+        self.mode = mode
+        self.every = int(every)
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+
+    def __repr__(self):
+        return (f"HistoryPolicy({self.mode!r}, every={self.every}, threshold={self.threshold}, "
+                f"max_bytes={self.max_bytes})")
+
+    @classmethod
+    def coerce(cls, policy):
+        """
+        A HistoryPolicy from a policy, a mode name, or a bool (True is
+        'full', False is 'counts').
+        """
+        if isinstance(policy, cls):
+            return policy
+        if isinstance(policy, bool):
+            return cls('full' if policy else 'counts')
+        return cls(policy)
+
+    @property
+    def records_timeline(self):
+        return self.mode != 'none'
+
+    @property
+    def records_states(self):
+        return self.mode not in ('counts', 'none')
+
+    def recorder(self, nodes, max_days):
+        """A HistoryRecorder for a run of at most ``max_days`` days, or None if no state is kept."""
+        return HistoryRecorder(self, nodes, max_days) if self.records_states else None
+
+
+class HistoryRecorder:
+    """
+    Fills a StatusHistory with the days a HistoryPolicy keeps.
+
+    Offer every day's state to ``append`` and call ``finish`` at the end.
+    """
+
+    def __init__(self, policy, nodes, max_days):
+        nodes = list(nodes)
+        self.policy = policy
+        self.stride = policy.every if policy.mode == 'every' else 1
+        # Whether the budget is too small for every day, so the last row is
+        # reserved for the final day and kept days are halved when full
+        self.downsample = False
+        if policy.mode == 'every':
+            rows = min(max_days, -(-max_days // policy.every) + 2)
+        elif policy.mode == 'budget':
+            # One day of the budget goes to the copy of the previous day
+            rows = policy.max_bytes // max(len(nodes), 1) - 1
+            if rows < 4:
+                raise ValueError(f"A history budget of {policy.max_bytes} bytes cannot hold 4 days "
+                                 f"of {len(nodes)} nodes")
+            self.downsample = rows < max_days
+            rows = min(max_days, rows)
+        else:
+            rows = max_days
+        self.history = StatusHistory(nodes, rows)
+        # Downsampling modes keep a copy of the last offered day, to compare
+        # against and to record as the final day
+        self.previous = None if policy.mode == 'full' else np.empty(len(nodes), dtype=np.uint8)
+        self.last_day = None
+
+    @property
+    def nbytes(self):
+        """Memory held by the recorded states and the copy of the previous day."""
+        return self.history.nbytes + (0 if self.previous is None else self.previous.nbytes)
+
+    def append(self, state, day):
+        """Offer the state at the start of ``day``; it is copied if the policy keeps it."""
+        if self.previous is None:
+            self.history.append(state, day)
+            return
+
+        first = self.last_day is None
+        mode = self.policy.mode
+        if first:
+            keep = True
+        elif mode == 'threshold':
+            keep = np.count_nonzero(state != self.previous) > self.policy.threshold
+        else:
+            keep = day % self.stride == 0
+        if keep and self.downsample and len(self.history) == len(self.history.states) - 1:
+            # The last row is reserved for the final day
+            self._halve()
+            keep = day % self.stride == 0
+        if keep:
+            self.history.append(state, day)
+        self.previous[:] = state
+        self.last_day = day
+
+    def _halve(self):
+        """Drop every other kept day and double the interval."""
+        self.stride *= 2
+        days = self.history.days
+        self.history.retain((days % self.stride == 0) | (np.arange(len(days)) == 0))
+
+    def finish(self):
+        """
+        Record the last offered day if it was skipped.
+
+        Returns:
+        StatusHistory: The kept days, trimmed to size.
+        """
+        if self.previous is not None and self.last_day is not None and \
+                (not len(self.history) or self.history.days[-1] != self.last_day):
+            self.history.append(self.previous, self.last_day)
+        self.history.trim()
+        return self.history
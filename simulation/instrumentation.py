@@ -0,0 +1,187 @@
+import csv
+import logging
+import time
+
+# Phases timed by each engine, in the order they run within a day
+SIHRD_PHASES = ('report', 'history', 'frontier', 'draws', 'infected', 'hospitalized', 'infection', 'apply')
+SIR_PHASES = ('draws', 'spread', 'update', 'counts', 'copy')
+RECORD_FIELDS = ('model', 'day', 'seconds', 'transitions', 'nodes_touched', 'history_bytes')
+
+
+class Instrumentation:
+    """
+    Per-day phase timings and counters of one simulation run.
+
+    Pass one as ``instrument`` to iterate_sihrd, simulate_sihrd or
+    simulate_sir. Every simulated day becomes one record sent to each sink:
+
+    - ``model``, ``day``
+    - ``phases``: seconds spent in each phase of the engine (SIHRD_PHASES
+      or SIR_PHASES), and ``seconds``, their sum
+    - ``transitions``: nodes that changed status that day
+    - ``nodes_touched``: nodes the engine visited that day (SIHRD: active
+      nodes and the susceptible frontier; SIR: infected nodes and every
+      neighbor they scan)
+    - ``history_bytes``: memory held by the recorded daily states so far
+
+    Time spent by the consumer of a generator between two days is not
+    counted, except what it charges to a phase itself (simulate_sihrd
+    charges its StatusHistory.append to ``'history'``). Engines only call
+    the instrumentation when one is given, so a run without it pays one
+    ``is None`` check per phase.
+    """
+
+    def __init__(self, *sinks):
+        """
+        Parameters:
+        *sinks: Objects with ``begin(model, phases)``, ``record(record)`` and
+            ``close()``, such as MemorySink, LoggingSink or CSVSink.
+        """
+        self.sinks = list(sinks)
+        self.model = None
+        self.phases = ()
+        self.history_bytes = 0
+        self._record = None
+        self._mark = 0.0
+
+    def begin(self, model, phases):
+        """Start a run of ``model`` timing the given phase names."""
+        self.model = model
+        self.phases = tuple(phases)
+        self.history_bytes = 0
+        for sink in self.sinks:
+            sink.begin(model, self.phases)
+
+    def start_day(self, day):
+        """Open the record of ``day`` and start its clock."""
+        self._record = {'model': self.model, 'day': day, 'phases': dict.fromkeys(self.phases, 0.0)}
+        self._mark = time.perf_counter()
+
+    def phase(self, name):
+        """Charge the time since the previous mark to phase ``name``."""
+        now = time.perf_counter()
+        self._record['phases'][name] += now - self._mark
+        self._mark = now
+
+    def resume(self):
+        """Restart the clock without charging the time since the previous mark."""
+        self._mark = time.perf_counter()
+
+    def retained(self, nbytes):
+        """Set the bytes of history held so far."""
+        self.history_bytes = nbytes
+
+    def end_day(self, transitions=0, nodes_touched=0):
+        """Close the current day's record and send it to every sink."""
+        record = self._record
+        record['seconds'] = sum(record['phases'].values())
+        record['transitions'] = transitions
+        record['nodes_touched'] = nodes_touched
+        record['history_bytes'] = self.history_bytes
+        self._record = None
+        for sink in self.sinks:
+            sink.record(record)
+
+    def close(self):
+        """Close every sink, flushing a CSVSink; call it once the runs are done."""
+        for sink in self.sinks:
+            sink.close()
+
+
+class MemorySink:
+    """
+    Keeps every record in ``records``, for a performance panel or a notebook.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.model = None
+        self.phases = ()
+
+    def begin(self, model, phases):
+        self.model = model
+        self.phases = phases
+        self.records = []
+
+    def record(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+    def column(self, name):
+        """Values of one field, or of one phase's seconds, for every day."""
+        if name in self.phases:
+            return [record['phases'][name] for record in self.records]
+        return [record[name] for record in self.records]
+
+    def phase_totals(self):
+        """Seconds spent in each phase over the whole run."""
+        return {phase: sum(self.column(phase)) for phase in self.phases}
+
+    def summary(self):
+        """
+        Totals of the run.
+
+        Returns:
+        dict: 'days', 'seconds', 'transitions', 'nodes_touched', the final
+            'history_bytes' and the 'phases' totals.
+        """
+        return {
+            'days': len(self.records),
+            'seconds': sum(self.column('seconds')),
+            'transitions': sum(self.column('transitions')),
+            'nodes_touched': sum(self.column('nodes_touched')),
+            'history_bytes': self.records[-1]['history_bytes'] if self.records else 0,
+            'phases': self.phase_totals()
+        }
+
+
+class LoggingSink:
+    """Logs one line per day, or per ``every`` days, to a ``logging`` logger."""
+
+    def __init__(self, logger=None, level=logging.INFO, every=1):
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+        self.every = every
+
+    def begin(self, model, phases):
+        self.logger.log(self.level, "%s run started, timing phases %s", model, ', '.join(phases))
+
+    def record(self, record):
+        if record['day'] % self.every or not self.logger.isEnabledFor(self.level):
+            return
+        phases = ', '.join(f"{name} {seconds * 1e3:.2f}" for name, seconds in record['phases'].items())
+        self.logger.log(self.level, "%s day %d: %.2f ms (%s), %d transitions, %d nodes touched, %d history bytes",
+                        record['model'], record['day'], record['seconds'] * 1e3, phases,
+                        record['transitions'], record['nodes_touched'], record['history_bytes'])
+
+    def close(self):
+        pass
+
+
+class CSVSink:
+    """
+    Writes one row per day to a CSV file, with one ``<phase>_seconds``
+    column per phase. The file is opened at the start of each run and
+    rewritten by the next one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._writer = None
+
+    def begin(self, model, phases):
+        self.close()
+        self._file = open(self.path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(RECORD_FIELDS + tuple(f'{phase}_seconds' for phase in phases))
+
+    def record(self, record):
+        self._writer.writerow([record[field] for field in RECORD_FIELDS] + list(record['phases'].values()))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from network.csr_graph import CSRGraph, to_csr
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = 'pending', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job, through its progress callback, once nobody waits for it."""
+
+
+def job_key(kind, graph, seed, params, **options):
+    """
+    Key identifying a computation on a graph.
+
+    Parameters:
+    kind (str): Name of the computation, such as 'simulation'.
+    graph (networkx.Graph, CSRGraph or str): The network, or its
+        CSRGraph.fingerprint when already known. The content hash is part
+        of the key, so different networks never share results.
+    seed (int): Random seed of the run.
+    params (dict): Simulation parameters.
+    **options: Any other input that changes the result.
+
+    Returns:
+    str: Hex SHA-256 of all inputs.
+    """
+    if isinstance(graph, str):
+        fingerprint = graph
+    else:
+        fingerprint = (graph if isinstance(graph, CSRGraph) else to_csr(graph)).fingerprint()
+    inputs = {'kind': kind, 'graph': fingerprint, 'seed': seed, 'params': params, 'options': options}
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Job:
+    """
+    One submitted computation, shared by everyone who requested it.
+
+    ``status``, ``progress`` (0 to 1), ``message`` and ``partial`` (the
+    latest intermediate result passed to report) can be read at any time
+    to draw progress without waiting.
+    """
+
+    def __init__(self, key, description=''):
+        self.key = key
+        self.description = description
+        self.status = PENDING
+        self.progress = 0.0
+        self.message = ''
+        self.partial = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._value = None
+        self._requesters = set()
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def done(self):
+        return self.status in FINISHED
+
+    def report(self, fraction, message=None, partial=None):
+        """
+        Progress callback passed to the job function.
+
+        Raises:
+        JobCancelled: If every requester released the job; the function
+            should let it propagate.
+        """
+        if self._cancelled.is_set():
+            raise JobCancelled(self.key)
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        if partial is not None:
+            self.partial = partial
+
+    def result(self, timeout=None):
+        """Wait for the job and return its value, re-raising its error."""
+        if not self._finished.wait(timeout):
+            raise TimeoutError(f"Job {self.description or self.key} is still {self.status}")
+        if self.status == FAILED:
+            raise self.error
+        if self.status == CANCELLED:
+            raise JobCancelled(self.key)
+        return self._value
+
+    def _finish(self, status, value=None, error=None):
+        self._value, self.error = value, error
+        self.status = status
+        self.finished_at = time.time()
+        if status == DONE:
+            self.progress = 1.0
+        self._finished.set()
+
+
+class JobExecutor:
+    """
+    Runs computations on a worker pool, coalesced and cached by key.
+
+    submit() returns the existing job when one with the same key is
+    pending, running or done, so identical requests from several sessions
+    share one computation and its result. Failed and cancelled jobs are
+    retried on the next submit. The ``max_results`` most recently used
+    finished jobs are kept.
+
+    Workers are threads, so results such as StatusHistory matrices reach
+    the UI without pickling; run_ensemble still fans its replicates out to
+    its own process pool.
+    """
+
+    def __init__(self, max_workers=2, max_results=16):
+        self.max_results = max_results
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='epidemiax-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, func, *args, requester=None, description='', **kwargs):
+        """
+        Run ``func(job.report, *args, **kwargs)`` unless job ``key`` already exists.
+
+        Parameters:
+        key (str): Identity of the computation, see job_key.
+        func (callable): Job function; it receives the job's report callback
+            first and should call it regularly.
+        requester (hashable, optional): Who waits for the result, such as a
+            session id; see release.
+        description (str): Label for progress displays.
+
+        Returns:
+        Job: The new or coalesced job.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.status in (FAILED, CANCELLED):
+                job = Job(key, description)
+                self._jobs[key] = job
+                self._pool.submit(self._run, job, func, args, kwargs)
+            self._jobs.move_to_end(key)
+            job._requesters.add(requester)
+            self._evict()
+        return job
+
+    def get(self, key):
+        """The job with this key, or None if it was never submitted or was evicted."""
+        with self._lock:
+            return self._jobs.get(key)
+
+    def release(self, key, requester=None):
+        """
+        Stop waiting for a job; it is cancelled once no requester is left.
+
+        Cancellation takes effect at the job's next report call.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.done:
+                return
+            job._requesters.discard(requester)
+            if not job._requesters:
+                job._cancelled.set()
+
+    def jobs(self):
+        """Snapshot of the known jobs, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _run(self, job, func, args, kwargs):
+        if job._cancelled.is_set():
+            job._finish(CANCELLED)
+            return
+        job.status = RUNNING
+        try:
+            value = func(job.report, *args, **kwargs)
+        except JobCancelled:
+            job._finish(CANCELLED)
+        except Exception as e:
+            job._finish(FAILED, error=e)
+        else:
+            job._finish(DONE, value)
+
+    def _evict(self):
+        finished = [key for key, job in self._jobs.items() if job.done]
+        for key in finished[:max(0, len(finished) - self.max_results)]:
+            del self._jobs[key]
+
+    def shutdown(self, wait=True):
+        """Cancel every unfinished job and stop the workers."""
+        with self._lock:
+            for job in self._jobs.values():
+                if not job.done:
+                    job._cancelled.set()
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,110 @@
+import json
+import os
+import numpy as np
+
+SCHEMA_FILE = 'schema.json'
+KEY_BYTES = 32  # sha256 digest
+
+
+class ResultStore:
+    """
+    Append-only columnar store for sweep results.
+
+    Every column is a raw binary file in ``path``: one sha256 key per row,
+    one float64 file per parameter, and one float32 file per timeline
+    compartment holding ``max_days`` values per row. Rows are appended as
+    results arrive and the key column is written last, so a row only counts
+    once it is complete. Columns can be read back with ``np.memmap``.
+    """
+
+    def __init__(self, path, param_keys, compartments, max_days):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        schema = {
+            'param_keys': list(param_keys),
+            'compartments': list(compartments),
+            'max_days': int(max_days)
+        }
+        schema_path = os.path.join(path, SCHEMA_FILE)
+        if os.path.exists(schema_path):
+            with open(schema_path) as f:
+                stored = json.load(f)
+            if stored != schema:
+                raise ValueError(f"Result store at {path} has schema {stored}, expected {schema}")
+        else:
+            with open(schema_path, 'w') as f:
+                json.dump(schema, f, indent=2)
+        self.param_keys = schema['param_keys']
+        self.compartments = schema['compartments']
+        self.max_days = schema['max_days']
+        self._truncate_partial_rows()
+        self._keys = set(self._read_keys())
+
+    def _column_path(self, name):
+        return os.path.join(self.path, name + '.bin')
+
+    def _columns(self):
+        """Column name, dtype and values per row, with the key column last."""
+        columns = [('param_' + key, np.float64, 1) for key in self.param_keys]
+        columns += [('seed', np.int64, 1), ('replicates', np.int64, 1)]
+        columns += [('timeline_' + name, np.float32, self.max_days) for name in self.compartments]
+        return columns + [('key', np.uint8, KEY_BYTES)]
+
+    def _truncate_partial_rows(self):
+        """Drop the tail of any column written after the last complete row."""
+        rows = len(self)
+        for name, dtype, width in self._columns():
+            column_path = self._column_path(name)
+            size = rows * width * np.dtype(dtype).itemsize
+            if os.path.exists(column_path) and os.path.getsize(column_path) > size:
+                os.truncate(column_path, size)
+
+    def _read_keys(self):
+        if not len(self):
+            return []
+        raw = np.fromfile(self._column_path('key'), dtype=np.uint8).reshape(-1, KEY_BYTES)
+        return [row.tobytes().hex() for row in raw]
+
+    def __len__(self):
+        key_path = self._column_path('key')
+        return os.path.getsize(key_path) // KEY_BYTES if os.path.exists(key_path) else 0
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def append(self, key, params, seed, replicates, timeline):
+        """Append one result row; ``timeline`` maps compartment to daily values."""
+        values = {'param_' + k: params[k] for k in self.param_keys}
+        values.update(seed=seed, replicates=replicates, key=np.frombuffer(bytes.fromhex(key), dtype=np.uint8))
+        for name in self.compartments:
+            values['timeline_' + name] = timeline[name]
+        for name, dtype, width in self._columns():
+            row = np.asarray(values[name], dtype=dtype).reshape(width)
+            with open(self._column_path(name), 'ab') as f:
+                f.write(row.tobytes())
+        self._keys.add(key)
+
+    def column(self, name):
+        """
+        Memory-map one column.
+
+        Parameter columns are named after their params key, timeline
+        columns after their compartment; ``seed``, ``replicates`` and
+        ``key`` are also available.
+        """
+        rows = len(self)
+        for column, dtype, width in self._columns():
+            if name in (column, column.split('_', 1)[-1]):
+                if not rows:
+                    return np.empty((0, width) if width > 1 else 0, dtype=dtype)
+                shape = (rows, width) if width > 1 else (rows,)
+                return np.memmap(self._column_path(column), dtype=dtype, mode='r', shape=shape)
+        raise KeyError(name)
+
+    def load(self):
+        """All parameter and timeline columns as a dict of arrays."""
+        table = {key: np.asarray(self.column(key)) for key in self.param_keys}
+        table.update(seed=np.asarray(self.column('seed')), replicates=np.asarray(self.column('replicates')))
+        for name in self.compartments:
+            table[name] = np.asarray(self.column(name))
+        return table
@@ -0,0 +1,367 @@
+import math
+import numpy as np
+from network.csr_graph import CSRGraph, to_csr
+from simulation.history import HistoryPolicy
+from simulation.sihrd_vectorized import (
+    DECEASED, HOSPITALIZED, INFECTED, RECOVERED, SUSCEPTIBLE, TIMELINE_KEYS, prepare_arrays
+)
+
+# Constants of the day-stepped rules: hospitalization becomes possible once
+# infection_day reaches 5, recovery has a 10% daily chance once it reaches
+# recovery_time
+HOSPITALIZATION_ONSET = 5
+# The day-stepped engines set infection_day to the day of infection and
+# advance it daily from the next day on, so on day t it reads t - 1 for
+# every node infected during the run: its counter starts at time 1
+NEW_INFECTION_COUNTER_START = 1.0
+DAILY_RECOVERY_PROB = 0.1
+# Pending transition of an infected node
+TO_HOSPITAL, TO_RECOVERED = 0, 1
+# Uniform numbers drawn from the generator at a time
+DRAW_BLOCK = 4096
+# A daily probability of 1 would be an infinite rate
+MAX_DAILY_PROB = 1 - 1e-12
+
+
+def daily_rate(prob):
+    """Constant hazard per day whose chance of firing within one day is ``prob`` (capped below 1)."""
+    return -math.log1p(-min(max(prob, 0.0), MAX_DAILY_PROB))
+
+
+def event_rates(params):
+    """
+    Continuous-time rates of the simulate_sihrd params.
+
+    Each daily probability of the day-stepped rules becomes the constant
+    hazard with the same chance of firing within a day. Infection depends
+    on the number k of infected neighbors, so its hazard is computed per
+    node by infection_hazard.
+
+    Returns:
+    dict: 'max_days', 'infection_prob', 'hospitalization_prob',
+        'recovery_rate', 'recovery_time', 'hospital_recovery_time' and
+        'death_prob'.
+    """
+    return {
+        'max_days': params.get('max_days', 100),
+        'infection_prob': params.get('infection_prob', 0.05),
+        'hospitalization_prob': params.get('hospitalization_prob', 0.15),
+        'recovery_rate': daily_rate(DAILY_RECOVERY_PROB),
+        'recovery_time': params.get('recovery_time', 14),
+        'hospital_recovery_time': params.get('hospital_recovery_time', 21),
+        'death_prob': params.get('death_prob', 0.02),
+    }
+
+
+def infection_hazard(infection_prob, infected_neighbors, risk):
+    """
+    Infection hazard of a susceptible node, with the day-stepped chance
+    ``(1 - (1 - infection_prob) ** k) * risk`` of firing within a day.
+    """
+    if infected_neighbors <= 0:
+        return 0.0
+    return daily_rate((1 - (1 - infection_prob) ** infected_neighbors) * risk)
+
+
+class IndexedPriorityQueue:
+    """
+    Binary min-heap of items keyed by time, with an index of every item's
+    heap position, so an item's key can be changed or removed in O(log n).
+    """
+
+    def __init__(self):
+        self._items = []
+        self._keys = []
+        self._position = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._position
+
+    def peek(self):
+        """(item, key) with the smallest key."""
+        return self._items[0], self._keys[0]
+
+    def set(self, item, key):
+        """Insert ``item`` or change its key."""
+        position = self._position.get(item)
+        if position is None:
+            position = len(self._items)
+            self._items.append(item)
+            self._keys.append(key)
+            self._position[item] = position
+            self._sift_up(position)
+            return
+        old_key = self._keys[position]
+        self._keys[position] = key
+        if key < old_key:
+            self._sift_up(position)
+        else:
+            self._sift_down(position)
+
+    def remove(self, item):
+        """Remove ``item`` if it is queued."""
+        position = self._position.pop(item, None)
+        if position is None:
+            return
+        last_item, last_key = self._items.pop(), self._keys.pop()
+        if position < len(self._items):
+            self._items[position], self._keys[position] = last_item, last_key
+            self._position[last_item] = position
+            self._sift_up(position)
+            self._sift_down(self._position[last_item])
+
+    def pop(self):
+        """Remove and return the (item, key) with the smallest key."""
+        item, key = self._items[0], self._keys[0]
+        self.remove(item)
+        return item, key
+
+    def _move(self, item, key, position):
+        self._items[position], self._keys[position] = item, key
+        self._position[item] = position
+
+    def _sift_up(self, position):
+        items, keys = self._items, self._keys
+        item, key = items[position], keys[position]
+        while position > 0:
+            parent = (position - 1) >> 1
+            if keys[parent] <= key:
+                break
+            self._move(items[parent], keys[parent], position)
+            position = parent
+        self._move(item, key, position)
+
+    def _sift_down(self, position):
+        items, keys = self._items, self._keys
+        size = len(items)
+        item, key = items[position], keys[position]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and keys[child + 1] < keys[child]:
+                child += 1
+            if key <= keys[child]:
+                break
+            self._move(items[child], keys[child], position)
+            position = child
+        self._move(item, key, position)
+
+
+def iterate_sihrd_gillespie(G, status, infection_day, hospitalization_day, params, seed=None,
+                            include_state=False, event_log=None):
+    """
+    Exact continuous-time SIHRD simulation, yielding the state at the start of every day.
+
+    Uses the next-reaction method with Anderson's internal clocks. Every
+    node has at most one pending event in an IndexedPriorityQueue:
+
+    - susceptible: infection, at the infection_hazard of its k infected
+      neighbors. When k changes, the hazard is recomputed and the event
+      rescheduled from the node's unit-exponential threshold and the
+      hazard accumulated so far. No new random number is needed.
+    - infected: hospitalization once the node's ``infection_day`` counter
+      reaches 5, at the daily rate of ``hospitalization_prob * risk``. The
+      counter advances like in the day-stepped engines (see
+      NEW_INFECTION_COUNTER_START). Hospitalization takes precedence, as in
+      the day-stepped rules: the 10% daily recovery only runs from a count
+      of ``recovery_time`` until hospitalization becomes possible, so it
+      never happens when ``recovery_time >= 5``.
+    - hospitalized: discharge ``hospital_recovery_time`` days after
+      admission. The patient dies with probability ``death_prob * risk``,
+      otherwise recovers.
+
+    Only hospitalized nodes wait a fixed time; all other transitions happen
+    at any time of day. Each event costs O(degree * log(queued nodes)), so
+    a sparse outbreak costs in proportion to its events, not to N * days.
+    The day boundaries only sample the counts: the state of day ``d``
+    includes every event before time ``d``. The run stops after the first
+    day with no infected or hospitalized node, like iterate_sihrd.
+
+    Every transition has the same chance per day as in iterate_sihrd, so
+    the two agree on average. Their runs differ in when events happen
+    within the day.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): The social network with risk factors.
+    status, infection_day, hospitalization_day: Output of initialize_population
+        (dicts) or equivalent arrays in CSR node order. Inputs are not
+        modified. An infected node's infection_day counter reads
+        ``infection_day`` at time 0.
+    params (dict): Same keys as simulate_sihrd.
+    seed (int, SeedSequence or numpy.random.Generator, optional): Seed of the draws.
+    include_state (bool): Also yield the int8 state array of the day, in
+        CSR node order. It is updated in place as the run goes on, so copy
+        it to keep it.
+    event_log (list, optional): Receives a ``(time, node index, new Status
+        value)`` tuple for every event.
+
+    Yields:
+    dict: 'day', the count of every status ('susceptible', ...) and
+        'events', the number of events so far, plus 'state' when
+        include_state is True.
+    """
+    rng = np.random.default_rng(seed)
+    csr, state, infection_day, hospitalization_day, risk = prepare_arrays(
+        G, status, infection_day, hospitalization_day
+    )
+    rates = event_rates(params)
+    max_days = rates['max_days']
+    infection_prob = rates['infection_prob']
+    recovery_rate = rates['recovery_rate']
+    recovery_time = rates['recovery_time']
+    hospital_recovery_time = rates['hospital_recovery_time']
+    hospitalization_prob, death_prob = rates['hospitalization_prob'], rates['death_prob']
+    # Only whole-array numpy work is O(N); nodes are looked up one by one as events reach them
+    indptr, indices = csr.indptr, csr.indices
+    counts = np.bincount(state, minlength=len(TIMELINE_KEYS)).tolist()
+
+    draws, next_draw = [], 0
+
+    def uniform():
+        nonlocal draws, next_draw
+        if next_draw == len(draws):
+            draws, next_draw = rng.random(DRAW_BLOCK).tolist(), 0
+        next_draw += 1
+        return draws[next_draw - 1]
+
+    def exponential(rate):
+        return -math.log(1.0 - uniform()) / rate if rate > 0 else math.inf
+
+    queue = IndexedPriorityQueue()
+    # Infected nodes: which of their two transitions is pending
+    pending = {}
+    # Susceptible nodes under pressure: infected neighbors, their infection
+    # hazard, unit-exponential threshold, hazard integrated so far and time
+    # it was last integrated
+    pressure, hazard, threshold, integrated, integrated_at = {}, {}, {}, {}, {}
+
+    def schedule_infected(node, counter_start, now):
+        """Schedule an infected node whose infection_day counter reads 0 at ``counter_start``."""
+        onset = counter_start + HOSPITALIZATION_ONSET
+        # Recovery is only possible before hospitalization takes precedence
+        recovery_start = max(counter_start + recovery_time, now)
+        if recovery_start < onset:
+            to_recovered = recovery_start + exponential(recovery_rate)
+            if to_recovered < onset:
+                pending[node] = TO_RECOVERED
+                queue.set(node, to_recovered)
+                return
+        hospitalization_rate = daily_rate(hospitalization_prob * float(risk[node]))
+        pending[node] = TO_HOSPITAL
+        queue.set(node, max(onset, now) + exponential(hospitalization_rate))
+
+    def add_pressure(node, now, change):
+        """Change the infected neighbors of a susceptible node and reschedule its infection."""
+        if node in threshold:
+            integrated[node] += hazard[node] * (now - integrated_at[node])
+        else:
+            threshold[node] = exponential(1.0)
+            integrated[node] = 0.0
+        integrated_at[node] = now
+        pressure[node] = pressure.get(node, 0) + change
+        hazard[node] = infection_hazard(infection_prob, pressure[node], float(risk[node]))
+        if hazard[node] > 0:
+            queue.set(node, now + (threshold[node] - integrated[node]) / hazard[node])
+        else:
+            queue.remove(node)
+
+    def neighbors(node):
+        return indices[indptr[node]:indptr[node + 1]].tolist()
+
+    def infectious(node, now, change):
+        """Pass an infected node's arrival or departure on to its susceptible neighbors."""
+        for neighbor in neighbors(node):
+            if state[neighbor] == SUSCEPTIBLE:
+                add_pressure(neighbor, now, change)
+
+    for node in np.flatnonzero(state == INFECTED).tolist():
+        schedule_infected(node, -float(infection_day[node]), 0.0)
+        infectious(node, 0.0, 1)
+    for node in np.flatnonzero(state == HOSPITALIZED).tolist():
+        queue.set(node, max(float(hospitalization_day[node]) + hospital_recovery_time, 0.0))
+
+    events = 0
+    day = 0
+    while day < max_days:
+        next_time = queue.peek()[1] if len(queue) else math.inf
+        # Sample every day boundary before the next event
+        while day < max_days and day <= next_time:
+            day_counts = {'day': day}
+            day_counts.update(zip(TIMELINE_KEYS, counts))
+            day_counts['events'] = events
+            if include_state:
+                day_counts['state'] = state
+            yield day_counts
+            day += 1
+            if not len(queue):
+                return
+        if day >= max_days:
+            return
+
+        node, now = queue.pop()
+        old_state = int(state[node])
+        if old_state == SUSCEPTIBLE:
+            new_state = INFECTED
+            for table in (pressure, hazard, threshold, integrated, integrated_at):
+                del table[node]
+        elif old_state == INFECTED:
+            new_state = HOSPITALIZED if pending.pop(node) == TO_HOSPITAL else RECOVERED
+        else:
+            new_state = DECEASED if uniform() < death_prob * float(risk[node]) else RECOVERED
+
+        state[node] = new_state
+        counts[old_state] -= 1
+        counts[new_state] += 1
+        events += 1
+        if event_log is not None:
+            event_log.append((now, node, new_state))
+
+        if new_state == INFECTED:
+            schedule_infected(node, NEW_INFECTION_COUNTER_START, now)
+            infectious(node, now, 1)
+        elif old_state == INFECTED:
+            infectious(node, now, -1)
+            if new_state == HOSPITALIZED:
+                queue.set(node, now + hospital_recovery_time)
+
+
+def simulate_sihrd_gillespie(G, status, infection_day, hospitalization_day, params, seed=None,
+                             history='full', event_log=None):
+    """
+    Run iterate_sihrd_gillespie to the end, sampling the daily counts.
+
+    The timeline has the same keys as simulate_sihrd's, so
+    plot_sihrd_timeline and the ensemble tools work on it unchanged.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): The social network with risk factors.
+    status, infection_day, hospitalization_day: As for iterate_sihrd_gillespie.
+    params (dict): Same keys as simulate_sihrd.
+    seed (int, SeedSequence or numpy.random.Generator, optional): Seed of the draws.
+    history (HistoryPolicy, str or bool): Days of node states to keep, see
+        HistoryPolicy; every day by default.
+    event_log (list, optional): Receives every ``(time, node index, new
+        Status value)`` event.
+
+    Returns:
+    tuple: (timeline dict, StatusHistory with columns in CSR node order),
+        each None when the history policy does not keep it
+    """
+    policy = HistoryPolicy.coerce(history)
+    csr = G if isinstance(G, CSRGraph) else to_csr(G)
+    timeline = {key: [] for key in TIMELINE_KEYS} if policy.records_timeline else None
+    recorder = policy.recorder(csr.nodes, params.get('max_days', 100))
+
+    for counts in iterate_sihrd_gillespie(csr, status, infection_day, hospitalization_day, params, seed,
+                                          include_state=recorder is not None, event_log=event_log):
+        if timeline is not None:
+            for key in TIMELINE_KEYS:
+                timeline[key].append(counts[key])
+        if recorder is not None:
+            recorder.append(counts['state'], counts['day'])
+
+    return timeline, None if recorder is None else recorder.finish()
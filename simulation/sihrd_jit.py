@@ -0,0 +1,101 @@
+import numpy as np
+from simulation.sihrd_model import Status
+
+try:
+    from numba import njit
+    JIT_AVAILABLE = True
+except ImportError:
+    JIT_AVAILABLE = False
+
+KERNELS = ('numpy', 'jit', 'auto')
+SUSCEPTIBLE = Status.SUSCEPTIBLE.value
+INFECTED = Status.INFECTED.value
+HOSPITALIZED = Status.HOSPITALIZED.value
+RECOVERED = Status.RECOVERED.value
+DECEASED = Status.DECEASED.value
+
+
+def _step_kernel(indptr, indices, day, state, new_state, infected_neighbors, infection_day,
+                 hospitalization_day, draws, risk, hospitalization_threshold, death_threshold,
+                 infection_prob, recovery_time, hospital_recovery_time):
+    """One day of step_sihrd as per-node loops over the CSR arrays."""
+    num_nodes = state.shape[0]
+    # Infection pressure, scattered from the infected nodes only
+    infected_neighbors[:] = 0
+    for node in range(num_nodes):
+        if state[node] == INFECTED:
+            for k in range(indptr[node], indptr[node + 1]):
+                infected_neighbors[indices[k]] += 1
+
+    for node in range(num_nodes):
+        current = state[node]
+        new_state[node] = current
+        if current == INFECTED:
+            # Hospitalization after 5 days, otherwise daily recovery chance
+            if infection_day[node] >= 5:
+                if draws[node] < hospitalization_threshold[node] and hospitalization_day[node] == -1:
+                    new_state[node] = HOSPITALIZED
+                    hospitalization_day[node] = day
+            elif infection_day[node] >= recovery_time and draws[node] < np.float32(0.1):
+                new_state[node] = RECOVERED
+            if new_state[node] == INFECTED:
+                infection_day[node] += 1
+        elif current == HOSPITALIZED:
+            # Either recover or die based on risk factor
+            if day - hospitalization_day[node] >= hospital_recovery_time:
+                if draws[node] < death_threshold[node]:
+                    new_state[node] = DECEASED
+                else:
+                    new_state[node] = RECOVERED
+        elif current == SUSCEPTIBLE and infected_neighbors[node] > 0:
+            prob = 1.0 - (1.0 - infection_prob) ** np.float64(infected_neighbors[node])
+            prob *= np.float64(risk[node])
+            if draws[node] < prob:
+                new_state[node] = INFECTED
+                infection_day[node] = day
+
+
+if JIT_AVAILABLE:
+    _step_kernel = njit(cache=True, nogil=True)(_step_kernel)
+
+
+def resolve_kernel(kernel):
+    """
+    Turn a kernel name of KERNELS into 'numpy' or 'jit'.
+
+    'auto' picks 'jit' when numba is installed. 'jit' without numba falls
+    back to 'numpy'; both kernels give identical results.
+    """
+    if kernel not in KERNELS:
+        raise ValueError(f"Unknown kernel {kernel!r}; expected one of {KERNELS}")
+    if kernel == 'numpy' or not JIT_AVAILABLE:
+        return 'numpy'
+    return 'jit'
+
+
+def step_sihrd_jit(csr, day, state, infection_day, hospitalization_day, draws, rules, workspace=None):
+    """
+    Compiled equivalent of step_sihrd for a single ``(N,)`` replicate.
+
+    Every node consumes the same draw under the same transition rules, so
+    the result is identical to step_sihrd's: hospitalization after 5
+    days, a daily 10% recovery after ``recovery_time`` and a risk-weighted
+    death after ``hospital_recovery_time`` days in hospital. The loops
+    visit every node once plus the edges of the infected nodes, without
+    the temporary index arrays of the NumPy version. Requires numba
+    (JIT_AVAILABLE); without it the loops run as plain Python and are slow.
+
+    Parameters:
+    workspace (numpy.ndarray, optional): int64 array of N entries reused
+        for the infected neighbor counts.
+
+    Returns:
+    numpy.ndarray: The new state array; the timer arrays are updated in place.
+    """
+    new_state = np.empty_like(state)
+    if workspace is None:
+        workspace = np.empty(csr.num_nodes, dtype=np.int64)
+    _step_kernel(csr.indptr, csr.indices, day, state, new_state, workspace, infection_day, hospitalization_day,
+                 draws, rules['risk'], rules['hospitalization_threshold'], rules['death_threshold'],
+                 float(rules['infection_prob']), rules['recovery_time'], rules['hospital_recovery_time'])
+    return new_state
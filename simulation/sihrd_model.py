@@ -1,7 +1,10 @@
+import warnings
 import networkx as nx
 import numpy as np
 from enum import Enum
-import random
+from network.csr_graph import NODE_ATTRIBUTES, CSRGraph, to_csr
+from simulation.history import HistoryPolicy
+from simulation.instrumentation import SIHRD_PHASES
 
 class Status(Enum):
     SUSCEPTIBLE = 0
@@ -10,117 +13,296 @@ class Status(Enum):
     RECOVERED = 3
     DECEASED = 4
 
-def initialize_population(G, percent_infected=0.01, preserve_attributes=False):
-    """Initialize the population with various attributes."""
-    status = {}
-    infection_day = {}
-    hospitalization_day = {}
-    
+# Age -> base risk curve used by calculate_risk_factor(s)
+RISK_AGES = [0, 50, 70, 85, 100]
+RISK_LEVELS = [0.1, 0.2, 0.4, 0.7, 1.0]
+VACCINATED_RISK_MULTIPLIER = 0.3
+
+def initialize_population(G, percent_infected=0.01, preserve_attributes=False, seed=None):
+    """
+    Initialize the population with various attributes.
+
+    ``seed`` (int or numpy.random.Generator) makes the attributes and the
+    initially infected nodes reproducible.
+    """
+    rng = np.random.default_rng(seed)
     # Initialize node attributes
-    for node in G.nodes():
-        if not preserve_attributes:
-            # Assign random age (0-100)
-            G.nodes[node]['age'] = random.randint(0, 100)
-            # Assign random vaccination status (0-1)
-            G.nodes[node]['vaccinated'] = random.random() < 0.7  # 70% vaccination rate
-            # Calculate base risk factor based on age
-            age = G.nodes[node]['age']
-            G.nodes[node]['risk_factor'] = calculate_risk_factor(age, G.nodes[node]['vaccinated'])
-        
-        status[node] = Status.SUSCEPTIBLE
-        infection_day[node] = -1
-        hospitalization_day[node] = -1
+    if not preserve_attributes:
+        initialize_attributes(G, seed=rng, write_networkx=True)
+
+    status = dict.fromkeys(G.nodes(), Status.SUSCEPTIBLE)
+    infection_day = dict.fromkeys(G.nodes(), -1)
+    hospitalization_day = dict.fromkeys(G.nodes(), -1)
 
     # Initialize infected nodes
-    infected_nodes = random.sample(list(G.nodes()), int(len(G.nodes()) * percent_infected))
+    nodes = list(G.nodes())
+    infected_nodes = [nodes[i] for i in rng.choice(len(nodes), int(len(nodes) * percent_infected), replace=False)]
     for node in infected_nodes:
         status[node] = Status.INFECTED
         infection_day[node] = 0
 
     return status, infection_day, hospitalization_day, infected_nodes
 
+def initialize_attributes(graph, seed=None, vaccination_rate=0.7, write_networkx=False):
+    """
+    Draw age, vaccination and risk factor for every node as arrays.
+    
+    Ages (0-100) and vaccination flags come from one bulk draw each and
+    risk factors from a single np.interp over all ages.
+    
+    Parameters:
+    graph (CSRGraph or networkx.Graph): Network to initialize. The arrays
+        are stored as its age/vaccinated/risk_factor columns; a NetworkX
+        graph is converted to CSR first.
+    seed (int or numpy.random.Generator, optional): Random seed or source.
+    vaccination_rate (float): Fraction of vaccinated individuals.
+    write_networkx (bool): Also set the values as NetworkX node attributes
+        (only possible when ``graph`` is a NetworkX graph).
+    
+    Returns:
+    CSRGraph: The graph with its attribute columns filled in.
+    """
+    rng = np.random.default_rng(seed)
+    csr = graph if isinstance(graph, CSRGraph) else to_csr(graph)
+
+    age = rng.integers(0, 101, csr.num_nodes, dtype=np.int16)
+    vaccinated = rng.random(csr.num_nodes) < vaccination_rate
+    risk_factor = calculate_risk_factors(age, vaccinated)
+    csr.age, csr.vaccinated, csr.risk_factor = age, vaccinated, risk_factor.astype(np.float32)
+
+    if write_networkx:
+        if isinstance(graph, CSRGraph):
+            raise ValueError("write_networkx requires a NetworkX graph")
+        for name, values in zip(NODE_ATTRIBUTES, (age, vaccinated, risk_factor)):
+            nx.set_node_attributes(graph, dict(zip(csr.nodes, values.tolist())), name)
+
+    return csr
+
 def calculate_risk_factor(age, vaccinated):
     """Calculate risk factor based on age and vaccination status."""
-    base_risk = np.interp(age, [0, 50, 70, 85, 100], [0.1, 0.2, 0.4, 0.7, 1.0])
-    return base_risk * (0.3 if vaccinated else 1.0)
+    base_risk = np.interp(age, RISK_AGES, RISK_LEVELS)
+    return base_risk * (VACCINATED_RISK_MULTIPLIER if vaccinated else 1.0)
+
+def calculate_risk_factors(ages, vaccinated):
+    """Vectorized calculate_risk_factor over arrays of ages and vaccination flags."""
+    base_risk = np.interp(ages, RISK_AGES, RISK_LEVELS)
+    return base_risk * np.where(vaccinated, VACCINATED_RISK_MULTIPLIER, 1.0)
 
-def simulate_sihrd(G, status, infection_day, hospitalization_day, params):
+def simulate_sihrd(G, status, infection_day, hospitalization_day, params, seed=None, instrument=None,
+                   history='full', kernel='python'):
     """
     Simulate the SIHRD model with enhanced parameters.
+
+    Collects the days of iterate_sihrd into a timeline and a StatusHistory,
+    as selected by ``history``. With an Instrumentation, recording a day is
+    timed as its 'history' phase and the memory held by the recorded states
+    is reported as the history bytes.
+
+    Parameters:
+    history (HistoryPolicy, str or bool): Days to keep, see HistoryPolicy;
+        every day by default.
+    kernel (str): 'python' runs the node loops of iterate_sihrd. 'jit'
+        runs the same transition rules as a numba-compiled kernel over CSR
+        arrays (simulate_sihrd_vectorized with kernel='jit'), with one draw
+        per node and day instead of one per visited node, so the random
+        outcomes differ; the input dicts are then left unchanged and
+        ``instrument`` is not supported. Without numba, 'jit' warns and
+        falls back to 'python'. 'auto' picks 'jit' when numba is installed
+        and no instrument is given.
+
+    Returns:
+    tuple: (timeline dict of daily counts, StatusHistory of daily node
+        states), each None when the policy does not keep it
     """
-    max_days = params.get('max_days', 100)
-    base_infection_prob = params.get('infection_prob', 0.05)
-    hospitalization_prob = params.get('hospitalization_prob', 0.15)
-    death_prob = params.get('death_prob', 0.02)
-    recovery_time = params.get('recovery_time', 14)
-    hospital_recovery_time = params.get('hospital_recovery_time', 21)
+    if kernel not in ('python', 'jit', 'auto'):
+        raise ValueError(f"Unknown kernel {kernel!r}; expected 'python', 'jit' or 'auto'")
+    if kernel != 'python':
+        from simulation.sihrd_jit import JIT_AVAILABLE
+        if kernel == 'jit' and instrument is not None:
+            raise ValueError("The 'jit' kernel cannot be instrumented; use kernel='python'")
+        if JIT_AVAILABLE and instrument is None:
+            from simulation.sihrd_vectorized import simulate_sihrd_vectorized
+            return simulate_sihrd_vectorized(G, status, infection_day, hospitalization_day, params, seed=seed,
+                                             history=history, kernel='jit')
+        if kernel == 'jit':
+            warnings.warn("numba is not installed; simulate_sihrd runs the Python loops instead of the 'jit' kernel")
 
+    max_days = params.get('max_days', 100)
+    policy = HistoryPolicy.coerce(history)
     timeline = {
         'susceptible': [],
         'infected': [],
         'hospitalized': [],
         'recovered': [],
         'deceased': []
-    }
-    status_history = []
+    } if policy.records_timeline else None
+    recorder = policy.recorder(status.keys(), max_days)
+
+    for counts in iterate_sihrd(G, status, infection_day, hospitalization_day, params, seed,
+                                include_state=recorder is not None, instrument=instrument):
+        if timeline is not None:
+            for key in timeline:
+                timeline[key].append(counts[key])
+        if recorder is not None:
+            recorder.append(counts['state'], counts['day'])
+        if instrument is not None:
+            instrument.phase('history')
+            instrument.retained(0 if recorder is None else recorder.nbytes)
+
+    return timeline, None if recorder is None else recorder.finish()
+
+def iterate_sihrd(G, status, infection_day, hospitalization_day, params, seed=None, include_state=False,
+                  instrument=None):
+    """
+    Run the SIHRD model one day at a time, yielding each day as it completes.
+
+    Each day only the infected and hospitalized nodes and the susceptible
+    frontier around the infected are visited, so the cost of a day scales
+    with the number of active cases. The simulation stops early once no
+    infected or hospitalized nodes remain.
+
+    Every visited node consumes one uniform number from a single block drawn
+    per day. Active nodes are kept in insertion-ordered dicts, so the same
+    seed gives the same timeline in any process.
+
+    Consumers keep only what they need: stop iterating (or close the
+    generator) to cancel a run, and drop days that are no longer used.
+
+    Parameters:
+    G (networkx.Graph): The social network with risk factors.
+    status, infection_day, hospitalization_day: Output of initialize_population.
+    params (dict): Same keys as simulate_sihrd.
+    seed (int, SeedSequence or numpy.random.Generator, optional): Seed of the draws.
+    include_state (bool): Also yield the uint8 state array of the day, in
+        ``status`` key order. It is updated in place on the next day, so
+        copy it to keep it.
+    instrument (Instrumentation, optional): Receives the timings of the
+        SIHRD_PHASES and the counters of every day.
+
+    Yields:
+    dict: 'day' and the count of every status ('susceptible', ...), plus
+        'state' when include_state is True.
+    """
+    rng = np.random.default_rng(seed)
+    max_days = params.get('max_days', 100)
+    base_infection_prob = params.get('infection_prob', 0.05)
+    hospitalization_prob = params.get('hospitalization_prob', 0.15)
+    death_prob = params.get('death_prob', 0.02)
+    recovery_time = params.get('recovery_time', 14)
+    hospital_recovery_time = params.get('hospital_recovery_time', 21)
 
     current_status = status.copy()
-    
+    node_index = {node: i for i, node in enumerate(current_status)}
+    state_array = np.array([s.value for s in current_status.values()], dtype=np.uint8)
+    status_count = count_status(current_status)
+    # Only infected and hospitalized nodes can change state, plus the
+    # susceptible nodes next to an infected one
+    active_infected = dict.fromkeys(node for node, s in current_status.items() if s == Status.INFECTED)
+    active_hospitalized = dict.fromkeys(node for node, s in current_status.items() if s == Status.HOSPITALIZED)
+
+    if instrument is not None:
+        instrument.begin('sihrd', SIHRD_PHASES)
+
     for day in range(max_days):
-        # Store current state
-        status_count = count_status(current_status)
-        for key in timeline:
-            timeline[key].append(status_count[Status[key.upper()]])
-        status_history.append(current_status.copy())
+        if instrument is not None:
+            instrument.start_day(day)
+        # Report current state
+        counts = {'day': day}
+        counts.update((s.name.lower(), status_count[s]) for s in Status)
+        if include_state:
+            counts['state'] = state_array
+        if instrument is not None:
+            instrument.phase('report')
+        yield counts
+        if instrument is not None:
+            instrument.resume()
+
+        # Stop once the outbreak is over
+        if not active_infected and not active_hospitalized:
+            if instrument is not None:
+                instrument.end_day()
+            break
+
+        # Susceptible nodes with at least one infected neighbor
+        frontier = dict.fromkeys(neighbor for node in active_infected for neighbor in G.neighbors(node)
+                                 if current_status[neighbor] == Status.SUSCEPTIBLE)
+        if instrument is not None:
+            instrument.phase('frontier')
+
+        # One random number per visited node, drawn as a single block
+        draws = rng.random(len(active_infected) + len(active_hospitalized) + len(frontier)).tolist()
+        hospitalized_start = len(active_infected)
+        frontier_start = hospitalized_start + len(active_hospitalized)
+        if instrument is not None:
+            instrument.phase('draws')
 
         # Process infections and state changes
-        new_status = current_status.copy()
-        
-        for node in G.nodes():
-            if current_status[node] == Status.INFECTED:
-                # Check for hospitalization
-                if infection_day[node] >= 5:  # Consider hospitalization after 5 days
-                    if (random.random() < hospitalization_prob * G.nodes[node]['risk_factor'] and 
-                        hospitalization_day[node] == -1):
-                        new_status[node] = Status.HOSPITALIZED
-                        hospitalization_day[node] = day
-                
-                # Check for recovery (if not hospitalized)
-                elif infection_day[node] >= recovery_time:
-                    if random.random() < 0.1:  # Daily recovery chance after recovery_time
-                        new_status[node] = Status.RECOVERED
-
-            elif current_status[node] == Status.HOSPITALIZED:
-                days_hospitalized = day - hospitalization_day[node]
-                if days_hospitalized >= hospital_recovery_time:
-                    # Either recover or die based on risk factor
-                    if random.random() < death_prob * G.nodes[node]['risk_factor']:
-                        new_status[node] = Status.DECEASED
-                    else:
-                        new_status[node] = Status.RECOVERED
-
-            elif current_status[node] == Status.SUSCEPTIBLE:
-                # Calculate infection probability based on infected neighbors
-                infected_neighbors = sum(1 for neighbor in G.neighbors(node) 
-                                      if current_status[neighbor] == Status.INFECTED)
-                if infected_neighbors > 0:
-                    # Increased probability with more infected neighbors
-                    infection_prob = 1 - (1 - base_infection_prob) ** infected_neighbors
-                    # Modify by risk factor and vaccination
-                    infection_prob *= G.nodes[node]['risk_factor']
-                    
-                    if random.random() < infection_prob:
-                        new_status[node] = Status.INFECTED
-                        infection_day[node] = day
+        changes = {}
+
+        for node, draw in zip(active_infected, draws[:hospitalized_start]):
+            # Check for hospitalization
+            if infection_day[node] >= 5:  # Consider hospitalization after 5 days
+                if (draw < hospitalization_prob * G.nodes[node]['risk_factor'] and
+                    hospitalization_day[node] == -1):
+                    changes[node] = Status.HOSPITALIZED
+                    hospitalization_day[node] = day
+
+            # Check for recovery (if not hospitalized)
+            elif infection_day[node] >= recovery_time:
+                if draw < 0.1:  # Daily recovery chance after recovery_time
+                    changes[node] = Status.RECOVERED
+        if instrument is not None:
+            instrument.phase('infected')
+
+        for node, draw in zip(active_hospitalized, draws[hospitalized_start:frontier_start]):
+            days_hospitalized = day - hospitalization_day[node]
+            if days_hospitalized >= hospital_recovery_time:
+                # Either recover or die based on risk factor
+                if draw < death_prob * G.nodes[node]['risk_factor']:
+                    changes[node] = Status.DECEASED
+                else:
+                    changes[node] = Status.RECOVERED
+        if instrument is not None:
+            instrument.phase('hospitalized')
+
+        for node, draw in zip(frontier, draws[frontier_start:]):
+            # Calculate infection probability based on infected neighbors
+            infected_neighbors = sum(1 for neighbor in G.neighbors(node)
+                                  if current_status[neighbor] == Status.INFECTED)
+            # Increased probability with more infected neighbors
+            infection_prob = 1 - (1 - base_infection_prob) ** infected_neighbors
+            # Modify by risk factor and vaccination
+            infection_prob *= G.nodes[node]['risk_factor']
+
+            if draw < infection_prob:
+                changes[node] = Status.INFECTED
+                infection_day[node] = day
+        if instrument is not None:
+            instrument.phase('infection')
 
         # Update days for infected individuals
-        for node in G.nodes():
-            if new_status[node] == Status.INFECTED and current_status[node] == Status.INFECTED:
+        for node in active_infected:
+            if node not in changes:
                 infection_day[node] += 1
 
-        current_status = new_status
-
-    return timeline, status_history
+        # Apply transitions and keep the counts and active sets in step
+        for node, new_state in changes.items():
+            old_state = current_status[node]
+            status_count[old_state] -= 1
+            status_count[new_state] += 1
+            current_status[node] = new_state
+            state_array[node_index[node]] = new_state.value
+            if old_state == Status.INFECTED:
+                del active_infected[node]
+            elif old_state == Status.HOSPITALIZED:
+                del active_hospitalized[node]
+            if new_state == Status.INFECTED:
+                active_infected[node] = None
+            elif new_state == Status.HOSPITALIZED:
+                active_hospitalized[node] = None
+        if instrument is not None:
+            instrument.phase('apply')
+            instrument.end_day(transitions=len(changes), nodes_touched=len(draws))
 
 def count_status(status):
     """Count the number of individuals in each state."""
@@ -0,0 +1,313 @@
+import numpy as np
+from network.csr_graph import CSRGraph, to_csr
+from simulation.sihrd_model import Status
+from simulation.history import HistoryPolicy
+from simulation.checkpoint import CheckpointWriter, load_checkpoint, restore_rng, snapshot
+from simulation.sihrd_jit import resolve_kernel, step_sihrd_jit
+
+SUSCEPTIBLE = Status.SUSCEPTIBLE.value
+INFECTED = Status.INFECTED.value
+HOSPITALIZED = Status.HOSPITALIZED.value
+RECOVERED = Status.RECOVERED.value
+DECEASED = Status.DECEASED.value
+
+TIMELINE_KEYS = ('susceptible', 'infected', 'hospitalized', 'recovered', 'deceased')
+
+
+def prepare_arrays(graph, status, infection_day, hospitalization_day):
+    """
+    Convert the dict-based population state into engine arrays.
+
+    Parameters:
+    graph (networkx.Graph or CSRGraph): The social network.
+    status, infection_day, hospitalization_day: Either the dicts returned by
+        initialize_population or arrays already aligned with the CSR order.
+
+    Returns:
+    tuple: (csr, state int8, infection_day int32, hospitalization_day int32, risk float32)
+    """
+    csr = graph if isinstance(graph, CSRGraph) else to_csr(graph)
+    if csr.risk_factor is None:
+        raise ValueError("Graph has no 'risk_factor' node attribute; run initialize_population first")
+
+    def as_array(values, dtype, convert=lambda v: v):
+        if isinstance(values, dict):
+            return np.fromiter((convert(values[node]) for node in csr.nodes), dtype=dtype, count=csr.num_nodes)
+        return np.array(values, dtype=dtype)
+
+    state = as_array(status, np.int8, lambda s: s.value if isinstance(s, Status) else s)
+    infection_day = as_array(infection_day, np.int32)
+    hospitalization_day = as_array(hospitalization_day, np.int32)
+    risk = np.asarray(csr.risk_factor, dtype=np.float32)
+    return csr, state, infection_day, hospitalization_day, risk
+
+
+def seed_infections(num_nodes, percent_infected, seed=None):
+    """
+    Array equivalent of the infection seeding in initialize_population.
+
+    ``seed`` may be a Generator, which is then advanced in place.
+
+    Returns:
+    tuple: (state int8, infection_day int32, hospitalization_day int32)
+    """
+    state = np.full(num_nodes, SUSCEPTIBLE, dtype=np.int8)
+    infection_day = np.full(num_nodes, -1, dtype=np.int32)
+    hospitalization_day = np.full(num_nodes, -1, dtype=np.int32)
+    rng = np.random.default_rng(seed)
+    infected_nodes = rng.choice(num_nodes, int(num_nodes * percent_infected), replace=False)
+    state[infected_nodes] = INFECTED
+    infection_day[infected_nodes] = 0
+    return state, infection_day, hospitalization_day
+
+
+def transition_rules(params, risk):
+    """Per-node thresholds and timers derived from the simulate_sihrd params."""
+    return {
+        'max_days': params.get('max_days', 100),
+        'infection_prob': params.get('infection_prob', 0.05),
+        'recovery_time': params.get('recovery_time', 14),
+        'hospital_recovery_time': params.get('hospital_recovery_time', 21),
+        'risk': risk,
+        'hospitalization_threshold': (params.get('hospitalization_prob', 0.15) * risk).astype(np.float32),
+        'death_threshold': (params.get('death_prob', 0.02) * risk).astype(np.float32),
+    }
+
+
+def step_sihrd(csr, day, state, infection_day, hospitalization_day, draws, rules):
+    """
+    Apply one day of SIHRD transitions.
+
+    Works on ``(N,)`` arrays or on a batch of replicates shaped ``(R, N)``;
+    ``draws`` holds one uniform number per node per replicate. Only the
+    infected and hospitalized entries and the neighbours of infected nodes
+    are gathered, so the work beyond two state scans scales with the number
+    of active cases. The timer arrays are updated in place and must
+    therefore be C-contiguous.
+
+    Returns:
+    numpy.ndarray: The new state array.
+    """
+    if not (infection_day.flags.c_contiguous and hospitalization_day.flags.c_contiguous):
+        raise ValueError("step_sihrd updates the timer arrays in place; they must be C-contiguous")
+    num_nodes = csr.num_nodes
+    flat_state = state.reshape(-1)
+    flat_draws = draws.reshape(-1)
+    flat_infection_day = infection_day.reshape(-1)
+    flat_hospitalization_day = hospitalization_day.reshape(-1)
+    new_state = state.copy()
+    flat_new_state = new_state.reshape(-1)
+
+    infected = np.flatnonzero(flat_state == INFECTED)
+    hospitalized = np.flatnonzero(flat_state == HOSPITALIZED)
+
+    # Infected: hospitalization after 5 days, otherwise daily recovery chance
+    infected_nodes = infected % num_nodes
+    infected_draws = flat_draws[infected]
+    days_infected = flat_infection_day[infected]
+    past_onset = days_infected >= 5
+    to_hospital = infected[
+        past_onset
+        & (infected_draws < rules['hospitalization_threshold'][infected_nodes])
+        & (flat_hospitalization_day[infected] == -1)
+    ]
+    flat_new_state[to_hospital] = HOSPITALIZED
+    flat_hospitalization_day[to_hospital] = day
+
+    to_recovered = infected[~past_onset & (days_infected >= rules['recovery_time']) & (infected_draws < 0.1)]
+    flat_new_state[to_recovered] = RECOVERED
+
+    # Hospitalized: either recover or die based on risk factor
+    discharged = hospitalized[day - flat_hospitalization_day[hospitalized] >= rules['hospital_recovery_time']]
+    died = flat_draws[discharged] < rules['death_threshold'][discharged % num_nodes]
+    flat_new_state[discharged[died]] = DECEASED
+    flat_new_state[discharged[~died]] = RECOVERED
+
+    # Susceptible: infection pressure from infected neighbours, one sparse
+    # product (scattered from the infected nodes) for every replicate
+    infected_neighbors = csr.neighbor_count(flat_state.reshape(state.shape) == INFECTED).reshape(-1)
+    exposed = np.flatnonzero(infected_neighbors)
+    exposed = exposed[flat_state[exposed] == SUSCEPTIBLE]
+    infection_prob = 1 - (1 - rules['infection_prob']) ** infected_neighbors[exposed]
+    infection_prob *= rules['risk'][exposed % num_nodes]
+    newly_infected = exposed[flat_draws[exposed] < infection_prob]
+    flat_new_state[newly_infected] = INFECTED
+    flat_infection_day[newly_infected] = day
+
+    # Update days for infected individuals
+    still_infected = infected[flat_new_state[infected] == INFECTED]
+    flat_infection_day[still_infected] += 1
+
+    return new_state
+
+
+def simulate_sihrd_vectorized(G, status, infection_day, hospitalization_day, params, seed=None,
+                              history='full', checkpoint_path=None, checkpoint_every=10, kernel='numpy'):
+    """
+    Array-based SIHRD simulation with the same transition rules as simulate_sihrd.
+
+    The graph is converted to CSR once and every day's transitions are
+    evaluated as whole-array operations. Each node draws a single uniform
+    number per day, which is enough because a node can take at most one
+    transition per day.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): The social network with risk factors.
+    status, infection_day, hospitalization_day: Output of initialize_population
+        (dicts) or equivalent arrays in CSR node order. Inputs are not modified.
+    params (dict): Same keys as simulate_sihrd.
+    seed (int, SeedSequence or numpy.random.Generator, optional): Seed of the
+        daily draws; a fresh random source by default.
+    history (HistoryPolicy, str or bool): Days to keep, see HistoryPolicy;
+        every day by default, False keeps only the timeline.
+    checkpoint_path (str, optional): File to checkpoint the full simulation
+        state to, written in the background every ``checkpoint_every`` days.
+        Pass it to resume_sihrd_vectorized to continue an interrupted run.
+    checkpoint_every (int): Days between checkpoints.
+    kernel (str): 'numpy' steps with step_sihrd, 'jit' with the compiled
+        step_sihrd_jit (NumPy when numba is not installed), 'auto' with
+        'jit' if available. Every kernel gives the same result.
+
+    Returns:
+    tuple: (timeline dict, StatusHistory with columns in ``csr.nodes`` order),
+        each None when the history policy does not keep it
+    """
+    rng = np.random.default_rng(seed)
+    csr, state, infection_day, hospitalization_day, risk = prepare_arrays(
+        G, status, infection_day, hospitalization_day
+    )
+    timeline = {key: [] for key in TIMELINE_KEYS}
+    return _run_days(csr, params, risk, 0, state, infection_day, hospitalization_day, rng, timeline,
+                     history, checkpoint_path, checkpoint_every, kernel)
+
+
+def resume_sihrd_vectorized(G, checkpoint_path, history='full', checkpoint_every=10, kernel='numpy'):
+    """
+    Continue a simulate_sihrd_vectorized run from its last checkpoint.
+
+    The params, node states, timers, partial timeline and RNG state all
+    come from the checkpoint, so the resumed run is bit-identical to an
+    uninterrupted one. New checkpoints keep going to the same file.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): The same network as the original run.
+    checkpoint_path (str): Checkpoint file written by the original run.
+    history (HistoryPolicy, str or bool): Days to keep, see HistoryPolicy.
+        The history only covers the days simulated after resuming.
+    checkpoint_every (int): Days between checkpoints.
+    kernel (str): Step kernel, as for simulate_sihrd_vectorized.
+
+    Returns:
+    tuple: (timeline dict from day 0, StatusHistory of the resumed days or None)
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    csr, state, infection_day, hospitalization_day, risk = prepare_arrays(
+        G, checkpoint['state'], checkpoint['infection_day'], checkpoint['hospitalization_day']
+    )
+    if csr.fingerprint() != checkpoint['fingerprint']:
+        raise ValueError(f"Checkpoint {checkpoint_path} was written for a different graph")
+    return _run_days(csr, checkpoint['params'], risk, checkpoint['day'], state, infection_day,
+                     hospitalization_day, restore_rng(checkpoint['rng_state']), checkpoint['timeline'],
+                     history, checkpoint_path, checkpoint_every, kernel)
+
+
+def _run_days(csr, params, risk, start_day, state, infection_day, hospitalization_day, rng, timeline,
+              history, checkpoint_path, checkpoint_every, kernel='numpy'):
+    """Daily loop shared by simulate_sihrd_vectorized and resume_sihrd_vectorized."""
+    rules = transition_rules(params, risk)
+    max_days = rules['max_days']
+    policy = HistoryPolicy.coerce(history)
+    recorder = policy.recorder(csr.nodes, max_days - start_day)
+    writer = CheckpointWriter(checkpoint_path) if checkpoint_path else None
+    workspace = np.empty(csr.num_nodes, dtype=np.int64) if resolve_kernel(kernel) == 'jit' else None
+    fingerprint = csr.fingerprint() if writer else None
+
+    try:
+        for day in range(start_day, max_days):
+            # Checkpoint the state at the start of the day, before any draw
+            if writer and day > start_day and day % checkpoint_every == 0:
+                writer.submit(snapshot(day, state, infection_day, hospitalization_day, rng, timeline,
+                                       fingerprint, params))
+
+            # Store current state
+            counts = np.bincount(state, minlength=len(TIMELINE_KEYS))
+            for value, key in enumerate(TIMELINE_KEYS):
+                timeline[key].append(int(counts[value]))
+            if recorder is not None:
+                recorder.append(state, day)
+
+            # Stop once the outbreak is over
+            if counts[INFECTED] == 0 and counts[HOSPITALIZED] == 0:
+                break
+
+            draws = rng.random(csr.num_nodes, dtype=np.float32)
+            if workspace is not None:
+                state = step_sihrd_jit(csr, day, state, infection_day, hospitalization_day, draws, rules, workspace)
+            else:
+                state = step_sihrd(csr, day, state, infection_day, hospitalization_day, draws, rules)
+    finally:
+        if writer:
+            writer.close()
+
+    return timeline if policy.records_timeline else None, None if recorder is None else recorder.finish()
+
+
+def simulate_sihrd_batch(G, status, infection_day, hospitalization_day, params, seeds):
+    """
+    Run several SIHRD replicates at once on ``(R, N)`` state arrays.
+
+    Every day costs one sparse product over all replicates instead of one
+    Python-level simulation per replicate. Replicate ``r`` draws from
+    ``seeds[r]`` exactly as simulate_sihrd_vectorized would, so its timeline
+    is bit-identical to a single run with the same seed.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): The social network with risk factors.
+    status, infection_day, hospitalization_day: Per-replicate ``(R, N)``
+        arrays, or a single population state (dicts or ``(N,)`` arrays)
+        shared by every replicate.
+    params (dict): Same keys as simulate_sihrd.
+    seeds (list): One seed (int, SeedSequence or Generator) per replicate.
+
+    Returns:
+    list: One timeline dict per replicate, each ending on the day that
+        replicate's outbreak was over (or at max_days).
+    """
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    csr, state, infection_day, hospitalization_day, risk = prepare_arrays(
+        G, status, infection_day, hospitalization_day
+    )
+    shape = (len(rngs), csr.num_nodes)
+    # C order, so step_sihrd's reshape(-1) views update the timers in place
+    state = np.array(np.broadcast_to(state, shape), order='C')
+    infection_day = np.array(np.broadcast_to(infection_day, shape), order='C')
+    hospitalization_day = np.array(np.broadcast_to(hospitalization_day, shape), order='C')
+    rules = transition_rules(params, risk)
+
+    max_days = rules['max_days']
+    daily_counts = np.zeros((max_days, len(rngs), len(TIMELINE_KEYS)), dtype=np.int64)
+    running = np.ones(len(rngs), dtype=bool)
+    days_recorded = np.zeros(len(rngs), dtype=np.int64)
+    draws = np.empty(shape, dtype=np.float32)
+    # Offsetting each replicate's states lets one bincount count every row
+    offsets = len(TIMELINE_KEYS) * np.arange(len(rngs))[:, None]
+
+    for day in range(max_days):
+        # Store current state of replicates that are still running
+        counts = np.bincount((state + offsets).reshape(-1), minlength=len(TIMELINE_KEYS) * len(rngs))
+        daily_counts[day] = counts.reshape(len(rngs), len(TIMELINE_KEYS))
+        days_recorded[running] += 1
+
+        # Replicates stop once their outbreak is over
+        running &= (daily_counts[day, :, INFECTED] > 0) | (daily_counts[day, :, HOSPITALIZED] > 0)
+        if not running.any():
+            break
+
+        for r, rng in enumerate(rngs):
+            rng.random(csr.num_nodes, dtype=np.float32, out=draws[r])
+        state = step_sihrd(csr, day, state, infection_day, hospitalization_day, draws, rules)
+
+    return [
+        {key: daily_counts[:length, r, value].tolist() for value, key in enumerate(TIMELINE_KEYS)}
+        for r, length in enumerate(days_recorded)
+    ]
@@ -1,8 +1,12 @@
-import random
+import sys
+import numpy as np
+from simulation.instrumentation import SIR_PHASES
 
-def initialize_infection(G, percent_infected=0.01):
-    num_initially_infected = int(len(G.nodes) * percent_infected)
-    initial_infected_nodes = random.sample(list(G.nodes), num_initially_infected)
+def initialize_infection(G, percent_infected=0.01, seed=None):
+    rng = np.random.default_rng(seed)
+    nodes = list(G.nodes)
+    num_initially_infected = int(len(nodes) * percent_infected)
+    initial_infected_nodes = [nodes[i] for i in rng.choice(len(nodes), num_initially_infected, replace=False)]
     status = {node: "S" for node in G.nodes}
     for node in initial_infected_nodes:
         status[node] = "I"
@@ -10,35 +14,65 @@ def initialize_infection(G, percent_infected=0.01):
     infection_day = {node: 0 for node in initial_infected_nodes}
     return status, infection_day, initial_infected_nodes
 
-def simulate_sir(G, status, infection_day, max_days=100, infection_prob=0.05, recovery_time=14):
+def simulate_sir(G, status, infection_day, max_days=100, infection_prob=0.05, recovery_time=14, seed=None,
+                 instrument=None):
+    rng = np.random.default_rng(seed)
     current_day = 0
-    active_infected = set(infection_day.keys())
+    # Insertion-ordered so the draws map to the same edges in every process
+    active_infected = dict.fromkeys(infection_day)
+    if instrument is not None:
+        # Every yielded status copy counts as history, as consumers keep them
+        instrument.begin('sir', SIR_PHASES)
+        history_bytes = 0
 
     while current_day < max_days and active_infected:
-        new_infected = set()
+        if instrument is not None:
+            instrument.start_day(current_day)
+            num_infected = len(active_infected)
+        new_infected = {}
         new_recovered = set()
 
+        # One random number per edge out of an infected node, drawn as a single block
+        num_draws = sum(G.degree(node) for node in active_infected)
+        draws = iter(rng.random(num_draws).tolist())
+        if instrument is not None:
+            instrument.phase('draws')
+
         for node in list(active_infected):
             for neighbor in G.neighbors(node):
-                if status[neighbor] == "S" and random.random() < infection_prob:
-                    new_infected.add(neighbor)
+                draw = next(draws)
+                if status[neighbor] == "S" and draw < infection_prob:
+                    new_infected[neighbor] = None
                     status[neighbor] = "I"
                     infection_day[neighbor] = current_day
 
             if current_day - infection_day[node] >= recovery_time:
                 new_recovered.add(node)
                 status[node] = "R"
+        if instrument is not None:
+            instrument.phase('spread')
 
         active_infected.update(new_infected)
-        active_infected.difference_update(new_recovered)
+        for node in new_recovered:
+            del active_infected[node]
+        if instrument is not None:
+            instrument.phase('update')
 
         counts = {
             "day": current_day,
             "S": sum(1 for s in status.values() if s == "S"),
             "I": sum(1 for s in status.values() if s == "I"),
-            "R": sum(1 for s in status.values() if s == "R"),
-            "status": status.copy()
+            "R": sum(1 for s in status.values() if s == "R")
         }
+        if instrument is not None:
+            instrument.phase('counts')
+        counts["status"] = status.copy()
+        if instrument is not None:
+            instrument.phase('copy')
+            history_bytes += sys.getsizeof(counts["status"])
+            instrument.retained(history_bytes)
+            instrument.end_day(transitions=len(new_infected) + len(new_recovered),
+                               nodes_touched=num_infected + num_draws)
 
         yield counts
         current_day += 1
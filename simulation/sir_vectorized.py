@@ -0,0 +1,133 @@
+from collections.abc import Mapping
+import numpy as np
+from network.csr_graph import CSRGraph, to_csr
+
+# Array codes of the "S"/"I"/"R" labels used by sir_model
+SIR_LABELS = ('S', 'I', 'R')
+SUSCEPTIBLE, INFECTED, RECOVERED = range(len(SIR_LABELS))
+
+
+class SIRDay(Mapping):
+    """
+    One day yielded by simulate_sir_vectorized.
+
+    Behaves like the dicts yielded by simulate_sir: ``day``, ``S``, ``I``
+    and ``R`` are plain ints, while ``status`` (a node -> label dict) is
+    only built when it is read. Call ``state()`` for the raw int8 array
+    instead. Both must be requested before the generator advances, since
+    the engine updates its state array in place.
+    """
+
+    KEYS = ('day',) + SIR_LABELS + ('status',)
+
+    def __init__(self, day, counts, state, nodes):
+        self.day = day
+        self.counts = dict(zip(SIR_LABELS, (int(c) for c in counts)))
+        self._state = state
+        self._nodes = nodes
+
+    def state(self):
+        """Copy of the node states (SUSCEPTIBLE/INFECTED/RECOVERED codes)."""
+        if self._state is None:
+            raise RuntimeError(f"Node states of day {self.day} were not requested before the next day")
+        return self._state.copy()
+
+    def _expire(self):
+        self._state = None
+
+    def __getitem__(self, key):
+        if key == 'day':
+            return self.day
+        if key == 'status':
+            return dict(zip(self._nodes, (SIR_LABELS[s] for s in self.state().tolist())))
+        return self.counts[key]
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+
+def prepare_sir_arrays(graph, status, infection_day):
+    """
+    Convert the dicts returned by initialize_infection into engine arrays.
+
+    Parameters:
+    graph (networkx.Graph or CSRGraph): The social network.
+    status (dict or array): Node -> "S"/"I"/"R", or codes in CSR order.
+    infection_day (dict or array): Day of infection of the infected nodes,
+        or an array in CSR order with -1 for the others.
+
+    Returns:
+    tuple: (csr, state int8, infection_day int32)
+    """
+    csr = graph if isinstance(graph, CSRGraph) else to_csr(graph)
+    if isinstance(status, dict):
+        codes = {label: code for code, label in enumerate(SIR_LABELS)}
+        state = np.fromiter((codes[status[node]] for node in csr.nodes), dtype=np.int8, count=csr.num_nodes)
+    else:
+        state = np.array(status, dtype=np.int8)
+    if isinstance(infection_day, dict):
+        days = np.fromiter((infection_day.get(node, -1) for node in csr.nodes), dtype=np.int32,
+                           count=csr.num_nodes)
+    else:
+        days = np.array(infection_day, dtype=np.int32)
+    return csr, state, days
+
+
+def simulate_sir_vectorized(G, status, infection_day, max_days=100, infection_prob=0.05, recovery_time=14,
+                            seed=None):
+    """
+    Array-based SIR simulation with the generator interface of simulate_sir.
+
+    Each day only the edges out of infected nodes are visited, with one
+    uniform number per edge, and the S/I/R counters are updated by the
+    number of transitions instead of recounting every node. The yielded
+    SIRDay builds the full ``status`` snapshot only on request, so a day
+    costs time proportional to the active nodes and their edges.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): The social network.
+    status, infection_day: Output of initialize_infection, or arrays in CSR
+        node order. Inputs are not modified.
+    max_days (int): Maximum number of days to simulate.
+    infection_prob (float): Transmission probability per infected neighbor.
+    recovery_time (int): Days after which an infected node recovers.
+    seed (int, SeedSequence or numpy.random.Generator, optional): Seed of the draws.
+
+    Yields:
+    SIRDay: Counts of the day, with node states on demand.
+    """
+    rng = np.random.default_rng(seed)
+    csr, state, infection_day = prepare_sir_arrays(G, status, infection_day)
+    counts = np.bincount(state, minlength=len(SIR_LABELS)).astype(np.int64)
+    active = np.flatnonzero(state == INFECTED)
+
+    current_day = 0
+    record = None
+    while current_day < max_days and len(active):
+        if record is not None:
+            record._expire()
+
+        # Every susceptible neighbor is infected if any of its edges fires
+        _, neighbors = csr.neighbors_of(active)
+        draws = rng.random(len(neighbors))
+        hits = neighbors[(draws < infection_prob) & (state[neighbors] == SUSCEPTIBLE)]
+        new_infected = np.unique(hits)
+
+        recovering = current_day - infection_day[active] >= recovery_time
+        new_recovered = active[recovering]
+
+        state[new_infected] = INFECTED
+        infection_day[new_infected] = current_day
+        state[new_recovered] = RECOVERED
+        active = np.concatenate((active[~recovering], new_infected))
+
+        counts[SUSCEPTIBLE] -= len(new_infected)
+        counts[INFECTED] += len(new_infected) - len(new_recovered)
+        counts[RECOVERED] += len(new_recovered)
+
+        record = SIRDay(current_day, counts, state, csr.nodes)
+        yield record
+        current_day += 1
@@ -0,0 +1,145 @@
+import hashlib
+import itertools
+import json
+import numpy as np
+from concurrent.futures import as_completed
+from network.csr_graph import CSRGraph, to_csr
+from simulation.ensemble import run_on_worker_graph, run_replicates, shared_graph_pool
+from simulation.result_store import ResultStore
+from simulation.sihrd_vectorized import TIMELINE_KEYS
+
+# params keys exposed in the Streamlit sidebar
+SWEEP_KEYS = ('infection_prob', 'recovery_time', 'hospital_recovery_time', 'hospitalization_prob', 'death_prob')
+INTEGER_KEYS = ('recovery_time', 'hospital_recovery_time')
+
+DEFAULT_PARAMS = {
+    'max_days': 100,
+    'infection_prob': 0.05,
+    'hospitalization_prob': 0.15,
+    'death_prob': 0.02,
+    'recovery_time': 14,
+    'hospital_recovery_time': 21
+}
+
+
+def grid_points(ranges):
+    """
+    Cartesian product of parameter values.
+
+    Parameters:
+    ranges (dict): params key -> list of values.
+
+    Returns:
+    list: One dict per combination.
+    """
+    keys = list(ranges)
+    return [dict(zip(keys, values)) for values in itertools.product(*(ranges[k] for k in keys))]
+
+
+def latin_hypercube_points(ranges, n_samples, seed=None):
+    """
+    Latin hypercube sample of parameter values.
+
+    Each range is split into ``n_samples`` equal strata and every stratum
+    is used exactly once per parameter. Integer parameters are rounded.
+
+    Parameters:
+    ranges (dict): params key -> (low, high).
+    n_samples (int): Number of points.
+    seed (int, optional): Seed of the sample.
+
+    Returns:
+    list: One dict per sampled point.
+    """
+    rng = np.random.default_rng(seed)
+    points = [{} for _ in range(n_samples)]
+    for key, (low, high) in ranges.items():
+        strata = (rng.permutation(n_samples) + rng.random(n_samples)) / n_samples
+        values = low + strata * (high - low)
+        for point, value in zip(points, values):
+            point[key] = int(round(value)) if key in INTEGER_KEYS else float(value)
+    return points
+
+
+def point_key(fingerprint, params, seed, n_replicates, percent_infected):
+    """Content hash identifying one sweep result."""
+    content = json.dumps({
+        'graph': fingerprint,
+        'params': params,
+        'seed': seed,
+        'replicates': n_replicates,
+        'percent_infected': percent_infected
+    }, sort_keys=True, default=lambda value: value.item())
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _mean_timeline(csr, params, seed, n_replicates, percent_infected):
+    seed_sequences = np.random.SeedSequence(seed).spawn(n_replicates)
+    return run_replicates(csr, seed_sequences, params, percent_infected).mean(axis=0)
+
+
+def run_sweep(G, ranges, store_path, base_params=None, method='grid', n_samples=50,
+              n_replicates=1, percent_infected=0.01, seed=0, max_workers=None):
+    """
+    Simulate every parameter point of a sweep and store the results.
+
+    Points whose content hash of (graph fingerprint, params, seed) is
+    already in the store are skipped, so an interrupted or extended sweep
+    only computes what is missing. The remaining points run in a process
+    pool sharing one memory-mapped graph, and each result is appended to
+    the store as soon as it completes.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): Network with risk factors.
+    ranges (dict): For 'grid', params key -> list of values; for 'lhs',
+        params key -> (low, high).
+    store_path (str): Directory of the columnar ResultStore.
+    base_params (dict, optional): Values of the keys that are not swept.
+    method (str): 'grid' or 'lhs' (Latin hypercube).
+    n_samples (int): Number of points for 'lhs'.
+    n_replicates (int): Replicates averaged per point.
+    percent_infected (float): Initially infected fraction.
+    seed (int): Root seed shared by every point (common random numbers).
+    max_workers (int, optional): Worker processes; 1 runs in-process.
+
+    Returns:
+    ResultStore: The store holding every requested point.
+    """
+    unknown = set(ranges) - set(SWEEP_KEYS)
+    if unknown:
+        raise ValueError(f"Cannot sweep over {sorted(unknown)}; choose from {SWEEP_KEYS}")
+    if method == 'grid':
+        points = grid_points(ranges)
+    elif method == 'lhs':
+        points = latin_hypercube_points(ranges, n_samples, seed)
+    else:
+        raise ValueError(f"Unknown sweep method '{method}'")
+
+    csr = G if isinstance(G, CSRGraph) else to_csr(G)
+    fingerprint = csr.fingerprint()
+    base_params = {**DEFAULT_PARAMS, **(base_params or {})}
+    params_list = [{**base_params, **point} for point in points]
+    store = ResultStore(store_path, SWEEP_KEYS, TIMELINE_KEYS, base_params['max_days'])
+
+    pending = {}
+    for params in params_list:
+        key = point_key(fingerprint, params, seed, n_replicates, percent_infected)
+        if key not in store:
+            pending[key] = params
+
+    def save(key, mean_runs):
+        store.append(key, pending[key], seed, n_replicates, dict(zip(TIMELINE_KEYS, mean_runs)))
+
+    if max_workers == 1:
+        for key, params in pending.items():
+            save(key, _mean_timeline(csr, params, seed, n_replicates, percent_infected))
+    elif pending:
+        with shared_graph_pool(csr, max_workers) as pool:
+            futures = {
+                pool.submit(run_on_worker_graph, _mean_timeline, params, seed, n_replicates, percent_infected): key
+                for key, params in pending.items()
+            }
+            for future in as_completed(futures):
+                save(futures[future], future.result())
+
+    return store
@@ -0,0 +1,13 @@
+import numpy as np
+from simulation.sihrd_vectorized import resume_sihrd_vectorized, simulate_sihrd_vectorized
+from simulation.test_sihrd_vectorized import PARAMS, make_population
+
+
+def test_resumed_run_matches_uninterrupted_run(tmp_path):
+    csr, state, infection_day, hospitalization_day = make_population()
+    path = str(tmp_path / 'run.ckpt')
+    timeline, history = simulate_sihrd_vectorized(csr, state, infection_day, hospitalization_day, PARAMS, seed=3,
+                                                  checkpoint_path=path, checkpoint_every=10)
+    resumed, resumed_history = resume_sihrd_vectorized(csr, path)
+    assert resumed == timeline
+    assert np.array_equal(resumed_history.matrix, history.matrix[-len(resumed_history):])
@@ -0,0 +1,24 @@
+import numpy as np
+from simulation.history import HistoryPolicy
+
+
+def record(max_bytes, num_nodes=500, max_days=100):
+    recorder = HistoryPolicy('budget', max_bytes=max_bytes).recorder(range(num_nodes), max_days)
+    for day in range(max_days):
+        recorder.append(np.full(num_nodes, day % 5, dtype=np.int8), day)
+    return recorder.finish()
+
+
+def test_ample_budget_keeps_every_day():
+    history = record(2 ** 30)
+    assert list(history.days) == list(range(100))
+    assert np.array_equal(history.matrix[:, 0], np.arange(100) % 5)
+
+
+def test_tight_budget_keeps_evenly_spaced_days_and_the_final_day():
+    history = record(25 * 500)
+    assert history.nbytes <= 24 * 500
+    intervals = np.diff(history.days[:-1])
+    assert history.days[0] == 0 and history.days[-1] == 99
+    assert len(set(intervals)) == 1 and intervals[0] > 1
+    assert np.array_equal(history.matrix[:, 0], history.days % 5)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from simulation.sihrd_gillespie import simulate_sihrd_gillespie
+from simulation.sihrd_vectorized import TIMELINE_KEYS, seed_infections, simulate_sihrd_vectorized
+from simulation.test_sihrd_vectorized import make_population
+
+OUTCOMES = [TIMELINE_KEYS.index(key) for key in ('susceptible', 'recovered', 'deceased')]
+
+
+@pytest.mark.parametrize('params', [
+    {'max_days': 100, 'infection_prob': 0.1},
+    # recovery_time below 5 makes recovery outside hospital reachable
+    {'max_days': 60, 'infection_prob': 0.1, 'recovery_time': 3, 'hospital_recovery_time': 10},
+])
+def test_gillespie_and_vectorized_engines_agree_statistically(params):
+    csr = make_population(num_nodes=1000)[0]
+    finals = {'gillespie': [], 'vectorized': []}
+    for seed in range(30):
+        initial = seed_infections(csr.num_nodes, 0.05, seed=seed)
+        timeline, _ = simulate_sihrd_gillespie(csr, *initial, params, seed=seed, history=False)
+        finals['gillespie'].append([timeline[key][-1] for key in TIMELINE_KEYS])
+        timeline, _ = simulate_sihrd_vectorized(csr, *initial, params, seed=seed, history=False)
+        finals['vectorized'].append([timeline[key][-1] for key in TIMELINE_KEYS])
+
+    gillespie = np.array(finals['gillespie'])[:, OUTCOMES]
+    vectorized = np.array(finals['vectorized'])[:, OUTCOMES]
+    standard_error = np.sqrt((gillespie.var(axis=0, ddof=1) + vectorized.var(axis=0, ddof=1)) / len(gillespie))
+    assert np.all(np.abs(gillespie.mean(axis=0) - vectorized.mean(axis=0)) <= 4 * standard_error + 1)
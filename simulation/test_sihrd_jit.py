@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+from simulation.sihrd_jit import JIT_AVAILABLE
+from simulation.sihrd_vectorized import simulate_sihrd_vectorized
+from simulation.test_sihrd_vectorized import make_population
+
+
+@pytest.mark.skipif(not JIT_AVAILABLE, reason="numba is not installed")
+@pytest.mark.parametrize('recovery_time', [3, 14])
+def test_jit_kernel_matches_numpy_kernel(recovery_time):
+    # recovery_time below 5 also exercises the recovery branch
+    csr, state, infection_day, hospitalization_day = make_population()
+    params = {'max_days': 60, 'infection_prob': 0.1, 'recovery_time': recovery_time}
+    expected = simulate_sihrd_vectorized(csr, state, infection_day, hospitalization_day, params, seed=3)
+    actual = simulate_sihrd_vectorized(csr, state, infection_day, hospitalization_day, params, seed=3, kernel='jit')
+    assert actual[0] == expected[0]
+    assert np.array_equal(actual[1].matrix, expected[1].matrix)
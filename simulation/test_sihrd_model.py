@@ -0,0 +1,34 @@
+import numpy as np
+from network.generate_network import generate_social_network
+from simulation.sihrd_model import initialize_population, simulate_sihrd
+from simulation.sihrd_vectorized import TIMELINE_KEYS, simulate_sihrd_vectorized
+
+PARAMS = {'max_days': 40, 'infection_prob': 0.1}
+
+
+def test_frontier_and_vectorized_engines_agree_statistically():
+    # Same rules, different draws: the mean final counts of both engines
+    # must agree within a few standard errors
+    G = generate_social_network(400, 3, seed=1)
+    finals = {'frontier': [], 'vectorized': []}
+    for seed in range(30):
+        status, infection_day, hospitalization_day, _ = initialize_population(G, 0.05, seed=seed)
+        timeline, _ = simulate_sihrd(G, dict(status), dict(infection_day), dict(hospitalization_day), PARAMS,
+                                     seed=seed, history='counts')
+        finals['frontier'].append([timeline[key][-1] for key in TIMELINE_KEYS])
+        timeline, _ = simulate_sihrd_vectorized(G, status, infection_day, hospitalization_day, PARAMS,
+                                                seed=seed, history=False)
+        finals['vectorized'].append([timeline[key][-1] for key in TIMELINE_KEYS])
+
+    frontier, vectorized = np.array(finals['frontier']), np.array(finals['vectorized'])
+    standard_error = np.sqrt((frontier.var(axis=0, ddof=1) + vectorized.var(axis=0, ddof=1)) / len(frontier))
+    assert np.all(np.abs(frontier.mean(axis=0) - vectorized.mean(axis=0)) <= 4 * standard_error + 1)
+
+
+def test_simulate_sihrd_is_reproducible():
+    G = generate_social_network(300, 3, seed=2)
+    status, infection_day, hospitalization_day, _ = initialize_population(G, 0.05, seed=3)
+    runs = [simulate_sihrd(G, dict(status), dict(infection_day), dict(hospitalization_day), PARAMS, seed=4)
+            for _ in range(2)]
+    assert runs[0][0] == runs[1][0]
+    assert np.array_equal(runs[0][1].matrix, runs[1][1].matrix)
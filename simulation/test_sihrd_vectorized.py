@@ -0,0 +1,22 @@
+import numpy as np
+from network.generate_network import generate_social_network_csr
+from simulation.sihrd_model import initialize_attributes
+from simulation.sihrd_vectorized import seed_infections, simulate_sihrd_batch, simulate_sihrd_vectorized
+
+PARAMS = {'max_days': 60, 'infection_prob': 0.1}
+
+
+def make_population(num_nodes=2000, degree=3):
+    csr = generate_social_network_csr(num_nodes, degree, seed=1)
+    initialize_attributes(csr, seed=1)
+    return (csr,) + seed_infections(num_nodes, 0.02, seed=2)
+
+
+def test_batch_replicates_match_single_runs():
+    csr, state, infection_day, hospitalization_day = make_population()
+    seeds = [3, 4, 5]
+    timelines = simulate_sihrd_batch(csr, state, infection_day, hospitalization_day, PARAMS, seeds)
+    for seed, timeline in zip(seeds, timelines):
+        single, _ = simulate_sihrd_vectorized(csr, state, infection_day, hospitalization_day, PARAMS, seed=seed)
+        assert timeline == single
+        assert max(timeline['hospitalized']) > 0
@@ -4,23 +4,111 @@ import matplotlib.animation as animation
 import seaborn as sns
 import numpy as np
 from simulation.sihrd_model import Status
+from simulation.demographics import AGE_GROUPS, DemographicTable
+from visualization.layout import layout_dict
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+from visualization.export import TRANSPARENT, FrameAnimation
+from visualization.raster import render_spread
+from visualization.lod import LevelOfDetailView, resolve_detail
+from matplotlib.lines import Line2D
+
+# Width in years of the bars of the age distribution
+AGE_BIN_WIDTH = 5
+
+TIMELINE_COLORS = {
+    'susceptible': '#0000ff',  # Blue
+    'infected': '#ff0000',     # Red
+    'hospitalized': '#ffaa00', # Orange
+    'recovered': '#44ff44',    # Green
+    'deceased': '#000000'      # Black
+}
+
+class TimelineAnimation(FrameAnimation):
+    """
+    Frames of the animate_sihrd_timeline chart, one per day, for export.
+
+    Each process draws on its own off-screen Agg figure, so frames can be
+    rendered in parallel by save_frames. Frames are quantized to one
+    palette taken from the last (fullest) frame.
+    """
+
+    def __init__(self, timeline):
+        self.timeline = {status: list(timeline[status]) for status in TIMELINE_COLORS}
+        self._figure = None
+        final = self._render_rgb(len(self) - 1).quantize(colors=TRANSPARENT, dither=Image.Dither.NONE)
+        palette = final.getpalette()[:3 * TRANSPARENT]
+        # Pad with copies of colour 0, so index TRANSPARENT can be remapped to 0 losslessly
+        self.palette = palette + palette[:3] * (256 - len(palette) // 3)
+
+    def __len__(self):
+        return len(self.timeline['susceptible'])
+
+    def __getstate__(self):
+        # The figure is rebuilt in every worker process
+        return {**self.__dict__, '_figure': None}
+
+    @property
+    def size(self):
+        self._setup()
+        return self._canvas.get_width_height()
+
+    def _setup(self):
+        if self._figure is not None:
+            return
+        self._figure = Figure(figsize=(10, 6), dpi=80)
+        self._canvas = FigureCanvasAgg(self._figure)
+        ax = self._figure.gca()
+        self._lines = {
+            status: ax.plot([], [], color=color, label=status.capitalize(), linewidth=2)[0]
+            for status, color in TIMELINE_COLORS.items()
+        }
+        max_value = max(max(values) for values in self.timeline.values())
+        ax.set_xlim(0, len(self))
+        ax.set_ylim(0, max_value * 1.1)
+        ax.set_xlabel('Days', fontsize=10)
+        ax.set_ylabel('Number of Individuals', fontsize=10)
+        ax.legend(loc='center left', bbox_to_anchor=(1, 0.5), fontsize=10)
+        ax.grid(True, alpha=0.3)
+        self._title = ax.set_title('Population Status Over Time - Day 0', pad=10, fontsize=12)
+        self._figure.tight_layout()
+
+    def _render_rgb(self, index):
+        self._setup()
+        for status, line in self._lines.items():
+            line.set_data(range(index + 1), self.timeline[status][:index + 1])
+        self._title.set_text(f'Population Status Over Time - Day {index}')
+        self._canvas.draw()
+        return Image.fromarray(np.asarray(self._canvas.buffer_rgba())[..., :3])
+
+    def frame(self, index):
+        palette_image = Image.new('P', (1, 1))
+        palette_image.putpalette(self.palette)
+        pixels = np.array(self._render_rgb(index).quantize(palette=palette_image, dither=Image.Dither.NONE))
+        pixels[pixels == TRANSPARENT] = 0
+        image = Image.fromarray(pixels, mode='P')
+        image.putpalette(self.palette)
+        return image
+
+def animate_sihrd_timeline(timeline, export=False):
+    """
+    Create an animated visualization of the SIHRD timeline.
+
+    With ``export=True`` a TimelineAnimation with one frame per day is
+    returned instead; its ``save`` renders frames in parallel and streams
+    them into a GIF or MP4 file.
+    """
+    if export:
+        return TimelineAnimation(timeline)
 
-def animate_sihrd_timeline(timeline):
-    """Create an animated visualization of the SIHRD timeline."""
     # Create figure with subplots
     fig = plt.figure(figsize=(10, 6), dpi=80)
     ax = plt.gca()
     
-    # Define colors for each status
-    colors = {
-        'susceptible': '#0000ff',  # Blue
-        'infected': '#ff0000',     # Red
-        'hospitalized': '#ffaa00', # Orange
-        'recovered': '#44ff44',    # Green
-        'deceased': '#000000'      # Black
-    }
+    colors = TIMELINE_COLORS
     
     # Get max value for y-axis scaling
     max_value = max(max(timeline[status]) for status in colors.keys())
@@ -78,15 +166,7 @@ def plot_sihrd_timeline(timeline):
     fig = go.Figure()
     
     # Add traces for each status
-    colors = {
-        'susceptible': '#0000ff',  # Blue
-        'infected': '#ff0000',     # Red
-        'hospitalized': '#ffaa00', # Orange
-        'recovered': '#44ff44',    # Green
-        'deceased': '#000000'      # Black
-    }
-    
-    for status, color in colors.items():
+    for status, color in TIMELINE_COLORS.items():
         fig.add_trace(go.Scatter(
             x=list(range(len(timeline[status]))),
             y=timeline[status],
@@ -114,92 +194,169 @@ def plot_sihrd_timeline(timeline):
     
     return fig
 
+def plot_ensemble_bands(bands, lower='q05', upper='q95'):
+    """Plot mean trajectories with quantile bands from run_ensemble."""
+    fig = go.Figure()
+    days = list(range(bands['days']))
+    
+    # Same colours as plot_sihrd_timeline
+    for status, color in TIMELINE_COLORS.items():
+        r, g, b = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+        # Closed polygon: upper band forwards, lower band backwards
+        fig.add_trace(go.Scatter(
+            x=days + days[::-1],
+            y=bands[status][upper] + bands[status][lower][::-1],
+            fill='toself',
+            fillcolor=f"rgba({r},{g},{b},0.15)",
+            line=dict(width=0),
+            hoverinfo='skip',
+            showlegend=False
+        ))
+        fig.add_trace(go.Scatter(
+            x=days,
+            y=bands[status]['mean'],
+            name=status.capitalize(),
+            line=dict(color=color, width=2),
+            hovertemplate="Day %{x}<br>" +
+                         f"{status.capitalize()} (mean): %{{y:.1f}}<extra></extra>"
+        ))
+    
+    fig.update_layout(
+        title=f"Population Status Over Time ({bands['replicates']} runs, {lower}-{upper} band)",
+        xaxis_title="Days",
+        yaxis_title="Number of Individuals",
+        hovermode='x unified',
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=1.05
+        ),
+        showlegend=True,
+        template="plotly_white",
+        height=400
+    )
+    
+    return fig
+
+def plot_phase_timings(performance):
+    """
+    Per-day milliseconds spent in each simulation phase, as stacked bars,
+    with the nodes touched per day on a second axis.
+
+    Parameters:
+    performance (MemorySink): Records of an instrumented run.
+    """
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    days = performance.column('day')
+
+    for phase in performance.phases:
+        fig.add_trace(go.Bar(
+            x=days,
+            y=[seconds * 1e3 for seconds in performance.column(phase)],
+            name=phase.capitalize(),
+            hovertemplate="Day %{x}<br>" + f"{phase.capitalize()}: " + "%{y:.2f} ms<extra></extra>"
+        ))
+    fig.add_trace(go.Scatter(
+        x=days,
+        y=performance.column('nodes_touched'),
+        name="Nodes touched",
+        line=dict(color='#000000', width=1, dash='dot'),
+        hovertemplate="Day %{x}<br>Nodes touched: %{y:,}<extra></extra>"
+    ), secondary_y=True)
+
+    fig.update_layout(
+        title=f"Time per Day by Phase ({performance.model})",
+        xaxis_title="Days",
+        barmode='stack',
+        hovermode='x unified',
+        template="plotly_white",
+        height=400
+    )
+    fig.update_yaxes(title_text="Milliseconds", secondary_y=False)
+    fig.update_yaxes(title_text="Nodes touched", secondary_y=True, showgrid=False)
+    
+    return fig
+
 def create_age_distribution_plot(G, status):
-    """Create age distribution plots for different status groups."""
+    """
+    Create age distribution plots for different status groups.
+
+    ``status`` is a node -> Status dict, a StatusHistory (the last recorded
+    day is used) or a DemographicTable kept up to date by the simulation,
+    in which case no per-node work is needed at all.
+    """
+    table = status if isinstance(status, DemographicTable) else DemographicTable.from_graph(G, status)
+
     fig = make_subplots(rows=2, cols=2,
                         subplot_titles=("Age Distribution by Status",
                                       "Risk Factor Distribution",
                                       "Vaccination Status Impact",
                                       "Infection Rate by Age Group"))
     
-    # Age distribution by status
-    age_data = {s: [] for s in Status}
-    for node, node_status in status.items():
-        age_data[node_status].append(G.nodes[node]['age'])
-    
-    for s, ages in age_data.items():
-        if ages:  # Only plot if we have data
+    # Age distribution by status, in bins of AGE_BIN_WIDTH years
+    by_age = table.age_status_counts()
+    num_bins = -(-table.num_ages // AGE_BIN_WIDTH)
+    padded = np.zeros((num_bins * AGE_BIN_WIDTH, len(Status)), dtype=by_age.dtype)
+    padded[:len(by_age)] = by_age
+    binned = padded.reshape(num_bins, AGE_BIN_WIDTH, len(Status)).sum(axis=1)
+    bin_centers = np.arange(num_bins) * AGE_BIN_WIDTH + (AGE_BIN_WIDTH - 1) / 2
+    for s in Status:
+        if binned[:, s.value].any():  # Only plot if we have data
             fig.add_trace(
-                go.Histogram(x=ages, name=s.name, opacity=0.7),
+                go.Bar(x=bin_centers, y=binned[:, s.value], width=AGE_BIN_WIDTH, name=s.name, opacity=0.7),
                 row=1, col=1
             )
     
     # Risk factor distribution
-    risk_factors = [G.nodes[node]['risk_factor'] for node in G.nodes()]
+    risk_edges = table.risk_edges
     fig.add_trace(
-        go.Histogram(x=risk_factors, name="Risk Factors"),
+        go.Bar(x=(risk_edges[:-1] + risk_edges[1:]) / 2,
+               y=table.risk_counts,
+               width=np.diff(risk_edges),
+               name="Risk Factors"),
         row=1, col=2
     )
     
     # Vaccination impact
-    vacc_status = {True: {'infected': 0, 'total': 0},
-                   False: {'infected': 0, 'total': 0}}
-    
-    for node in G.nodes():
-        is_vacc = G.nodes[node]['vaccinated']
-        vacc_status[is_vacc]['total'] += 1
-        if status[node] in [Status.INFECTED, Status.HOSPITALIZED]:
-            vacc_status[is_vacc]['infected'] += 1
-    
-    vacc_rates = [
-        vacc_status[True]['infected'] / vacc_status[True]['total'],
-        vacc_status[False]['infected'] / vacc_status[False]['total']
-    ]
-    
     fig.add_trace(
         go.Bar(x=['Vaccinated', 'Unvaccinated'],
-               y=vacc_rates,
+               y=table.vaccination_rates(),
                name="Infection Rate"),
         row=2, col=1
     )
     
     # Age group infection rates
-    age_groups = [(0, 20), (21, 40), (41, 60), (61, 80), (81, 100)]
-    age_infection_rates = []
-    age_group_labels = []
-    
-    for start, end in age_groups:
-        group_nodes = [n for n in G.nodes() 
-                      if start <= G.nodes[n]['age'] <= end]
-        infected = sum(1 for n in group_nodes 
-                      if status[n] in [Status.INFECTED, Status.HOSPITALIZED])
-        rate = infected / len(group_nodes) if group_nodes else 0
-        age_infection_rates.append(rate)
-        age_group_labels.append(f"{start}-{end}")
-    
     fig.add_trace(
-        go.Bar(x=age_group_labels,
-               y=age_infection_rates,
+        go.Bar(x=[f"{start}-{end}" for start, end in AGE_GROUPS],
+               y=table.age_group_rates(AGE_GROUPS),
                name="Age Group Infection Rate"),
         row=2, col=2
     )
     
-    fig.update_layout(height=800, showlegend=False)
+    fig.update_layout(height=800, showlegend=False, barmode='overlay')
     return fig
 
-def create_static_network(G):
-    """Create a static visualization of the network structure."""
+def create_static_network(G, detail='auto'):
+    """
+    Create a static visualization of the network structure.
+
+    ``detail`` is 'full', a level-of-detail view ('sampled', 'supernodes'
+    or 'density', see LevelOfDetailView) or 'auto', which switches to
+    supernodes above FULL_DETAIL_MAX_NODES nodes.
+    """
     # Reduced figure size
     fig = plt.figure(figsize=(8, 6), dpi=80)
     
-    # Use the same layout parameters as animation for consistency
-    pos = nx.spring_layout(
-        G,
-        k=1.2,
-        iterations=100,
-        seed=42,
-        scale=2.5  # Reduced scale
-    )
+    detail = resolve_detail(detail, G.number_of_nodes())
+    if detail != 'full':
+        LevelOfDetailView(G, detail).draw(plt.gca())
+        plt.title(f"Network Structure ({detail})", pad=20, fontsize=12)
+        plt.axis('off')
+        return fig
+
+    # Shared cached layout, the same one the animations use
+    pos = layout_dict(G)
     
     # Draw edges first
     nx.draw_networkx_edges(
@@ -223,19 +380,26 @@ def create_static_network(G):
     plt.axis('off')
     return fig
 
-def animate_spread(G, status_history):
-    """Create an animated visualization of the disease spread."""
+def animate_spread(G, status_history, export=False, detail='auto'):
+    """
+    Create an animated visualization of the disease spread from a StatusHistory.
+
+    ``detail`` selects the network drawing as in create_static_network;
+    level-of-detail views only recolour their aggregates every frame.
+    With ``export=True`` a RasterAnimation with one full-resolution frame
+    per day is returned instead; its ``save`` renders frames in parallel
+    and streams them into a GIF or MP4 file.
+    """
     # Validate input
     if not status_history or len(status_history) == 0:
         raise ValueError("No status history data provided for animation")
+    if export:
+        return render_spread(G, status_history)
 
     # Further reduced figure size and DPI for better performance
     plt.ioff()  # Turn off interactive mode
     fig = plt.figure(figsize=(8, 6), dpi=60)
     
-    # Calculate layout with fewer iterations for speed
-    pos = nx.spring_layout(G, k=1.2, iterations=30, seed=42, scale=2.0)
-    
     # Updated color scheme
     colors = {
         Status.SUSCEPTIBLE: '#0000ff',  # Blue
@@ -246,25 +410,52 @@ def animate_spread(G, status_history):
     }
     
     # Pre-calculate frame data with more aggressive frame skipping
-    frame_data = []
-    step = 4  # Skip every 4 frames
+    days = status_history.days
+    span = int(days[-1] - days[0]) + 1
+    step = 4  # One frame per 4 days
     
     # Ensure we always have at least 10 frames for smooth animation
-    if len(status_history) < 40:  # If less than 40 frames, adjust step size
-        step = max(1, len(status_history) // 10)
+    if span < 40:  # If less than 40 days, adjust step size
+        step = max(1, span // 10)
     
-    for frame_idx in range(0, len(status_history), step):
-        current_status = status_history[frame_idx]
-        frame_nodes = {s: [] for s in Status}
-        for node, node_status in current_status.items():
-            frame_nodes[node_status].append(node)
-        frame_data.append(frame_nodes)
+    # First recorded day of every step, so an already downsampled history
+    # (see HistoryPolicy) is not thinned again
+    frame_rows = np.flatnonzero(np.diff((days - days[0]) // step, prepend=-1) != 0)
+    frame_days = days[frame_rows].tolist()
+    frame_data = [status_history[row] for row in frame_rows]
     
     # Ensure we have at least one frame
     if not frame_data:
         plt.close(fig)
         raise ValueError("No frames generated for animation")
     
+    detail = resolve_detail(detail, len(status_history.nodes))
+    if detail != 'full':
+        ax = plt.gca()
+        view = LevelOfDetailView(G, detail, nodes=status_history.nodes)
+        view.draw(ax, frame_data[0])
+        ax.axis('off')
+        if detail == 'sampled':
+            ax.legend(handles=[Line2D([], [], marker='o', linestyle='', color=colors[s], label=s.name)
+                               for s in Status], loc='upper left', bbox_to_anchor=(1.01, 1), fontsize=8)
+            plt.subplots_adjust(right=0.85)
+        else:
+            fig.colorbar(view.artists[0], ax=ax, label="Infected share", shrink=0.8)
+
+        def update_view(frame):
+            """Recolour the aggregated view for one frame"""
+            ax.set_title(f"Disease Spread - Day {frame_days[frame]}", pad=10, fontsize=10)
+            return view.update(frame_data[frame])
+
+        anim = animation.FuncAnimation(fig, update_view, frames=len(frame_data), interval=100, repeat=True)
+        plt.ion()
+        return anim
+
+    # Shared cached layout, the same one the static network uses
+    pos = layout_dict(G)
+    # Node positions in history column order, so a frame's state row can mask them
+    node_pos = status_history.positions(pos)
+
     # Set fixed bounds with smaller margin
     margin = 0.2
     x_values = [x for x, _ in pos.values()]
@@ -301,14 +492,9 @@ def animate_spread(G, status_history):
         try:
             # Update node positions for each status
             for s in Status:
-                nodes = frame_data[frame][s]
-                if nodes:
-                    node_pos = np.array([pos[node] for node in nodes])
-                    node_collections[s].set_offsets(node_pos)
-                else:
-                    node_collections[s].set_offsets(np.empty((0, 2)))
+                node_collections[s].set_offsets(node_pos[frame_data[frame] == s.value])
             
-            ax.set_title(f"Disease Spread - Day {frame * step}", pad=10, fontsize=10)
+            ax.set_title(f"Disease Spread - Day {frame_days[frame]}", pad=10, fontsize=10)
             return list(node_collections.values())
         except Exception as e:
             print(f"Error in update function: {str(e)}")
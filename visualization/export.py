@@ -0,0 +1,168 @@
+import os
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+# Palette index marking unchanged pixels of GIF frames after the first;
+# frame sources never use it for a colour
+TRANSPARENT = 255
+
+# Frame source shared by every task of a worker process, set by _init_worker
+_worker_source = None
+
+
+class FrameAnimation:
+    """
+    Base class of animations that render their own frames for export.
+
+    Subclasses implement ``__len__``, ``size`` (width, height) and
+    ``frame(index)``, returning a palette-mode PIL image. Every frame must
+    use the same palette and leave index TRANSPARENT unused. Frames only
+    depend on the index, so they can be rendered in any process and any
+    order.
+    """
+
+    def frames(self):
+        """Generate every frame in order."""
+        for index in range(len(self)):
+            yield self.frame(index)
+
+    def save(self, filename, fps=5, workers=None):
+        """Encode the animation to a GIF or MP4 file; see save_frames."""
+        save_frames(self, filename, fps=fps, workers=workers)
+
+
+def _init_worker(source):
+    global _worker_source
+    _worker_source = source
+
+
+def _as_image(pixels, palette):
+    image = Image.fromarray(np.ascontiguousarray(pixels), mode='P')
+    image.putpalette(palette)
+    return image
+
+
+def encode_gif_frames(source, start, stop, fps):
+    """
+    GIF bytes of frames ``start..stop-1``, header included when ``start`` is 0.
+
+    After the first frame only the pixels that changed since the previous
+    frame are encoded, cropped to their bounding box, with everything else
+    transparent. The previous frame is re-rendered here, so chunks can be
+    encoded independently and concatenated.
+    """
+    duration = int(round(1000 / fps))
+    chunks = []
+    previous = np.asarray(source.frame(start - 1)) if start > 0 else None
+    for index in range(start, stop):
+        image = source.frame(index)
+        frame = np.asarray(image)
+        if previous is None:
+            header, _ = GifImagePlugin.getheader(image, info={'loop': 0})
+            chunks += header
+            chunks += GifImagePlugin.getdata(image, duration=duration)
+        else:
+            changed = frame != previous
+            rows, columns = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+            if len(rows):
+                box = (slice(rows[0], rows[-1] + 1), slice(columns[0], columns[-1] + 1))
+                offset = (int(columns[0]), int(rows[0]))
+            else:
+                box, offset = (slice(0, 1), slice(0, 1)), (0, 0)
+            patch = _as_image(np.where(changed[box], frame[box], TRANSPARENT), image.getpalette())
+            chunks += GifImagePlugin.getdata(patch, offset=offset, duration=duration,
+                                             transparency=TRANSPARENT, disposal=1)
+        previous = frame
+    return b''.join(chunks)
+
+
+def encode_rgb_frames(source, start, stop):
+    """Raw RGB24 bytes of frames ``start..stop-1``, as piped to ffmpeg."""
+    return b''.join(source.frame(index).convert('RGB').tobytes() for index in range(start, stop))
+
+
+def _encode_on_worker(kind, start, stop, fps):
+    if kind == 'gif':
+        return encode_gif_frames(_worker_source, start, stop, fps)
+    return encode_rgb_frames(_worker_source, start, stop)
+
+
+def _encoded_chunks(source, kind, fps, workers, chunk_size):
+    """
+    Encoded frame chunks in order.
+
+    With several workers, chunks are rendered in a process pool that
+    receives the frame source once per worker. At most ``2 * workers``
+    chunks are in flight, so memory stays bounded however long the
+    animation is.
+    """
+    bounds = [(start, min(start + chunk_size, len(source))) for start in range(0, len(source), chunk_size)]
+    if workers == 1 or len(bounds) <= 1:
+        for start, stop in bounds:
+            if kind == 'gif':
+                yield encode_gif_frames(source, start, stop, fps)
+            else:
+                yield encode_rgb_frames(source, start, stop)
+        return
+
+    # Spawned, not forked: exports run from the app's job threads, and forking
+    # a multi-threaded process can copy locks held by other threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'), initializer=_init_worker,
+                             initargs=(source,)) as pool:
+        chunks = iter(bounds)
+        pending = deque(
+            pool.submit(_encode_on_worker, kind, start, stop, fps) for start, stop in islice(chunks, 2 * workers)
+        )
+        while pending:
+            encoded = pending.popleft().result()
+            following = next(chunks, None)
+            if following is not None:
+                pending.append(pool.submit(_encode_on_worker, kind, *following, fps))
+            yield encoded
+
+
+def save_frames(source, filename, fps=5, workers=None, chunk_size=None):
+    """
+    Stream a FrameAnimation into a ``.gif`` or, with ffmpeg installed, ``.mp4`` file.
+
+    Parameters:
+    source (FrameAnimation): Frames to encode.
+    filename (str): Output path; the extension selects the format.
+    fps (int): Frames per second.
+    workers (int, optional): Processes rendering and encoding frame chunks;
+        defaults to the CPU count, 1 encodes in-process.
+    chunk_size (int, optional): Frames per task; 8 for GIF, 2 for MP4
+        (whose chunks are raw RGB).
+    """
+    workers = workers or os.cpu_count() or 1
+    if len(source) == 0:
+        raise ValueError("Animation has no frames")
+
+    if not filename.lower().endswith('.mp4'):
+        with open(filename, 'wb') as f:
+            for chunk in _encoded_chunks(source, 'gif', fps, workers, chunk_size or 8):
+                f.write(chunk)
+            f.write(b';')  # GIF trailer
+        return
+
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError("Saving MP4 animations requires ffmpeg on the PATH; save a .gif instead")
+    width, height = source.size
+    command = [
+        ffmpeg, '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{width}x{height}", '-r', str(fps), '-i', '-',
+        '-pix_fmt', 'yuv420p', '-vcodec', 'libx264', filename
+    ]
+    with subprocess.Popen(command, stdin=subprocess.PIPE) as process:
+        for chunk in _encoded_chunks(source, 'rgb', fps, workers, chunk_size or 2):
+            process.stdin.write(chunk)
+        process.stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed writing {filename}")
@@ -0,0 +1,240 @@
+import os
+import tempfile
+from collections import OrderedDict
+import networkx as nx
+import numpy as np
+from network.csr_graph import CSRGraph, from_edges, to_csr
+
+LAYOUT_CACHE_DIR = os.path.join('network', 'layouts')
+LAYOUT_VERSION = 1
+# Below this size NetworkX's exact spring layout is used
+SPRING_LAYOUT_MAX_NODES = 500
+LAYOUT_SCALE = 2.0
+
+# Layouts computed by this process, keyed like the files on disk; the least
+# recently used is dropped beyond LAYOUT_MEMORY_CACHE_SIZE
+LAYOUT_MEMORY_CACHE_SIZE = 8
+_memory_cache = OrderedDict()
+
+
+def _rescale(positions, scale=LAYOUT_SCALE):
+    """Center positions and scale them into [-scale, scale], like nx.rescale_layout."""
+    positions = positions - positions.mean(axis=0)
+    extent = np.abs(positions).max()
+    return positions * (scale / extent) if extent > 0 else positions
+
+
+def spring_positions(csr, seed=42):
+    """Exact Fruchterman-Reingold layout of a small graph through NetworkX."""
+    G = nx.Graph()
+    G.add_nodes_from(range(csr.num_nodes))
+    sources = np.repeat(np.arange(csr.num_nodes), csr.degree())
+    G.add_edges_from(zip(sources.tolist(), csr.indices.tolist()))
+    pos = nx.spring_layout(G, k=1.2, iterations=100, seed=seed, scale=LAYOUT_SCALE)
+    return np.array([pos[i] for i in range(csr.num_nodes)])
+
+
+def _repulsion_kernels(grid_size):
+    """
+    Unit repulsion field of one node, on offsets in grid cells.
+
+    Fruchterman-Reingold repulsion is ``k^2 / d`` along the separating
+    direction, so the x component for an offset ``(dx, dy)`` is
+    ``k^2 * dx / (dx^2 + dy^2)``; the ``k^2 / cell_size`` factor is applied
+    per iteration. Offsets use FFT wrap-around order on a grid padded to
+    twice the size, which turns the circular convolution into a linear one.
+    """
+    offsets = np.fft.fftfreq(2 * grid_size, 1 / (2 * grid_size))
+    dx, dy = np.meshgrid(offsets, offsets, indexing='ij')
+    squared = dx ** 2 + dy ** 2
+    squared[0, 0] = 1.0  # Nodes in the same cell do not repel each other
+    return np.fft.rfft2(dx / squared), np.fft.rfft2(dy / squared)
+
+
+def force_positions(csr, positions, temperature, iterations=30, grid_size=256):
+    """
+    Refine positions with Fruchterman-Reingold in O(N + E) per iteration.
+
+    Attraction is evaluated exactly over the edges. Repulsion between all
+    pairs is approximated on a ``grid_size`` x ``grid_size`` mesh: node
+    counts per cell are convolved with the repulsion kernel by FFT and each
+    node takes the force of its cell (a particle-mesh scheme with the same
+    near-linear cost as a Barnes-Hut tree).
+
+    Parameters:
+    csr (CSRGraph): The graph.
+    positions (numpy.ndarray): (N, 2) starting positions, roughly in a unit square.
+    temperature (float): Largest first move, cooling linearly to zero.
+    iterations (int): Number of force steps.
+
+    Returns:
+    numpy.ndarray: (N, 2) refined positions.
+    """
+    num_nodes = csr.num_nodes
+    x, y = (np.array(positions[:, axis], dtype=np.float64) for axis in range(2))
+    # Ideal edge length for a unit-area drawing
+    k = np.sqrt(1.0 / num_nodes)
+
+    sources = np.repeat(np.arange(num_nodes), csr.degree())
+    upper = sources < csr.indices
+    sources, targets = sources[upper], csr.indices[upper].astype(np.int64)
+    # Attraction is scattered onto both endpoints with one bincount per axis
+    endpoints = np.concatenate((sources, targets))
+    kernel_x, kernel_y = _repulsion_kernels(grid_size)
+    padded = np.zeros((2 * grid_size, 2 * grid_size))
+
+    cooling = temperature / iterations
+    for iteration in range(iterations):
+        # Repulsion from the cell densities
+        low_x, low_y = x.min(), y.min()
+        cell_size = max(x.max() - low_x, y.max() - low_y, 1e-9) / grid_size * (1 + 1e-6)
+        cells = ((x - low_x) / cell_size).astype(np.int64) * grid_size + ((y - low_y) / cell_size).astype(np.int64)
+        padded[:grid_size, :grid_size] = np.bincount(cells, minlength=grid_size * grid_size).reshape(grid_size, grid_size)
+        spectrum = np.fft.rfft2(padded)
+        strength = k ** 2 / cell_size
+        move_x = strength * np.fft.irfft2(spectrum * kernel_x, s=padded.shape)[:grid_size, :grid_size].ravel()[cells]
+        move_y = strength * np.fft.irfft2(spectrum * kernel_y, s=padded.shape)[:grid_size, :grid_size].ravel()[cells]
+
+        # Attraction d^2 / k along every edge
+        delta_x, delta_y = x[targets] - x[sources], y[targets] - y[sources]
+        scale = np.sqrt(delta_x ** 2 + delta_y ** 2) / k
+        move_x += np.bincount(endpoints, np.concatenate((delta_x * scale, -delta_x * scale)), minlength=num_nodes)
+        move_y += np.bincount(endpoints, np.concatenate((delta_y * scale, -delta_y * scale)), minlength=num_nodes)
+
+        # Move at most the current temperature
+        length = np.maximum(np.sqrt(move_x ** 2 + move_y ** 2), 1e-12)
+        step = np.minimum(length, temperature) / length
+        x += move_x * step
+        y += move_y * step
+        temperature -= cooling
+
+    return np.stack((x, y), axis=1)
+
+
+def coarsen(csr, rng):
+    """
+    Merge neighbouring nodes into clusters for a multilevel layout.
+
+    Every node joins the node with the highest random priority in its
+    closed neighbourhood, which shrinks the graph several times over in
+    one O(E) pass while keeping clusters connected.
+
+    Returns:
+    tuple: (coarse CSRGraph, cluster index of every node)
+    """
+    priority = rng.permutation(csr.num_nodes)
+    best = priority.copy()
+    has_neighbors = csr.degree() > 0
+    if has_neighbors.any():
+        neighbor_best = np.maximum.reduceat(priority[csr.indices], csr.indptr[:-1][has_neighbors])
+        best[has_neighbors] = np.maximum(best[has_neighbors], neighbor_best)
+    _, cluster = np.unique(np.argsort(priority)[best], return_inverse=True)
+    num_clusters = int(cluster.max()) + 1
+
+    sources = cluster[np.repeat(np.arange(csr.num_nodes), csr.degree())]
+    targets = cluster[csr.indices]
+    upper = sources < targets
+    keys = np.sort(sources[upper].astype(np.int64) * num_clusters + targets[upper])
+    keys = keys[np.append(True, keys[1:] != keys[:-1])]
+    return from_edges(num_clusters, keys // num_clusters, keys % num_clusters), cluster
+
+
+def multilevel_positions(csr, seed=42):
+    """
+    Multilevel force layout for large graphs.
+
+    The graph is coarsened until it is small enough for the exact spring
+    layout; each finer level then starts from its cluster's position and
+    is refined by force_positions. Only the last levels touch every node,
+    so the whole layout costs a few dozen O(N + E) iterations.
+
+    Returns:
+    numpy.ndarray: (N, 2) positions in CSR node order.
+    """
+    rng = np.random.default_rng(seed)
+    levels, clusters = [csr], []
+    while levels[-1].num_nodes >= SPRING_LAYOUT_MAX_NODES:
+        coarse, cluster = coarsen(levels[-1], rng)
+        if coarse.num_nodes > 0.9 * levels[-1].num_nodes:
+            break
+        levels.append(coarse)
+        clusters.append(cluster)
+
+    # Unit square layout of the coarsest graph
+    coarsest = levels[-1]
+    if coarsest.num_nodes < SPRING_LAYOUT_MAX_NODES:
+        positions = spring_positions(coarsest, seed)
+        positions = (positions - positions.min(axis=0)) / max(np.ptp(positions, axis=0).max(), 1e-9)
+    else:
+        # Coarsening stalled; fall back to a single-level layout
+        positions = force_positions(coarsest, rng.random((coarsest.num_nodes, 2)), temperature=0.1,
+                                    iterations=50)
+
+    for level, cluster in zip(reversed(levels[:-1]), reversed(clusters)):
+        # Children start around their cluster, then spread out; the finest
+        # level only needs local adjustments
+        k = np.sqrt(1.0 / level.num_nodes)
+        positions = positions[cluster] + rng.normal(scale=k, size=(level.num_nodes, 2))
+        positions = force_positions(level, positions, temperature=4 * k, iterations=10 if level is csr else 30)
+
+    return _rescale(positions)
+
+
+def compute_layout(csr, seed=42):
+    """Spring layout for small graphs, grid force layout for large ones."""
+    if csr.num_nodes <= 1:
+        return np.zeros((csr.num_nodes, 2))
+    if csr.num_nodes < SPRING_LAYOUT_MAX_NODES:
+        return spring_positions(csr, seed)
+    return multilevel_positions(csr, seed)
+
+
+def graph_layout(G, cache_dir=LAYOUT_CACHE_DIR, seed=42):
+    """
+    Node positions of a graph, computed once and shared by every plot.
+
+    Layouts are keyed by the hash of the CSR adjacency arrays (plus the
+    seed and layout version) and kept in ``cache_dir`` as a float32
+    ``.npy`` file, so a graph is laid out once across plots, animations
+    and app sessions. The last LAYOUT_MEMORY_CACHE_SIZE layouts are also
+    kept in memory.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): The network.
+    cache_dir (str, optional): Directory of the on-disk cache; None keeps
+        layouts in memory only.
+    seed (int): Seed of the layout.
+
+    Returns:
+    numpy.ndarray: (N, 2) float32 positions in ``G.nodes()`` (CSR) order.
+    """
+    csr = G if isinstance(G, CSRGraph) else to_csr(G)
+    key = f"{csr.structure_fingerprint()}-{seed}-v{LAYOUT_VERSION}"
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        return _memory_cache[key]
+
+    path = os.path.join(cache_dir, key + '.npy') if cache_dir else None
+    if path and os.path.exists(path):
+        positions = np.load(path)
+    else:
+        positions = compute_layout(csr, seed).astype(np.float32)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            # A file of its own, so processes saving the same layout don't
+            # overwrite each other's partial writes before the rename
+            with tempfile.NamedTemporaryFile(dir=cache_dir, prefix=key, suffix='.tmp.npy', delete=False) as tmp:
+                np.save(tmp, positions)
+            os.replace(tmp.name, path)
+
+    _memory_cache[key] = positions
+    if len(_memory_cache) > LAYOUT_MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+    return positions
+
+
+def layout_dict(G, cache_dir=LAYOUT_CACHE_DIR, seed=42):
+    """graph_layout as a NetworkX ``pos`` dict, for nx.draw_* functions."""
+    positions = graph_layout(G, cache_dir, seed)
+    nodes = G.nodes if isinstance(G, CSRGraph) else G.nodes()
+    return dict(zip(nodes, positions))
@@ -0,0 +1,182 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from network.csr_graph import CSRGraph, to_csr
+from simulation.sihrd_model import Status
+from visualization.layout import graph_layout
+from visualization.raster import STATUS_COLORS, column_edges
+
+DETAIL_LEVELS = ('full', 'sampled', 'supernodes', 'density')
+# 'auto' draws every node and edge up to this many nodes, supernodes above
+FULL_DETAIL_MAX_NODES = 5000
+MAX_DRAWN_EDGES = 20000
+# Only the most heavily connected pairs of supernodes are linked
+MAX_DRAWN_LINKS = 500
+GRID_SIZE = 48
+ACTIVE_STATUSES = (Status.INFECTED.value, Status.HOSPITALIZED.value)
+NODE_COLOR = 'lightblue'
+
+STATUS_RGBA = np.array([to_rgba(STATUS_COLORS[s]) for s in Status])
+
+
+def resolve_detail(detail, num_nodes):
+    """Turn ``'auto'`` into a concrete level of DETAIL_LEVELS."""
+    if detail == 'auto':
+        return 'full' if num_nodes <= FULL_DETAIL_MAX_NODES else 'supernodes'
+    if detail not in DETAIL_LEVELS:
+        raise ValueError(f"Unknown detail level {detail!r}; expected 'auto' or one of {DETAIL_LEVELS}")
+    return detail
+
+
+def grid_cells(positions, grid_size=GRID_SIZE):
+    """
+    Cell of every position on a ``grid_size`` x ``grid_size`` grid.
+
+    Returns:
+    tuple: (flat cell index per node, (x_min, x_max, y_min, y_max) extent)
+    """
+    low, high = positions.min(axis=0), positions.max(axis=0)
+    span = np.maximum(high - low, 1e-9) * (1 + 1e-6)
+    column, row = ((positions - low) / span * grid_size).astype(np.int64).T
+    return row * grid_size + column, (low[0], low[0] + span[0], low[1], low[1] + span[1])
+
+
+def active_share(groups, state, num_groups):
+    """Fraction of infected or hospitalized nodes in each group, 0 where empty."""
+    population = np.bincount(groups, minlength=num_groups)
+    active = np.bincount(groups, weights=np.isin(state, ACTIVE_STATUSES), minlength=num_groups)
+    return np.divide(active, population, out=np.zeros(num_groups), where=population > 0)
+
+
+class LevelOfDetailView:
+    """
+    Network drawing whose cost does not grow with the graph.
+
+    Levels, all on the cached graph_layout:
+
+    - ``'sampled'``: every node, but at most ``max_edges`` randomly sampled edges.
+    - ``'supernodes'``: nodes merged per occupied cell of a layout grid (the
+      force layout places densely connected groups together), drawn sized
+      by population and coloured by infection share, with the edges between
+      cells aggregated into weighted links (the MAX_DRAWN_LINKS heaviest).
+    - ``'density'``: a grid image of the population, or of the infection
+      share once node states are given.
+
+    Aggregates are computed once; each frame only recounts node states with
+    one bincount, so animations stay cheap for millions of nodes.
+    """
+
+    def __init__(self, G, detail, nodes=None, grid_size=GRID_SIZE, max_edges=MAX_DRAWN_EDGES):
+        """
+        Parameters:
+        G (networkx.Graph or CSRGraph): The network.
+        detail (str): One of 'sampled', 'supernodes' or 'density'.
+        nodes (list, optional): Order of the state arrays passed to draw/update,
+            such as ``StatusHistory.nodes``; CSR order by default.
+        grid_size (int): Cells per side of the supernode and density grids.
+        max_edges (int): Edges drawn by the 'sampled' level.
+        """
+        if detail not in DETAIL_LEVELS[1:]:
+            raise ValueError(f"LevelOfDetailView draws 'sampled', 'supernodes' or 'density', not {detail!r}")
+        csr = G if isinstance(G, CSRGraph) else to_csr(G)
+        same_order = nodes is None or list(csr.nodes) == list(nodes)
+        positions = graph_layout(csr)
+        if not same_order:
+            index = csr.node_index()
+            positions = positions[np.array([index[node] for node in nodes], dtype=np.int64)]
+        self.detail = detail
+        self.positions = np.asarray(positions, dtype=np.float64)
+        self.grid_size = grid_size
+        self.artists = []
+
+        sources, targets = column_edges(csr, None if same_order else nodes)
+        if detail == 'sampled':
+            if len(sources) > max_edges:
+                sample = np.random.default_rng(0).choice(len(sources), max_edges, replace=False)
+                sources, targets = sources[sample], targets[sample]
+            self.segments = np.stack((self.positions[sources], self.positions[targets]), axis=1)
+            return
+
+        cells, self.extent = grid_cells(self.positions, grid_size)
+        if detail == 'density':
+            self.groups = cells
+            return
+
+        # Supernodes are the occupied cells, numbered densely
+        occupied, self.groups = np.unique(cells, return_inverse=True)
+        num_groups = len(occupied)
+        self.population = np.bincount(self.groups, minlength=num_groups)
+        self.centers = np.stack(
+            [np.bincount(self.groups, weights=self.positions[:, axis], minlength=num_groups) / self.population
+             for axis in range(2)],
+            axis=1
+        )
+        # Links between supernodes, weighted by the number of edges they merge
+        a, b = self.groups[sources], self.groups[targets]
+        keys = np.minimum(a, b) * num_groups + np.maximum(a, b)
+        keys, weights = np.unique(keys[a != b], return_counts=True)
+        if len(keys) > MAX_DRAWN_LINKS:
+            heaviest = np.argsort(weights, kind='stable')[-MAX_DRAWN_LINKS:]
+            keys, weights = keys[heaviest], weights[heaviest]
+        self.links = np.stack((self.centers[keys // num_groups], self.centers[keys % num_groups]), axis=1)
+        self.link_weights = weights
+
+    def _density_image(self, state):
+        cells = self.grid_size * self.grid_size
+        if state is None:
+            population = np.bincount(self.groups, minlength=cells).astype(np.float64)
+            image = np.ma.masked_equal(np.log1p(population), 0)
+        else:
+            population = np.bincount(self.groups, minlength=cells)
+            image = np.ma.masked_array(active_share(self.groups, state, cells), mask=population == 0)
+        return image.reshape(self.grid_size, self.grid_size)
+
+    def draw(self, ax, state=None):
+        """
+        Draw the view on ``ax``; with a Status value array, nodes are coloured by state.
+
+        Returns:
+        list: The artists that update() changes.
+        """
+        if self.detail == 'sampled':
+            ax.add_collection(LineCollection(self.segments, colors='gray', linewidths=0.2, alpha=0.2))
+            colors = NODE_COLOR if state is None else STATUS_RGBA[state]
+            size = max(1.0, 30.0 * min(1.0, FULL_DETAIL_MAX_NODES / len(self.positions)))
+            self.artists = [ax.scatter(self.positions[:, 0], self.positions[:, 1], c=colors, s=size,
+                                       linewidths=0, rasterized=True)]
+        elif self.detail == 'supernodes':
+            widths = 0.3 + np.log1p(self.link_weights) / np.log1p(self.link_weights.max(initial=1))
+            ax.add_collection(LineCollection(self.links, colors='gray', linewidths=widths, alpha=0.15, zorder=0))
+            sizes = 400 * np.sqrt(self.population / self.population.max())
+            if state is None:
+                nodes = ax.scatter(self.centers[:, 0], self.centers[:, 1], s=sizes, c=NODE_COLOR,
+                                   edgecolors='white', linewidths=0.3)
+            else:
+                nodes = ax.scatter(self.centers[:, 0], self.centers[:, 1], s=sizes,
+                                   c=active_share(self.groups, state, len(self.population)),
+                                   cmap='Reds', vmin=0, vmax=1, edgecolors='gray', linewidths=0.3)
+            self.artists = [nodes]
+        else:
+            cmap = 'Blues' if state is None else 'Reds'
+            limits = {} if state is None else {'vmin': 0, 'vmax': 1}
+            self.artists = [ax.imshow(self._density_image(state), origin='lower', extent=self.extent,
+                                      cmap=cmap, interpolation='nearest', aspect='auto', **limits)]
+        ax.set_xlim(self.extent[:2] if self.detail == 'density' else self._limits(0))
+        ax.set_ylim(self.extent[2:] if self.detail == 'density' else self._limits(1))
+        return self.artists
+
+    def _limits(self, axis):
+        low, high = self.positions[:, axis].min(), self.positions[:, axis].max()
+        margin = 0.05 * max(high - low, 1e-9)
+        return low - margin, high + margin
+
+    def update(self, state):
+        """Recolour the drawn view for a new Status value array."""
+        artist = self.artists[0]
+        if self.detail == 'sampled':
+            artist.set_facecolors(STATUS_RGBA[state])
+        elif self.detail == 'supernodes':
+            artist.set_array(active_share(self.groups, state, len(self.population)))
+        else:
+            artist.set_data(self._density_image(state))
+        return self.artists
@@ -0,0 +1,239 @@
+import base64
+import json
+import numpy as np
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+from network.csr_graph import CSRGraph, to_csr
+from simulation.sihrd_model import Status
+from visualization.layout import graph_layout
+from visualization.lod import MAX_DRAWN_EDGES
+from visualization.raster import STATUS_COLORS, column_edges
+
+# The browser rebuilds and keeps the full state every KEYFRAME_EVERY days,
+# so scrubbing backwards replays at most that many days of deltas
+KEYFRAME_EVERY = 16
+
+
+def _b64(array, dtype):
+    """Little-endian bytes of an array as a base64 string."""
+    return base64.b64encode(np.ascontiguousarray(array, dtype=np.dtype(dtype).newbyteorder('<')).tobytes()).decode()
+
+
+def encode_state_deltas(states):
+    """
+    Encode recorded node states as the first row plus per-row changes.
+
+    Parameters:
+    states (numpy.ndarray or StatusHistory): (rows, N) Status values.
+
+    Returns:
+    tuple: (first row uint8, offsets int64 of every row's changes, changed
+        node indices uint32, new Status values uint8). The changes of row
+        ``r`` are ``indices[offsets[r - 1]:offsets[r]]``.
+    """
+    matrix = np.asarray(states.matrix if hasattr(states, 'matrix') else states, dtype=np.uint8)
+    changed = matrix[1:] != matrix[:-1]
+    days, indices = np.nonzero(changed)
+    offsets = np.zeros(len(matrix), dtype=np.int64)
+    np.cumsum(changed.sum(axis=1), out=offsets[1:])
+    return matrix[0], offsets, indices.astype(np.uint32), matrix[1:][days, indices]
+
+
+def player_payload(G, status_history, max_edges=MAX_DRAWN_EDGES):
+    """
+    Data for the browser-side spread player.
+
+    Sends the cached layout (float32), the first day's states and a delta
+    stream of the nodes that change status between recorded days, plus a
+    sample of at most ``max_edges`` edges. A 100-day run of 100k nodes is
+    a few MB, and the browser draws every frame itself. Histories that
+    skipped days (see HistoryPolicy) play one frame per recorded day.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): The simulated network.
+    status_history (StatusHistory): Daily node states from the simulation.
+    max_edges (int): Edges drawn under the nodes.
+
+    Returns:
+    dict: JSON-serializable payload for player_html, arrays base64-encoded.
+    """
+    if status_history is None or len(status_history) == 0:
+        raise ValueError("No status history data provided for animation")
+    csr = G if isinstance(G, CSRGraph) else to_csr(G)
+    same_order = list(csr.nodes) == status_history.nodes
+    positions = graph_layout(csr)
+    if not same_order:
+        index = csr.node_index()
+        positions = positions[np.array([index[node] for node in status_history.nodes], dtype=np.int64)]
+
+    sources, targets = column_edges(csr, None if same_order else status_history.nodes)
+    if len(sources) > max_edges:
+        sample = np.random.default_rng(0).choice(len(sources), max_edges, replace=False)
+        sources, targets = sources[sample], targets[sample]
+
+    first, offsets, indices, values = encode_state_deltas(status_history)
+    return {
+        'num_nodes': len(status_history.nodes),
+        'num_days': len(status_history),
+        'days': status_history.days.tolist(),
+        'positions': _b64(positions, np.float32),
+        'edges': _b64(np.stack((sources, targets), axis=1), np.uint32),
+        'first': _b64(first, np.uint8),
+        'offsets': _b64(offsets, np.uint32),
+        'indices': _b64(indices, np.uint32),
+        'values': _b64(values, np.uint8),
+        'statuses': [s.name.capitalize() for s in Status],
+        'colors': [STATUS_COLORS[s] for s in Status],
+        'keyframe_every': KEYFRAME_EVERY
+    }
+
+
+PLAYER_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+__PLOTLY_SCRIPT__
+<style>
+  body { margin: 0; font-family: sans-serif; }
+  #controls { display: flex; align-items: center; gap: 0.75rem; padding: 0.5rem; }
+  #day { flex: 1; }
+  #label { min-width: 16rem; font-size: 0.9rem; }
+</style>
+</head>
+<body>
+<div id="controls">
+  <button id="play">Play</button>
+  <input id="day" type="range" min="0" value="0" step="1">
+  <span id="label"></span>
+</div>
+<div id="plot" style="height: __PLOT_HEIGHT__px;"></div>
+<script>
+const data = __PAYLOAD__;
+
+function decode(text, Type) {
+  const bytes = Uint8Array.from(atob(text), c => c.charCodeAt(0));
+  return new Type(bytes.buffer);
+}
+
+const positions = decode(data.positions, Float32Array);
+const edges = decode(data.edges, Uint32Array);
+const offsets = decode(data.offsets, Uint32Array);
+const indices = decode(data.indices, Uint32Array);
+const values = decode(data.values, Uint8Array);
+const n = data.num_nodes;
+
+const x = new Float32Array(n), y = new Float32Array(n);
+for (let i = 0; i < n; i++) { x[i] = positions[2 * i]; y[i] = positions[2 * i + 1]; }
+
+// Sampled edges as one line trace, segments separated by gaps
+const edgeX = new Array(edges.length / 2 * 3), edgeY = new Array(edges.length / 2 * 3);
+for (let e = 0; e < edges.length / 2; e++) {
+  const a = edges[2 * e], b = edges[2 * e + 1];
+  edgeX[3 * e] = x[a]; edgeX[3 * e + 1] = x[b]; edgeX[3 * e + 2] = null;
+  edgeY[3 * e] = y[a]; edgeY[3 * e + 1] = y[b]; edgeY[3 * e + 2] = null;
+}
+
+// Full states are kept every keyframe_every days; other days replay deltas
+const keyframes = [decode(data.first, Uint8Array)];
+let current = keyframes[0].slice(), currentDay = 0;
+
+function applyDay(state, day) {
+  for (let k = offsets[day - 1]; k < offsets[day]; k++) state[indices[k]] = values[k];
+}
+
+function stateOn(day) {
+  const K = data.keyframe_every;
+  // Restart from the closest known keyframe when going back or far ahead
+  const key = Math.min(Math.floor(day / K), keyframes.length - 1);
+  if (day < currentDay || key * K > currentDay) {
+    current = keyframes[key].slice();
+    currentDay = key * K;
+  }
+  while (currentDay < day) {
+    currentDay++;
+    applyDay(current, currentDay);
+    if (currentDay % K === 0 && keyframes.length === currentDay / K) keyframes.push(current.slice());
+  }
+  return current;
+}
+
+// Each status code is drawn in the middle of its own colour band
+function colorsOf(state) {
+  return Float32Array.from(state, s => s + 0.5);
+}
+
+const scale = data.colors.map((color, i) => [[i / data.colors.length, color], [(i + 1) / data.colors.length, color]]).flat();
+const markerSize = Math.max(2, Math.min(8, 8 * Math.sqrt(2000 / n)));
+const plot = document.getElementById('plot');
+Plotly.newPlot(plot, [
+  {type: 'scattergl', mode: 'lines', x: edgeX, y: edgeY, hoverinfo: 'skip',
+   line: {color: 'rgba(128, 128, 128, 0.2)', width: 0.5}},
+  {type: 'scattergl', mode: 'markers', x: x, y: y, hoverinfo: 'skip',
+   marker: {size: markerSize, color: colorsOf(stateOn(0)), cmin: 0, cmax: data.colors.length,
+            colorscale: scale}}
+], {
+  showlegend: false, margin: {l: 10, r: 10, t: 10, b: 10},
+  xaxis: {visible: false}, yaxis: {visible: false, scaleanchor: 'x'}
+}, {displaylogo: false, responsive: true});
+
+const slider = document.getElementById('day'), label = document.getElementById('label');
+slider.max = data.num_days - 1;
+
+function show(day) {
+  const state = stateOn(day);
+  const counts = new Array(data.statuses.length).fill(0);
+  for (let i = 0; i < n; i++) counts[state[i]]++;
+  label.textContent = 'Day ' + data.days[day] + ': ' + data.statuses.map((name, s) => name + ' ' + counts[s]).join(', ');
+  Plotly.restyle(plot, {'marker.color': [colorsOf(state)]}, [1]);
+}
+
+let timer = null;
+const button = document.getElementById('play');
+button.onclick = () => {
+  if (timer) { clearInterval(timer); timer = null; button.textContent = 'Play'; return; }
+  if (+slider.value >= data.num_days - 1) slider.value = 0;
+  button.textContent = 'Pause';
+  timer = setInterval(() => {
+    if (+slider.value >= data.num_days - 1) { button.onclick(); return; }
+    slider.value = +slider.value + 1;
+    show(+slider.value);
+  }, 1000 / __FPS__);
+};
+slider.oninput = () => show(+slider.value);
+show(0);
+</script>
+</body>
+</html>
+"""
+
+
+def player_html(payload, height=600, fps=10, include_plotlyjs=True):
+    """
+    Standalone HTML page that plays a player_payload with Plotly scattergl.
+
+    The page decodes the arrays in the browser and redraws only the node
+    colours for each day, so playing and scrubbing need no server work.
+    Show it with ``streamlit.components.v1.html`` or save it to a file.
+
+    Parameters:
+    payload (dict): Output of player_payload.
+    height (int): Height of the plot in pixels.
+    fps (int): Days played per second.
+    include_plotlyjs (bool or str): True embeds plotly.js (about 3.5 MB)
+        so the page works offline; 'cdn' loads it from cdn.plot.ly instead,
+        like plotly's ``to_html``.
+
+    Returns:
+    str: The HTML page.
+    """
+    if include_plotlyjs == 'cdn':
+        script = f'<script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"></script>'
+    elif include_plotlyjs is True:
+        script = f'<script type="text/javascript">{get_plotlyjs()}</script>'
+    else:
+        raise ValueError(f"include_plotlyjs must be True or 'cdn', not {include_plotlyjs!r}")
+    # plotly.js goes in last, so the other placeholders are not searched for in it
+    return (PLAYER_TEMPLATE
+            .replace('__PLOT_HEIGHT__', str(int(height)))
+            .replace('__FPS__', str(fps))
+            .replace('__PAYLOAD__', json.dumps(payload))
+            .replace('__PLOTLY_SCRIPT__', script))
@@ -4,6 +4,7 @@ import random
 import matplotlib.animation as animation
 import os
 import streamlit as st
+from visualization.layout import layout_dict
 
 def visualize_social_network_dynamic(G, status, pos=None, interval=300, seed=42):
     """
@@ -17,7 +18,7 @@ def visualize_social_network_dynamic(G, status, pos=None, interval=300, seed=42)
     - seed (int): Seed for consistent layout generation.
     """
     if pos is None:
-        pos = nx.spring_layout(G, seed=seed)
+        pos = layout_dict(G, seed=seed)
 
     # Define colors for Susceptible, Infected, and Recovered nodes
     def get_color_map(status_dict):
@@ -84,7 +85,7 @@ def animate_infection_spread(G, status_history, path="visualization/infection_an
     - interval (int): Delay between frames in ms.
     - seed (int): Layout seed.
     """
-    pos = nx.spring_layout(G, seed=seed)
+    pos = layout_dict(G, seed=seed)
     fig, ax = plt.subplots(figsize=(8, 8))
 
     def get_color_map(status_dict):
@@ -0,0 +1,238 @@
+import numpy as np
+from PIL import Image, ImageDraw
+from network.csr_graph import CSRGraph, to_csr
+from simulation.sihrd_model import Status
+from visualization.export import FrameAnimation
+from visualization.layout import graph_layout
+
+# Same colours as the matplotlib animations in enhanced_plot
+STATUS_COLORS = {
+    Status.SUSCEPTIBLE: '#0000ff',  # Blue
+    Status.INFECTED: '#ff0000',     # Red
+    Status.HOSPITALIZED: '#ffaa00',  # Orange
+    Status.RECOVERED: '#44ff44',    # Green
+    Status.DECEASED: '#000000'      # Black
+}
+# Nodes drawn later end up on top where markers overlap
+DRAW_PRIORITY = np.array([0, 4, 3, 1, 2], dtype=np.int8)
+
+# Palette: one index per Status value, then background, text and edge shades
+BACKGROUND = len(Status)
+TEXT = BACKGROUND + 1
+EDGE_SHADES = np.array([0.1, 0.2, 0.35, 0.5])  # Opacity of grey edges over white
+FIRST_EDGE_SHADE = TEXT + 1
+
+
+def _rgb(color):
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+
+def build_palette():
+    """(256, 3) uint8 RGB palette indexed by the raster frame values."""
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    for s, color in STATUS_COLORS.items():
+        palette[s.value] = _rgb(color)
+    palette[BACKGROUND] = (255, 255, 255)
+    palette[TEXT] = (40, 40, 40)
+    grey = np.array(_rgb('#808080'))
+    shades = 255 + np.outer(EDGE_SHADES, grey - 255)
+    palette[FIRST_EDGE_SHADE:FIRST_EDGE_SHADE + len(EDGE_SHADES)] = np.round(shades)
+    return palette
+
+
+PALETTE = build_palette()
+
+
+def project_positions(positions, width, height, margin):
+    """Scale layout coordinates into integer pixel coordinates, y pointing down."""
+    positions = np.asarray(positions, dtype=np.float64)
+    low, high = positions.min(axis=0), positions.max(axis=0)
+    span = np.where(high > low, high - low, 1.0)
+    scale = min((width - 2 * margin) / span[0], (height - 2 * margin) / span[1])
+    # Center the drawing in the canvas
+    offset = (np.array([width, height]) - span * scale) / 2
+    pixels = np.round((positions - low) * scale + offset).astype(np.int64)
+    pixels[:, 1] = height - 1 - pixels[:, 1]
+    return pixels
+
+
+def edge_pixel_counts(pixels, sources, targets, width, height, chunk_size=1 << 22):
+    """
+    Number of edge segments passing through every pixel.
+
+    Every edge is sampled at one point per pixel along its longer axis.
+    Edges are processed in chunks of about ``chunk_size`` samples so
+    memory stays bounded for millions of edges.
+    """
+    counts = np.zeros(width * height, dtype=np.int64)
+    start, end = pixels[sources].astype(np.float32), pixels[targets].astype(np.float32)
+    delta = end - start
+    lengths = np.abs(delta).max(axis=1).astype(np.int64) + 1
+    cumulative = np.cumsum(lengths)
+    splits = np.searchsorted(cumulative, np.arange(chunk_size, cumulative[-1], chunk_size))
+    bounds = np.unique(np.concatenate(([0], splits, [len(lengths)])))
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        edge_lengths = lengths[first:last]
+        edge = np.repeat(np.arange(first, last), edge_lengths)
+        step = np.arange(len(edge)) - np.repeat(np.cumsum(edge_lengths) - edge_lengths, edge_lengths)
+        t = (step / np.maximum(lengths[edge] - 1, 1)).astype(np.float32)
+        x = np.rint(start[edge, 0] + t * delta[edge, 0]).astype(np.int64)
+        y = np.rint(start[edge, 1] + t * delta[edge, 1]).astype(np.int64)
+        counts += np.bincount(y * width + x, minlength=width * height)
+    return counts.reshape(height, width)
+
+
+def disk_offsets(radius):
+    """Pixel offsets (dy, dx) of a filled disk marker."""
+    span = np.arange(-radius, radius + 1)
+    dy, dx = np.meshgrid(span, span, indexing='ij')
+    inside = dy ** 2 + dx ** 2 <= radius ** 2 + radius
+    return dy[inside], dx[inside]
+
+
+def default_node_radius(num_nodes):
+    """Marker radius in pixels that keeps dense graphs readable."""
+    if num_nodes <= 2000:
+        return 4
+    if num_nodes <= 20000:
+        return 2
+    if num_nodes <= 200000:
+        return 1
+    return 0
+
+
+class RasterAnimation(FrameAnimation):
+    """
+    Disease spread animation rendered straight into palette-indexed arrays.
+
+    Node positions are projected to pixels and the edges are rasterised
+    into a background image once. Each frame is then a copy of the
+    background plus one fancy-indexed write of every node's state value,
+    so a frame of a 100k-node graph takes milliseconds. ``save`` streams
+    the frames into a GIF (or an MP4 through ffmpeg), rendered in parallel
+    chunks, so every day can be kept at full resolution.
+    """
+
+    def __init__(self, positions, states, sources=None, targets=None, days=None, width=1024, height=768,
+                 node_radius=None, title="Disease Spread", max_edges=200000):
+        """
+        Parameters:
+        positions (numpy.ndarray): (N, 2) layout coordinates in state column order.
+        states (numpy.ndarray or StatusHistory): (days, N) Status values per day.
+        sources, targets (numpy.ndarray, optional): Edge endpoints as column indices.
+        days (sequence, optional): Day label of every frame; 0, 1, ... by default.
+        width, height (int): Frame size in pixels; rounded down to even numbers for MP4.
+        node_radius (int, optional): Marker radius; chosen from the node count by default.
+        title (str): Text drawn in the top-left corner before the day.
+        max_edges (int, optional): Draw a fixed random sample of this many
+            edges when there are more; beyond that the background is solid grey
+            anyway. None draws every edge.
+        """
+        self.states = states
+        self.width, self.height = width - width % 2, height - height % 2
+        self.days = list(range(len(states))) if days is None else list(days)
+        self.title = title
+        radius = default_node_radius(len(positions)) if node_radius is None else node_radius
+
+        legend_height = 24
+        pixels = project_positions(positions, self.width, self.height - legend_height, radius + 4)
+        pixels[:, 1] += legend_height
+
+        self.background = np.full((self.height, self.width), BACKGROUND, dtype=np.uint8)
+        if sources is not None and len(sources):
+            if max_edges is not None and len(sources) > max_edges:
+                sample = np.random.default_rng(0).choice(len(sources), max_edges, replace=False)
+                sources, targets = sources[sample], targets[sample]
+            counts = edge_pixel_counts(pixels, sources, targets, self.width, self.height)
+            drawn = counts > 0
+            shade = np.minimum(np.log2(np.maximum(counts[drawn], 1)).astype(np.int64), len(EDGE_SHADES) - 1)
+            self.background[drawn] = FIRST_EDGE_SHADE + shade
+        self._draw_legend()
+
+        dy, dx = disk_offsets(radius)
+        y = np.clip(pixels[:, 1:2] + dy, 0, self.height - 1)
+        x = np.clip(pixels[:, 0:1] + dx, 0, self.width - 1)
+        # Flat pixel indices of every node's marker, shape (N, marker pixels)
+        self.node_pixels = y * self.width + x
+
+    def _draw_legend(self):
+        image = self._to_image(self.background)
+        draw = ImageDraw.Draw(image)
+        x = self.width - 10
+        for s in reversed(list(Status)):
+            label = s.name.capitalize()
+            x -= int(draw.textlength(label)) + 22
+            draw.rectangle((x, 8, x + 9, 17), fill=s.value)
+            draw.text((x + 13, 6), label, fill=TEXT)
+        self.background = np.array(image)
+
+    def _to_image(self, frame):
+        image = Image.fromarray(np.ascontiguousarray(frame), mode='P')
+        image.putpalette(PALETTE.tobytes())
+        return image
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def render(self, index):
+        """Palette-indexed (height, width) uint8 array of one frame."""
+        frame = self.background.copy()
+        state = np.asarray(self.states[index])
+        order = np.argsort(DRAW_PRIORITY[state], kind='stable')
+        frame.reshape(-1)[self.node_pixels[order]] = state[order, None]
+        return frame
+
+    def frame(self, index):
+        """One frame as a palette-mode PIL image with its day label."""
+        image = self._to_image(self.render(index))
+        ImageDraw.Draw(image).text((10, 6), f"{self.title} - Day {self.days[index]}", fill=TEXT)
+        return image
+
+def column_edges(csr, nodes=None):
+    """
+    Every undirected edge once, as ``(sources, targets)`` index arrays.
+
+    Indices are CSR positions, or positions in ``nodes`` (such as
+    ``StatusHistory.nodes``) when that order is given.
+    """
+    sources = np.repeat(np.arange(csr.num_nodes), csr.degree())
+    upper = sources < csr.indices
+    sources, targets = sources[upper], csr.indices[upper].astype(np.int64)
+    if nodes is not None:
+        column = {node: i for i, node in enumerate(nodes)}
+        to_column = np.array([column[node] for node in csr.nodes], dtype=np.int64)
+        sources, targets = to_column[sources], to_column[targets]
+    return sources, targets
+
+
+def render_spread(G, status_history, pos=None, **kwargs):
+    """
+    Build a RasterAnimation of a simulation run.
+
+    Parameters:
+    G (networkx.Graph or CSRGraph): The simulated network.
+    status_history (StatusHistory): Daily node states from the simulation.
+    pos (dict or numpy.ndarray, optional): Layout dict, or (N, 2) positions
+        in history column order. Defaults to the cached graph_layout.
+    **kwargs: Passed on to RasterAnimation (width, height, node_radius, ...).
+        Frames are labelled with the history's recorded days by default.
+
+    Returns:
+    RasterAnimation: Call ``.save(filename, fps)`` to encode it.
+    """
+    if status_history is None or len(status_history) == 0:
+        raise ValueError("No status history data provided for animation")
+    csr = G if isinstance(G, CSRGraph) else to_csr(G)
+    same_order = list(csr.nodes) == status_history.nodes
+    if pos is None:
+        positions = graph_layout(csr)
+        pos = positions if same_order else dict(zip(csr.nodes, positions))
+    positions = status_history.positions(pos) if isinstance(pos, dict) else np.asarray(pos)
+
+    sources, targets = column_edges(csr, None if same_order else status_history.nodes)
+    kwargs.setdefault('days', status_history.days)
+    return RasterAnimation(positions, status_history, sources, targets, **kwargs)